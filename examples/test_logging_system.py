@@ -219,7 +219,8 @@ def test_request_logger():
         except Exception:
             pass  # Expected
         
-        # Verify entries were logged
+        # Verify entries were logged (they are written in the background)
+        logger.flush()
         entries = backend.read_log_entries()
         assert len(entries) == 2
         
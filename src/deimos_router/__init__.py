@@ -6,6 +6,7 @@ __version__ = "0.1.0"
 from .router import Router, register_router, get_router, list_routers, clear_routers
 from .chat import chat
 from .config import config
+from .metadata import DeimosMetadata, get_explanation, get_metadata
 from .rules import Rule, Decision, TaskRule, CodeRule, CodeLanguageRule, NaturalLanguageRule, AutoTaskRule, register_rule, get_rule, list_rules, clear_rules
 
 def hello() -> str:
@@ -22,6 +23,9 @@ __all__ = [
     "clear_routers",
     "chat",
     "config",
+    "DeimosMetadata",
+    "get_metadata",
+    "get_explanation",
     "Rule",
     "Decision",
     "TaskRule",
@@ -1,13 +1,90 @@
 """Chat completions API that mimics OpenAI's interface."""
 
-from typing import Any, Dict, List, Optional, Union
+from collections import ChainMap
+from importlib.util import find_spec
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+import httpx
+import json
 import openai
+import re
+import threading
 import time
 from openai.types.chat import ChatCompletion
 
 from .config import config
-from .router import get_router
-from .logging.logger import get_logger
+from .router import get_router, list_routers
+from .logging.logger import RequestLogger, get_logger
+from .metadata import DeimosMetadata
+from .rules.base import ExplanationEntry
+
+
+# Request parameters consumed by deimos that must not be forwarded to OpenAI
+_DEIMOS_ONLY_KEYS = frozenset({'task', 'explain'})
+
+# Maximum number of router names listed in a "router not found" error
+_MAX_LISTED_ROUTERS = 20
+
+# Connection pool settings for the shared HTTP client. Keep-alive connections
+# are reused across requests so bursts don't pay a TCP/TLS handshake each time.
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128)
+_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# HTTP/2 multiplexing needs the optional `h2` package (pip install httpx[http2])
+_HTTP2_AVAILABLE = find_spec('h2') is not None
+
+# Batch API endpoint for chat completions, and the batch states that end polling
+_BATCH_ENDPOINT = "/v1/chat/completions"
+_BATCH_FINAL_STATUSES = frozenset({'completed', 'failed', 'expired', 'cancelled'})
+
+# Characters not allowed in batch upload filenames (model names contain '/')
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def _make_client(api_url: str, api_key: str) -> openai.OpenAI:
+    """Create an OpenAI client backed by a pooled keep-alive HTTP client."""
+    return openai.OpenAI(
+        api_key=api_key,
+        base_url=api_url,
+        http_client=openai.DefaultHttpxClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=_HTTP_LIMITS,
+            timeout=_HTTP_TIMEOUT
+        )
+    )
+
+
+class _Endpoint:
+    """An upstream API endpoint in the failover pool."""
+    
+    def __init__(
+        self,
+        api_url: str,
+        api_key: str,
+        models: Optional[List[str]] = None,
+        concurrency_limit: Optional[int] = None
+    ):
+        """Initialize an endpoint.
+        
+        Args:
+            api_url: Base URL of the endpoint
+            api_key: API key for the endpoint
+            models: Models hosted by this endpoint (None means any model)
+            concurrency_limit: Maximum in-flight requests before the endpoint
+                is only used as a last resort (None means unlimited)
+        """
+        self.api_url = api_url
+        self.models = frozenset(models) if models is not None else None
+        self.concurrency_limit = concurrency_limit
+        self.in_flight = 0
+        self.client = _make_client(api_url, api_key)
+    
+    def hosts(self, model: str) -> bool:
+        """Check if this endpoint serves the given model."""
+        return self.models is None or model in self.models
+    
+    def is_saturated(self) -> bool:
+        """Check if this endpoint has reached its concurrency limit."""
+        return self.concurrency_limit is not None and self.in_flight >= self.concurrency_limit
 
 
 class ChatCompletions:
@@ -16,17 +93,85 @@ class ChatCompletions:
     def __init__(self):
         """Initialize the chat completions API."""
         self._client = None
+        self._endpoints: Optional[List[_Endpoint]] = None
+        self._endpoints_lock = threading.Lock()
     
     def _get_client(self) -> openai.OpenAI:
         """Get or create OpenAI client with configured credentials."""
         if self._client is None:
             credentials = config.get_credentials()
-            self._client = openai.OpenAI(
-                api_key=credentials['api_key'],
-                base_url=credentials['api_url']
-            )
+            self._client = _make_client(credentials['api_url'], credentials['api_key'])
         return self._client
     
+    def _get_endpoints(self) -> List[_Endpoint]:
+        """Get or create the failover endpoint pool from configuration."""
+        if self._endpoints is None:
+            self._endpoints = [_Endpoint(**endpoint) for endpoint in config.endpoints]
+        return self._endpoints
+    
+    def _pick_endpoints(self, model: str) -> List[_Endpoint]:
+        """Get the endpoints hosting a model, in the order they should be tried.
+        
+        Endpoints below their concurrency limit come first, least-loaded first;
+        saturated endpoints are kept at the end as a last resort.
+        
+        Args:
+            model: The model the request will be sent to
+            
+        Returns:
+            Ordered list of candidate endpoints (empty if none host the model)
+        """
+        with self._endpoints_lock:
+            candidates = [endpoint for endpoint in self._get_endpoints() if endpoint.hosts(model)]
+            candidates.sort(key=lambda endpoint: (endpoint.is_saturated(), endpoint.in_flight))
+        return candidates
+    
+    def _create_completion(self, messages: List[Dict[str, str]], model: str, **kwargs: Any) -> ChatCompletion:
+        """Send a completion request, failing over between pool endpoints.
+        
+        Rate limits (429), server errors (5xx) and connection failures move on
+        to the next endpoint hosting the model; other errors are raised
+        immediately. Without a matching pool endpoint the request goes to the
+        primary configured credentials.
+        
+        Args:
+            messages: List of message dictionaries
+            model: The model to call
+            **kwargs: Additional arguments passed to OpenAI API
+            
+        Returns:
+            ChatCompletion response from the first endpoint that succeeds
+        """
+        endpoints = self._pick_endpoints(model)
+        if not endpoints:
+            return self._get_client().chat.completions.create(
+                messages=messages,
+                model=model,
+                **kwargs
+            )
+        
+        last_error: Optional[Exception] = None
+        for endpoint in endpoints:
+            with self._endpoints_lock:
+                endpoint.in_flight += 1
+            try:
+                return endpoint.client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    **kwargs
+                )
+            except (openai.RateLimitError, openai.APIConnectionError) as e:
+                last_error = e
+            except openai.APIStatusError as e:
+                if e.status_code < 500:
+                    raise
+                last_error = e
+            finally:
+                with self._endpoints_lock:
+                    endpoint.in_flight -= 1
+        
+        raise last_error
+    
     def create(
         self,
         messages: List[Dict[str, str]],
@@ -45,106 +190,345 @@ class ChatCompletions:
         Returns:
             ChatCompletion response with potential routing metadata and explanation
         """
-        client = self._get_client()
         logger = get_logger()
+        router_name, selected_model, explanation_entries, request_data, openai_kwargs = self._route(
+            messages, model, kwargs, explain
+        )
         
-        # Check if this is a router call
-        if model.startswith("deimos/"):
-            router_name = model[7:]  # Remove "deimos/" prefix
-            router = get_router(router_name)
+        # Convert explanation entries to dict format, only when they are logged
+        routing_explanation = _explanation_to_log(logger, explanation_entries)
+        
+        # Log the request with routing information
+        with logger.log_request(
+            router_name=router_name,
+            selected_model=selected_model,
+            routing_explanation=routing_explanation,
+            request_data=request_data
+        ) as log_entry:
+            start_time = time.time()
             
-            if router is None:
-                raise ValueError(f"Router '{router_name}' not found. Available routers: {list(get_router.__globals__['_router_registry'].keys())}")
+            # Make the API call with selected model
+            response = self._create_completion(
+                messages=messages,
+                model=selected_model,
+                **openai_kwargs
+            )
             
-            # Prepare request data for rule evaluation
-            request_data = {
-                'messages': messages,
-                **kwargs  # Include all other parameters like task, temperature, etc.
-            }
+            # Complete the log entry with response data
+            logger.complete_request_success(log_entry, response, start_time)
+        
+        if router_name is not None:
+            _attach_metadata(
+                response,
+                router_name,
+                selected_model,
+                # Add explanation if requested
+                explanation_entries if explain and explanation_entries else None
+            )
+        
+        return response
+    
+    def create_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        explain: bool = True,
+        poll_interval: float = 30.0,
+        completion_window: str = "24h",
+        timeout: Optional[float] = None
+    ) -> List[Optional[ChatCompletion]]:
+        """Create chat completions through the OpenAI Batch API.
+        
+        Batch requests are billed at a discount in exchange for results
+        arriving asynchronously, which suits offline workloads making many
+        independent calls. Routing runs locally for every request, then one
+        batch is submitted per selected model and polled until it finishes.
+        
+        Args:
+            requests: List of request dicts, each with ``messages`` and ``model``
+                plus any other arguments accepted by ``create``
+            explain: Whether to include explanation of routing decisions
+            poll_interval: Seconds to wait between batch status checks
+            completion_window: Time frame within which the batches are processed
+            timeout: Seconds to wait for all batches to finish (None waits up
+                to the completion window). Batches still running when it
+                expires are cancelled.
             
-            # Select model using router with request data
-            if explain:
-                selected_model, explanation_entries = router.select_model_with_explanation(request_data)
-            else:
-                selected_model = router.select_model(request_data)
-                explanation_entries = []
+        Returns:
+            Responses in the same order as ``requests``; an entry is None if
+            that request failed inside its batch, its whole batch failed or
+            its batch was cancelled after the timeout (the error is logged
+            with the request)
             
-            # Convert explanation entries to dict format for logging
-            routing_explanation = [entry.to_dict() for entry in explanation_entries]
+        Raises:
+            ValueError: If a request names a router that is not registered
+        
+        If submitting or polling raises (including KeyboardInterrupt), the
+        batches already submitted are cancelled before the exception
+        propagates; the ids of any that could not be cancelled are added to
+        it as a note.
+        """
+        logger = get_logger()
+        client = self._get_client()
+        
+        routes = []
+        groups: Dict[str, List[int]] = {}
+        for index, request in enumerate(requests):
+            kwargs = dict(request)
+            messages = kwargs.pop('messages')
+            model = kwargs.pop('model')
+            route = self._route(messages, model, kwargs, explain)
+            routes.append((messages, route))
+            groups.setdefault(route[1], []).append(index)
+        
+        start_time = time.time()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        # Submit every group before polling so the batches run concurrently.
+        # Submitted batches that have not finished are cancelled if this
+        # call fails or times out, so none keep running (and billing) unseen
+        batches = []
+        finished = set()
+        bodies: Dict[int, Dict[str, Any]] = {}
+        errors: Dict[int, str] = {}
+        try:
+            for selected_model, indices in groups.items():
+                lines = []
+                for index in indices:
+                    messages, (_, _, _, _, openai_kwargs) = routes[index]
+                    lines.append(json.dumps({
+                        "custom_id": str(index),
+                        "method": "POST",
+                        "url": _BATCH_ENDPOINT,
+                        "body": {"model": selected_model, "messages": messages, **openai_kwargs}
+                    }))
+                filename = f"deimos-batch-{_UNSAFE_FILENAME_CHARS.sub('_', selected_model)}.jsonl"
+                batch_file = client.files.create(
+                    file=(filename, "\n".join(lines).encode("utf-8")),
+                    purpose="batch"
+                )
+                batch = client.batches.create(
+                    input_file_id=batch_file.id,
+                    endpoint=_BATCH_ENDPOINT,
+                    completion_window=completion_window
+                )
+                batches.append((batch.id, indices))
             
-            # Filter out custom parameters that shouldn't be passed to OpenAI
-            openai_kwargs = {k: v for k, v in kwargs.items() 
-                           if k not in ['task', 'explain']}  # Add other custom params as needed
+            for batch_id, indices in batches:
+                batch = _wait_for_batch(client, batch_id, poll_interval, deadline)
+                if batch is None:
+                    # Out of time; this and the remaining batches are cancelled below
+                    break
+                finished.add(batch_id)
+                
+                if batch.status == "failed":
+                    # Every request in the batch fails; the other batches are
+                    # still collected
+                    for index in indices:
+                        errors[index] = f"Batch {batch_id} failed: {batch.errors}"
+                    continue
+                
+                for file_id in (batch.output_file_id, batch.error_file_id):
+                    if file_id:
+                        _read_batch_results(client.files.content(file_id).text, bodies, errors)
+        except BaseException as e:
+            not_cancelled = [batch_id for batch_id, _ in batches
+                             if batch_id not in finished and not _cancel_batch(client, batch_id)]
+            if not_cancelled:
+                e.add_note(f"Batches that could not be cancelled: {', '.join(not_cancelled)}")
+            raise
+        
+        for batch_id, indices in batches:
+            if batch_id not in finished:
+                outcome = "was cancelled" if _cancel_batch(client, batch_id) else "could not be cancelled"
+                for index in indices:
+                    errors[index] = f"Batch {batch_id} did not finish within {timeout} seconds and {outcome}"
+        
+        latency_ms = (time.time() - start_time) * 1000
+        responses: List[Optional[ChatCompletion]] = []
+        for index, (messages, route) in enumerate(routes):
+            router_name, selected_model, explanation_entries, request_data, _ = route
+            routing_explanation = _explanation_to_log(logger, explanation_entries)
             
-            # Log the request with routing information
             with logger.log_request(
                 router_name=router_name,
                 selected_model=selected_model,
                 routing_explanation=routing_explanation,
                 request_data=request_data
             ) as log_entry:
-                start_time = time.time()
+                if index not in bodies:
+                    log_entry.complete_error(errors.get(index, "No result returned by batch"), latency_ms)
+                    responses.append(None)
+                    continue
                 
-                # Make the API call with selected model
-                response = client.chat.completions.create(
-                    messages=messages,
-                    model=selected_model,
-                    **openai_kwargs
-                )
-                
-                # Complete the log entry with response data
+                response = ChatCompletion.model_validate(bodies[index])
                 logger.complete_request_success(log_entry, response, start_time)
             
-            # Add routing metadata to the response
-            # We'll modify the response object to include routing info
-            if hasattr(response, 'model'):
-                # Store original model info and add routing metadata
-                original_model = response.model
-                response.model = selected_model
-                
-                # Add custom metadata (this is a bit of a hack, but works for our purposes)
-                if not hasattr(response, '_deimos_metadata'):
-                    response._deimos_metadata = {}
-                
-                response._deimos_metadata.update({
-                    'router_used': router_name,
-                    'selected_model': selected_model,
-                    'original_model_field': original_model
-                })
-                
-                # Add explanation if requested
-                if explain and explanation_entries:
-                    response._deimos_metadata['explain'] = routing_explanation
-            
-            return response
+            if router_name is not None:
+                _attach_metadata(
+                    response,
+                    router_name,
+                    selected_model,
+                    explanation_entries if explain and explanation_entries else None
+                )
+            responses.append(response)
         
-        else:
-            # Direct model call - pass through to OpenAI with logging
-            request_data = {
-                'messages': messages,
-                'model': model,
-                **kwargs
-            }
+        return responses
+    
+    def _route(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        kwargs: Dict[str, Any],
+        explain: bool
+    ) -> Tuple[Optional[str], str, List[Any], Mapping[str, Any], Dict[str, Any]]:
+        """Resolve which model a request is sent to.
+        
+        Args:
+            messages: List of message dictionaries
+            model: Model name or router name (format: "deimos/router-name")
+            kwargs: Additional request arguments
+            explain: Whether to collect explanation of routing decisions
             
-            # Log the direct model request
-            with logger.log_request(
-                router_name=None,
-                selected_model=model,
-                routing_explanation=[],
-                request_data=request_data
-            ) as log_entry:
-                start_time = time.time()
-                
-                response = client.chat.completions.create(
-                    messages=messages,
-                    model=model,
-                    **kwargs
-                )
-                
-                # Complete the log entry with response data
-                logger.complete_request_success(log_entry, response, start_time)
+        Returns:
+            Tuple of (router_name, selected_model, explanation_entries,
+            request_data, openai_kwargs); router_name is None for direct model calls
             
-            return response
+        Raises:
+            ValueError: If the named router is not registered
+        """
+        # Check if this is a router call ("deimos/<router-name>")
+        prefix, sep, router_name = model.partition('/')
+        if not (sep and prefix == 'deimos'):
+            # Direct model call - pass through to OpenAI
+            return None, model, [], ChainMap({'messages': messages, 'model': model}, kwargs), kwargs
+        
+        router = get_router(router_name)
+        
+        if router is None:
+            raise ValueError(f"Router '{router_name}' not found. Available routers: {list_routers()[:_MAX_LISTED_ROUTERS]}")
+        
+        # Use the registered name so queued log entries and response metadata
+        # share one string instead of holding a fresh slice of the model field
+        router_name = router.name
+        
+        # Prepare request data for rule evaluation as a view over kwargs
+        # (task, temperature, etc.) so no per-request copy is made
+        request_data = ChainMap({'messages': messages}, kwargs)
+        
+        # Select model using router with request data
+        if explain:
+            selected_model, explanation_entries = router.select_model_with_explanation(request_data)
+        else:
+            selected_model = router.select_model(request_data)
+            explanation_entries = []
+        
+        # Filter out custom parameters that shouldn't be passed to OpenAI
+        # (only copy kwargs when one of them is actually present)
+        if _DEIMOS_ONLY_KEYS.isdisjoint(kwargs):
+            openai_kwargs = kwargs
+        else:
+            openai_kwargs = {k: v for k, v in kwargs.items()
+                           if k not in _DEIMOS_ONLY_KEYS}
+        
+        return router_name, selected_model, explanation_entries, request_data, openai_kwargs
+
+
+def _attach_metadata(
+    response: ChatCompletion,
+    router_name: str,
+    selected_model: str,
+    explanation: Optional[List[ExplanationEntry]]
+) -> None:
+    """Add routing metadata to a routed response."""
+    try:
+        original_model = response.model
+    except AttributeError:
+        return
+    
+    # Store original model info and add routing metadata
+    response.model = selected_model
+    
+    # Attach routing metadata, bypassing pydantic's attribute handling
+    object.__setattr__(response, '_deimos_metadata', DeimosMetadata(
+        router_used=router_name,
+        selected_model=selected_model,
+        original_model_field=original_model,
+        explanation_entries=explanation
+    ))
+
+
+def _explanation_to_log(logger: RequestLogger, explanation_entries: List[ExplanationEntry]) -> List[Dict[str, Any]]:
+    """Convert explanation entries to the dicts written to the log.
+    
+    Nothing is converted when logging is disabled; responses keep the entries
+    themselves and convert them only when the explanation is read.
+    """
+    if not logger.enabled:
+        return []
+    return [entry.to_dict() for entry in explanation_entries]
+
+
+def _wait_for_batch(client: openai.OpenAI, batch_id: str, poll_interval: float, deadline: Optional[float]) -> Any:
+    """Poll a batch until it reaches a final status.
+    
+    Args:
+        client: The OpenAI client the batch was submitted with
+        batch_id: The batch to poll
+        poll_interval: Seconds to wait between status checks
+        deadline: time.monotonic() value to stop polling at, or None
+        
+    Returns:
+        The finished batch, or None if the deadline passed first
+    """
+    batch = client.batches.retrieve(batch_id)
+    while batch.status not in _BATCH_FINAL_STATUSES:
+        delay = poll_interval
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            delay = min(delay, remaining)
+        time.sleep(delay)
+        batch = client.batches.retrieve(batch_id)
+    return batch
+
+
+def _cancel_batch(client: openai.OpenAI, batch_id: str) -> bool:
+    """Ask for a submitted batch to be cancelled.
+    
+    Returns:
+        True if the cancellation was accepted
+    """
+    try:
+        client.batches.cancel(batch_id)
+    except Exception:
+        return False
+    return True
+
+
+def _read_batch_results(
+    content: str,
+    bodies: Dict[int, Dict[str, Any]],
+    errors: Dict[int, str]
+) -> None:
+    """Collect per-request results from a batch output or error file.
+    
+    Args:
+        content: JSONL content of the file
+        bodies: Receives successful response bodies, keyed by request index
+        errors: Receives error messages for failed requests, keyed by request index
+    """
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        index = int(result["custom_id"])
+        response = result.get("response") or {}
+        if response.get("status_code") == 200:
+            bodies[index] = response["body"]
+        else:
+            error = result.get("error") or response.get("body", {}).get("error") or {}
+            errors[index] = error.get("message", "Batch request failed")
 
 
 class Chat:
@@ -3,9 +3,20 @@
 import json
 import os
 from pathlib import Path
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
 
-from .default_models import get_all_default_models
+from .default_models import DEFAULT_MODELS, FALLBACK_MODEL
+
+
+# Config files looked up in the current working directory, in order of precedence
+_CWD_CONFIG_FILES = ('secrets.json', 'config.json', '.secrets')
+
+# Resolved once at import time rather than on every Config load
+_HOME_SECRETS = Path.home() / 'secrets.json'
+
+# Environment variable overriding each built-in default model
+_DEFAULT_MODEL_ENV_KEYS = {key: f"DEIMOS_DEFAULT_MODEL_{key.upper()}" for key in DEFAULT_MODELS}
 
 
 class Config:
@@ -21,8 +32,15 @@ class Config:
         self.log_directory: str = "./logs"
         self.log_level: str = "full"  # "full" or "metadata_only"
         self.log_rotation: str = "daily"  # "daily" or "size"
+        self.log_sample_rate: float = 1.0  # Fraction of fast successful requests logged
+        self.log_min_latency_ms: float = 0.0  # Requests at least this slow are always logged
         self.custom_pricing: Optional[Dict[str, Dict[str, float]]] = None
         
+        # Additional upstream endpoints for failover, each a dict with
+        # api_url, api_key and optional models / concurrency_limit
+        self.endpoints: List[Dict[str, Any]] = []
+        
+        self._env: Dict[str, str] = {}
         self._load_config()
     
     def _load_config(self) -> None:
@@ -30,97 +48,134 @@ class Config:
         # Initialize default models first
         self._set_default_models()
         
+        # Snapshot the relevant environment variables once for all lookups below
+        self._env = {k: v for k, v in os.environ.items() if k.startswith('DEIMOS_')}
+        
         # 1. Environment variables (highest precedence)
-        self.api_url = os.getenv('DEIMOS_API_URL')
-        self.api_key = os.getenv('DEIMOS_API_KEY')
+        self.api_url = self._env.get('DEIMOS_API_URL')
+        self.api_key = self._env.get('DEIMOS_API_KEY')
         self._load_default_models_from_env()
+        self._load_logging_config_from_data({})
         
-        # 2. secrets.json in current working directory
-        if not (self.api_url and self.api_key):
-            self._load_from_file('secrets.json')
-        
-        # 3. config.json in current working directory
-        if not (self.api_url and self.api_key):
-            self._load_from_file('config.json')
+        # Fully configured from the environment (containers, CI): skip all
+        # filesystem access
+        if self.api_url and self.api_key:
+            return
         
-        # 4. .secrets file in current working directory
-        if not (self.api_url and self.api_key):
-            self._load_from_file('.secrets')
+        # 2-4. secrets.json, config.json and .secrets in current working directory
+        #      (the directory is listed once instead of probing each file)
+        try:
+            cwd_entries = set(os.listdir('.'))
+        except OSError:
+            cwd_entries = set()
+        for filename in _CWD_CONFIG_FILES:
+            if filename in cwd_entries:
+                self._load_from_file(filename)
+                if self.api_url and self.api_key:
+                    return
         
         # 5. secrets.json in user's home directory
-        if not (self.api_url and self.api_key):
-            home_secrets = Path.home() / 'secrets.json'
-            if home_secrets.exists():
-                self._load_from_file(str(home_secrets))
+        self._load_from_file(str(_HOME_SECRETS))
     
     def _set_default_models(self) -> None:
         """Set the built-in default models for various tasks."""
-        self.default_models = get_all_default_models()
+        self.default_models = dict(DEFAULT_MODELS)
     
     def _load_default_models_from_env(self) -> None:
         """Load default model overrides from environment variables."""
         # Allow overriding specific default models via environment variables
-        env_prefix = 'DEIMOS_DEFAULT_MODEL_'
-        for key in self.default_models.keys():
-            env_key = f"{env_prefix}{key.upper()}"
-            env_value = os.getenv(env_key)
+        for key, env_key in _DEFAULT_MODEL_ENV_KEYS.items():
+            env_value = self._env.get(env_key)
             if env_value:
                 self.default_models[key] = env_value
     
     def _load_from_file(self, filepath: str) -> None:
         """Load configuration from a JSON file."""
         try:
-            path = Path(filepath)
-            if path.exists():
-                with open(path, 'r') as f:
-                    data = json.load(f)
-                
-                if not self.api_url and 'api_url' in data:
-                    self.api_url = data['api_url']
-                
-                if not self.api_key and 'api_key' in data:
-                    self.api_key = data['api_key']
-                
-                # Load logging configuration
-                self._load_logging_config_from_data(data)
-                
-                # Load default models from file (overrides built-in defaults but not env vars)
-                if 'default_models' in data and isinstance(data['default_models'], dict):
-                    for key, value in data['default_models'].items():
-                        if key in self.default_models and isinstance(value, str):
-                            # Only override if not already set by environment variable
-                            env_key = f"DEIMOS_DEFAULT_MODEL_{key.upper()}"
-                            if not os.getenv(env_key):
-                                self.default_models[key] = value
+            # Missing files surface as IOError, so no separate exists() probe
+            with open(filepath, 'r') as f:
+                data = json.load(f)
+            
+            if not self.api_url and 'api_url' in data:
+                self.api_url = data['api_url']
+            
+            if not self.api_key and 'api_key' in data:
+                self.api_key = data['api_key']
+            
+            # Load logging configuration
+            self._load_logging_config_from_data(data)
+            
+            # Load the endpoint pool (the first file that defines one wins)
+            if not self.endpoints and isinstance(data.get('endpoints'), list):
+                self._load_endpoints_from_data(data['endpoints'])
+            
+            # Load default models from file (overrides built-in defaults but not env vars)
+            if 'default_models' in data and isinstance(data['default_models'], dict):
+                for key, value in data['default_models'].items():
+                    if key in self.default_models and isinstance(value, str):
+                        # Only override if not already set by environment variable
+                        if not self._env.get(_DEFAULT_MODEL_ENV_KEYS[key]):
+                            self.default_models[key] = value
         
         except (json.JSONDecodeError, IOError, KeyError):
             # Silently ignore file loading errors
             pass
     
+    def _load_endpoints_from_data(self, endpoints: List[Any]) -> None:
+        """Load the failover endpoint pool from config data.
+        
+        Entries without both an api_url and an api_key are skipped.
+        """
+        for endpoint in endpoints:
+            if not isinstance(endpoint, dict):
+                continue
+            if not (endpoint.get('api_url') and endpoint.get('api_key')):
+                continue
+            
+            models = endpoint.get('models')
+            concurrency_limit = endpoint.get('concurrency_limit')
+            self.endpoints.append({
+                'api_url': str(endpoint['api_url']),
+                'api_key': str(endpoint['api_key']),
+                'models': list(models) if isinstance(models, list) else None,
+                'concurrency_limit': (concurrency_limit
+                                      if isinstance(concurrency_limit, int) and concurrency_limit > 0
+                                      else None)
+            })
+    
     def _load_logging_config_from_data(self, data: Dict) -> None:
         """Load logging configuration from config data."""
         # Load logging settings from environment variables first (highest precedence)
-        self.logging_enabled = os.getenv('DEIMOS_LOGGING_ENABLED', str(self.logging_enabled)).lower() == 'true'
-        self.log_directory = os.getenv('DEIMOS_LOG_DIRECTORY', self.log_directory)
-        self.log_level = os.getenv('DEIMOS_LOG_LEVEL', self.log_level)
-        self.log_rotation = os.getenv('DEIMOS_LOG_ROTATION', self.log_rotation)
+        env = self._env
+        self.logging_enabled = env.get('DEIMOS_LOGGING_ENABLED', str(self.logging_enabled)).lower() == 'true'
+        self.log_directory = env.get('DEIMOS_LOG_DIRECTORY', self.log_directory)
+        self.log_level = env.get('DEIMOS_LOG_LEVEL', self.log_level)
+        self.log_rotation = env.get('DEIMOS_LOG_ROTATION', self.log_rotation)
+        self.log_sample_rate = _as_fraction(env.get('DEIMOS_LOG_SAMPLE_RATE'), self.log_sample_rate)
+        self.log_min_latency_ms = _as_float(env.get('DEIMOS_LOG_MIN_LATENCY_MS'), self.log_min_latency_ms)
         
         # Then load from config file (lower precedence)
         if 'logging' in data and isinstance(data['logging'], dict):
             logging_config = data['logging']
             
-            if 'enabled' in logging_config and not os.getenv('DEIMOS_LOGGING_ENABLED'):
+            if 'enabled' in logging_config and not env.get('DEIMOS_LOGGING_ENABLED'):
                 self.logging_enabled = bool(logging_config['enabled'])
             
-            if 'directory' in logging_config and not os.getenv('DEIMOS_LOG_DIRECTORY'):
+            if 'directory' in logging_config and not env.get('DEIMOS_LOG_DIRECTORY'):
                 self.log_directory = str(logging_config['directory'])
             
-            if 'level' in logging_config and not os.getenv('DEIMOS_LOG_LEVEL'):
+            if 'level' in logging_config and not env.get('DEIMOS_LOG_LEVEL'):
                 self.log_level = str(logging_config['level'])
             
-            if 'rotation' in logging_config and not os.getenv('DEIMOS_LOG_ROTATION'):
+            if 'rotation' in logging_config and not env.get('DEIMOS_LOG_ROTATION'):
                 self.log_rotation = str(logging_config['rotation'])
             
+            if 'sample_rate' in logging_config and not env.get('DEIMOS_LOG_SAMPLE_RATE'):
+                self.log_sample_rate = _as_fraction(logging_config['sample_rate'], self.log_sample_rate)
+            
+            if 'min_latency_ms' in logging_config and not env.get('DEIMOS_LOG_MIN_LATENCY_MS'):
+                self.log_min_latency_ms = _as_float(logging_config['min_latency_ms'], self.log_min_latency_ms)
+            
             # Load custom pricing if provided
             if 'custom_pricing' in logging_config and isinstance(logging_config['custom_pricing'], dict):
                 self.custom_pricing = logging_config['custom_pricing']
@@ -150,13 +205,33 @@ class Config:
             task: The task name (e.g., 'code_language_detection', 'general_chat')
             
         Returns:
-            The model name for the task, or 'gpt-4o-mini' if task not found
+            The model name for the task, or FALLBACK_MODEL if task not found
         """
-        return self.default_models.get(task, 'gpt-4o-mini')
+        return self.default_models.get(task, FALLBACK_MODEL)
     
-    def get_all_default_models(self) -> Dict[str, str]:
-        """Get all default models as a dictionary."""
-        return self.default_models.copy()
+    def get_all_default_models(self) -> Mapping[str, str]:
+        """Get all default models as a read-only mapping.
+        
+        The mapping is a live view of the configured defaults; use ``dict(...)``
+        if a mutable copy is needed.
+        """
+        return MappingProxyType(self.default_models)
+
+
+def _as_float(value: Any, default: float) -> float:
+    """Convert a config value to float, keeping the default if it is missing or invalid."""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _as_fraction(value: Any, default: float) -> float:
+    """Convert a config value to a float between 0 and 1, keeping the default if it is missing, invalid or out of range."""
+    fraction = _as_float(value, default)
+    return fraction if 0.0 <= fraction <= 1.0 else default
 
 
 # Global configuration instance
@@ -4,24 +4,28 @@ This module contains the built-in default models for various tasks.
 Users can override these defaults through environment variables or configuration files.
 """
 
-from typing import Dict
+from types import MappingProxyType
+from typing import Mapping, Tuple
 
-# Default models for various tasks
-DEFAULT_MODELS: Dict[str, str] = {
+# Default models for various tasks (read-only; copy with dict() to modify)
+DEFAULT_MODELS: Mapping[str, str] = MappingProxyType({
     'code_language_detection': 'openai/gpt-4o-mini',
     'natural_language_detection': 'openai/gpt-4o-mini', 
     'general_chat': 'openai/gpt-4o-mini',
     'code_analysis': 'openai/gpt-4o-mini',
     'task_classification': 'openai/gpt-5-nano',
-}
+})
+
+# Model used for tasks without a configured default
+FALLBACK_MODEL = 'openai/gpt-4o-mini'
 
 # Default cheap models for router fallback
-DEFAULT_ROUTER_MODELS = [
+DEFAULT_ROUTER_MODELS: Tuple[str, ...] = (
     "openai/gpt-3.5-turbo",
     "openai/gpt-3.5-turbo-0125", 
     "openai/gpt-4o-mini",
     "openai/gpt-4o-mini-2024-07-18",
-]
+)
 
 def get_default_model(task: str) -> str:
     """Get the default model for a specific task.
@@ -30,22 +34,22 @@ def get_default_model(task: str) -> str:
         task: The task name (e.g., 'code_language_detection', 'general_chat')
         
     Returns:
-        The default model name for the task, or 'gpt-4o-mini' if task not found
+        The default model name for the task, or FALLBACK_MODEL if task not found
     """
-    return DEFAULT_MODELS.get(task, 'openai/gpt-4o-mini')
+    return DEFAULT_MODELS.get(task, FALLBACK_MODEL)
 
-def get_all_default_models() -> Dict[str, str]:
-    """Get all default models as a dictionary.
+def get_all_default_models() -> Mapping[str, str]:
+    """Get all default models as a read-only mapping.
     
     Returns:
-        A copy of the default models dictionary
+        The default models mapping (use dict() for a mutable copy)
     """
-    return DEFAULT_MODELS.copy()
+    return DEFAULT_MODELS
 
-def get_default_router_models() -> list[str]:
+def get_default_router_models() -> Tuple[str, ...]:
     """Get the default models for router fallback.
     
     Returns:
-        A copy of the default router models list
+        The default router models as an immutable tuple
     """
-    return DEFAULT_ROUTER_MODELS.copy()
+    return DEFAULT_ROUTER_MODELS
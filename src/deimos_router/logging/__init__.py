@@ -2,6 +2,13 @@
 
 from .logger import RequestLogger
 from .base import LoggerBackend, LogEntry
-from .json_logger import JSONFileLogger
 
 __all__ = ['RequestLogger', 'LoggerBackend', 'LogEntry', 'JSONFileLogger']
+
+
+def __getattr__(name):
+    # The file backend is only imported when it is actually used
+    if name == 'JSONFileLogger':
+        from .json_logger import JSONFileLogger
+        return JSONFileLogger
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,18 +1,28 @@
 """Base classes for the logging system."""
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import time
 import uuid
 
 
-@dataclass
+# Naive UTC epoch, so timestamps convert to the same naive UTC datetimes as utcnow()
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass(slots=True, init=False)
 class LogEntry:
-    """Represents a complete log entry for a request/response cycle."""
+    """Represents a complete log entry for a request/response cycle.
+    
+    The request time is stored as nanoseconds since the epoch in
+    timestamp_ns; the timestamp constructor argument and attribute work with
+    naive UTC datetimes as before.
+    """
     
     # Request identification
-    timestamp: datetime
+    timestamp_ns: int  # Nanoseconds since the epoch (UTC)
     request_id: str
     
     # Routing information
@@ -21,7 +31,7 @@ class LogEntry:
     routing_explanation: List[Dict[str, Any]]
     
     # Request/Response data
-    request: Dict[str, Any]
+    request: Mapping[str, Any]
     response: Optional[Dict[str, Any]]
     
     # Performance metrics
@@ -39,19 +49,61 @@ class LogEntry:
     status: str  # "success", "error", "timeout", etc.
     error_message: Optional[str] = None
     
+    def __init__(
+        self,
+        timestamp: Union[datetime, int],
+        request_id: str,
+        router_name: Optional[str],
+        selected_model: str,
+        routing_explanation: List[Dict[str, Any]],
+        request: Mapping[str, Any],
+        response: Optional[Dict[str, Any]],
+        latency_ms: Optional[float],
+        tokens: Optional[Dict[str, int]],
+        cost: Optional[float],
+        cost_estimated: bool,
+        cost_source: str,
+        status: str,
+        error_message: Optional[str] = None
+    ):
+        """Initialize a log entry.
+        
+        Args:
+            timestamp: Request start time, as a datetime (naive datetimes are
+                taken as UTC) or as nanoseconds since the epoch
+        
+        The remaining arguments set the fields of the same name.
+        """
+        if isinstance(timestamp, datetime):
+            timestamp = _datetime_to_ns(timestamp)
+        self.timestamp_ns = timestamp
+        self.request_id = request_id
+        self.router_name = router_name
+        self.selected_model = selected_model
+        self.routing_explanation = routing_explanation
+        self.request = request
+        self.response = response
+        self.latency_ms = latency_ms
+        self.tokens = tokens
+        self.cost = cost
+        self.cost_estimated = cost_estimated
+        self.cost_source = cost_source
+        self.status = status
+        self.error_message = error_message
+    
     @classmethod
     def create_request_entry(
         cls,
         router_name: Optional[str],
         selected_model: str,
         routing_explanation: List[Dict[str, Any]],
-        request: Dict[str, Any],
+        request: Mapping[str, Any],
         request_id: Optional[str] = None
     ) -> 'LogEntry':
         """Create a log entry for the start of a request."""
         return cls(
-            timestamp=datetime.utcnow(),
-            request_id=request_id or str(uuid.uuid4()),
+            timestamp=time.time_ns(),
+            request_id=request_id or uuid.uuid4().hex,
             router_name=router_name,
             selected_model=selected_model,
             routing_explanation=routing_explanation,
@@ -65,6 +117,11 @@ class LogEntry:
             status="pending"
         )
     
+    @property
+    def timestamp(self) -> datetime:
+        """Request start time as a naive UTC datetime."""
+        return _EPOCH + timedelta(microseconds=self.timestamp_ns // 1000)
+    
     def complete_success(
         self,
         response: Dict[str, Any],
@@ -95,22 +152,38 @@ class LogEntry:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the log entry to a dictionary for serialization."""
-        return {
-            "timestamp": self.timestamp.isoformat() + "Z",
-            "request_id": self.request_id,
-            "router_name": self.router_name,
-            "selected_model": self.selected_model,
-            "routing_explanation": self.routing_explanation,
-            "request": self.request,
-            "response": self.response,
-            "latency_ms": self.latency_ms,
-            "tokens": self.tokens,
-            "cost": self.cost,
-            "cost_estimated": self.cost_estimated,
-            "cost_source": self.cost_source,
-            "status": self.status,
-            "error_message": self.error_message
-        }
+        # Field order follows __slots__, which matches the declaration order;
+        # the raw nanosecond timestamp is written as an ISO 8601 "timestamp"
+        data = {"timestamp": _format_timestamp(self.timestamp_ns)}
+        for name in self.__slots__[1:]:
+            data[name] = getattr(self, name)
+        
+        # Only request views (ChainMap) are copied into a plain dict; plain
+        # dicts are serialized as they are
+        if not isinstance(self.request, dict):
+            data["request"] = dict(self.request)
+        return data
+
+
+def _datetime_to_ns(timestamp: datetime) -> int:
+    """Convert a datetime (naive ones are taken as UTC) to nanoseconds since the epoch."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - _EPOCH) // timedelta(microseconds=1) * 1000
+
+
+def _format_timestamp(timestamp_ns: int) -> str:
+    """Format an epoch timestamp in nanoseconds as ISO 8601 UTC.
+    
+    Matches datetime.isoformat() + "Z" on the naive UTC time: microseconds are
+    included unless they are zero.
+    """
+    seconds, nanoseconds = divmod(timestamp_ns, 1_000_000_000)
+    formatted = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))
+    microseconds = nanoseconds // 1000
+    if microseconds:
+        return f"{formatted}.{microseconds:06d}Z"
+    return f"{formatted}Z"
 
 
 class LoggerBackend(ABC):
@@ -125,6 +198,17 @@ class LoggerBackend(ABC):
         """
         pass
     
+    def log_entries(self, entries: Iterable[LogEntry]) -> None:
+        """Log several entries in order.
+        
+        Backends can override this to write a batch more efficiently.
+        
+        Args:
+            entries: The log entries to write
+        """
+        for entry in entries:
+            self.log_entry(entry)
+    
     @abstractmethod
     def close(self) -> None:
         """Close the logger and clean up resources."""
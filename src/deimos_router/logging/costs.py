@@ -1,5 +1,8 @@
 """Cost calculation utilities for logging."""
 
+from collections import ChainMap
+from functools import lru_cache
+from operator import attrgetter
 from typing import Any, Dict, Optional, Tuple
 import re
 
@@ -24,6 +27,46 @@ DEFAULT_MODEL_PRICING = {
     "default": {"input": 0.002, "output": 0.004}
 }
 
+# Token usage readers for OpenAI-style and Anthropic-style responses
+_OPENAI_USAGE = attrgetter('usage.prompt_tokens', 'usage.completion_tokens', 'usage.total_tokens')
+_ANTHROPIC_USAGE = attrgetter('token_usage.input_tokens', 'token_usage.output_tokens')
+
+# Model families used to normalize model names for pricing lookup. OpenAI
+# families are matched as prefixes, with longer names listed before the names
+# they extend so the most specific family wins; Anthropic families are matched
+# anywhere in the name since they may carry provider prefixes.
+_OPENAI_FAMILIES = ('gpt-4-turbo', 'gpt-4', 'gpt-3.5-turbo-16k', 'gpt-3.5-turbo')
+_OPENAI_FAMILY_PATTERN = re.compile('|'.join(map(re.escape, _OPENAI_FAMILIES)))
+_ANTHROPIC_FAMILIES = ('claude-3-5-sonnet', 'claude-3-opus', 'claude-3-sonnet', 'claude-3-haiku')
+
+
+@lru_cache(maxsize=1024)
+def _normalize_model_name(model: str) -> str:
+    """Normalize a model name for pricing lookup.
+    
+    Model names recur across requests, so results are memoized.
+    
+    Args:
+        model: The original model name
+        
+    Returns:
+        Normalized model name (the lowercased name if no rule matches)
+    """
+    # Remove version suffixes and normalize common variations
+    model = model.lower()
+    
+    # One C-level check over all OpenAI prefixes; the regex alternation then
+    # returns the first family (in priority order) that matches
+    if model.startswith(_OPENAI_FAMILIES):
+        return _OPENAI_FAMILY_PATTERN.match(model).group()
+    
+    for family in _ANTHROPIC_FAMILIES:
+        if family in model:
+            return family
+    
+    # Return original if no match found
+    return model
+
 
 class CostCalculator:
     """Calculates costs for API requests based on token usage and model pricing."""
@@ -34,9 +77,13 @@ class CostCalculator:
         Args:
             custom_pricing: Custom pricing data to override defaults
         """
-        self.pricing = DEFAULT_MODEL_PRICING.copy()
-        if custom_pricing:
-            self.pricing.update(custom_pricing)
+        # Layered view instead of a copy of the defaults; update_pricing
+        # writes to the first (instance-local) layer
+        self.pricing = ChainMap({}, custom_pricing or {}, DEFAULT_MODEL_PRICING)
+        
+        # Resolved (pricing, input price per token, output price per token)
+        # per model name, cleared when pricing changes
+        self._pricing_cache: Dict[str, Tuple[Dict[str, float], float, float]] = {}
     
     def extract_cost_from_response(self, response: Any) -> Tuple[Optional[float], bool, str]:
         """Extract cost information from API response.
@@ -51,8 +98,9 @@ class CostCalculator:
         # This varies by provider and may be in headers, metadata, or response body
         
         # Check for cost in response metadata (some providers include this)
-        if hasattr(response, '_deimos_metadata') and 'cost' in response._deimos_metadata:
-            return response._deimos_metadata['cost'], False, "api_response"
+        metadata = getattr(response, '_deimos_metadata', None)
+        if metadata is not None and 'cost' in metadata:
+            return metadata['cost'], False, "api_response"
         
         # Check for cost in response headers (if available)
         if hasattr(response, 'headers'):
@@ -79,31 +127,20 @@ class CostCalculator:
         Returns:
             Dictionary with token counts or None
         """
-        tokens = {}
-        
         # OpenAI format
-        if hasattr(response, 'usage'):
-            usage = response.usage
-            if hasattr(usage, 'prompt_tokens'):
-                tokens['prompt'] = usage.prompt_tokens
-            if hasattr(usage, 'completion_tokens'):
-                tokens['completion'] = usage.completion_tokens
-            if hasattr(usage, 'total_tokens'):
-                tokens['total'] = usage.total_tokens
-            elif 'prompt' in tokens and 'completion' in tokens:
-                tokens['total'] = tokens['prompt'] + tokens['completion']
+        try:
+            prompt, completion, total = _OPENAI_USAGE(response)
+        except AttributeError:
+            pass
+        else:
+            return {'prompt': prompt, 'completion': completion, 'total': total or prompt + completion}
         
         # Anthropic format (if different)
-        elif hasattr(response, 'token_usage'):
-            usage = response.token_usage
-            if hasattr(usage, 'input_tokens'):
-                tokens['prompt'] = usage.input_tokens
-            if hasattr(usage, 'output_tokens'):
-                tokens['completion'] = usage.output_tokens
-            if 'prompt' in tokens and 'completion' in tokens:
-                tokens['total'] = tokens['prompt'] + tokens['completion']
-        
-        return tokens if tokens else None
+        try:
+            prompt, completion = _ANTHROPIC_USAGE(response)
+        except AttributeError:
+            return None
+        return {'prompt': prompt, 'completion': completion, 'total': prompt + completion}
     
     def estimate_cost_from_tokens(
         self, 
@@ -119,22 +156,11 @@ class CostCalculator:
         Returns:
             Tuple of (cost, is_estimated, source)
         """
-        # Normalize model name for pricing lookup
-        normalized_model = self._normalize_model_name(model)
+        # Get per-token pricing for this model
+        _, input_price, output_price = self._resolve_pricing(model)
         
-        # Get pricing for this model
-        model_pricing = self.pricing.get(normalized_model, self.pricing["default"])
-        
-        # Calculate cost
-        cost = 0.0
-        
-        # Input tokens cost
-        if 'prompt' in tokens:
-            cost += (tokens['prompt'] / 1000) * model_pricing['input']
-        
-        # Output tokens cost
-        if 'completion' in tokens:
-            cost += (tokens['completion'] / 1000) * model_pricing['output']
+        # Calculate cost of input and output tokens
+        cost = tokens.get('prompt', 0) * input_price + tokens.get('completion', 0) * output_price
         
         return cost, True, "token_calculation"
     
@@ -174,31 +200,7 @@ class CostCalculator:
         Returns:
             Normalized model name
         """
-        # Remove version suffixes and normalize common variations
-        model = model.lower()
-        
-        # Handle OpenAI model variations
-        if model.startswith('gpt-4-turbo'):
-            return 'gpt-4-turbo'
-        elif model.startswith('gpt-4'):
-            return 'gpt-4'
-        elif model.startswith('gpt-3.5-turbo-16k'):
-            return 'gpt-3.5-turbo-16k'
-        elif model.startswith('gpt-3.5-turbo'):
-            return 'gpt-3.5-turbo'
-        
-        # Handle Anthropic model variations
-        elif 'claude-3-5-sonnet' in model:
-            return 'claude-3-5-sonnet'
-        elif 'claude-3-opus' in model:
-            return 'claude-3-opus'
-        elif 'claude-3-sonnet' in model:
-            return 'claude-3-sonnet'
-        elif 'claude-3-haiku' in model:
-            return 'claude-3-haiku'
-        
-        # Return original if no match found
-        return model
+        return _normalize_model_name(model)
     
     def update_pricing(self, model: str, input_price: float, output_price: float) -> None:
         """Update pricing for a specific model.
@@ -209,6 +211,7 @@ class CostCalculator:
             output_price: Price per 1K output tokens
         """
         self.pricing[model] = {"input": input_price, "output": output_price}
+        self._pricing_cache.clear()
     
     def get_pricing(self, model: str) -> Dict[str, float]:
         """Get pricing information for a model.
@@ -219,5 +222,24 @@ class CostCalculator:
         Returns:
             Dictionary with input and output pricing
         """
+        return self._resolve_pricing(model)[0]
+    
+    def _resolve_pricing(self, model: str) -> Tuple[Dict[str, float], float, float]:
+        """Resolve pricing for a model, with per-1K prices converted to per-token.
+        
+        Args:
+            model: The model name
+            
+        Returns:
+            Tuple of (pricing dict, input price per token, output price per token)
+        """
+        try:
+            return self._pricing_cache[model]
+        except KeyError:
+            pass
+        
         normalized_model = self._normalize_model_name(model)
-        return self.pricing.get(normalized_model, self.pricing["default"])
+        model_pricing = self.pricing.get(normalized_model, self.pricing["default"])
+        resolved = (model_pricing, model_pricing['input'] * 0.001, model_pricing['output'] * 0.001)
+        self._pricing_cache[model] = resolved
+        return resolved
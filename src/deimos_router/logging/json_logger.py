@@ -1,18 +1,69 @@
 """JSON file logger implementation with daily rotation."""
 
 import json
+import logging
 import os
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from .base import LoggerBackend, LogEntry
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Reports problems writing or reading log files (Python's last-resort handler
+# prints these to stderr when the application has not configured logging)
+_logger = logging.getLogger(__name__)
+
+
+# Log files are opened for appending at the OS level, so each batch is one
+# unbuffered write that lands after anything other processes have appended
+_OPEN_FLAGS = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+
+# Log files rotate on UTC day boundaries, tracked as days since the epoch
+_NS_PER_DAY = 86_400 * 1_000_000_000
+_EPOCH = datetime(1970, 1, 1)
+
+
+# Serialize log lines with orjson when it is installed (several times faster
+# than the stdlib), falling back to json with identical output otherwise
+if orjson is not None:
+    def _encode_line(data: Dict[str, Any]) -> bytes:
+        """Encode a log entry dict as a newline-terminated UTF-8 JSON line."""
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    
+    _decode_line = orjson.loads
+else:
+    # json.dumps builds a new encoder per call when given non-default options
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    
+    def _encode_line(data: Dict[str, Any]) -> bytes:
+        """Encode a log entry dict as a newline-terminated UTF-8 JSON line."""
+        return (_json_encoder.encode(data) + '\n').encode('utf-8')
+    
+    _decode_line = json.loads
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """Write all of data to a file descriptor, resuming after short writes."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
 
 class JSONFileLogger(LoggerBackend):
     """JSON file logger with daily rotation."""
     
-    def __init__(self, log_directory: str = "./logs", filename_prefix: str = "deimos-logs"):
+    def __init__(
+        self,
+        log_directory: str = "./logs",
+        filename_prefix: str = "deimos-logs"
+    ):
         """Initialize the JSON file logger.
         
         Args:
@@ -21,8 +72,11 @@ class JSONFileLogger(LoggerBackend):
         """
         self.log_directory = Path(log_directory)
         self.filename_prefix = filename_prefix
-        self._current_file = None
-        self._current_date = None
+        self._current_fd: Optional[int] = None
+        self._current_day: Optional[int] = None
+        
+        # Serializes writes and rotation between threads
+        self._lock = threading.Lock()
         
         # Create log directory if it doesn't exist
         self.log_directory.mkdir(parents=True, exist_ok=True)
@@ -40,24 +94,28 @@ class JSONFileLogger(LoggerBackend):
         filename = f"{self.filename_prefix}-{date_str}.jsonl"
         return self.log_directory / filename
     
-    def _ensure_file_open(self, entry_date: datetime) -> None:
-        """Ensure the correct log file is open for the given date.
+    def _ensure_file_open(self, timestamp_ns: int) -> None:
+        """Ensure the correct log file is open for the given timestamp.
+        
+        The day is compared as an integer; the filename is only formatted
+        when rotating to a new day.
         
         Args:
-            entry_date: The date of the log entry
+            timestamp_ns: The log entry timestamp in nanoseconds since the epoch
         """
-        entry_date_str = entry_date.strftime("%Y-%m-%d")
+        entry_day = timestamp_ns // _NS_PER_DAY
         
         # Check if we need to rotate to a new file
-        if self._current_date != entry_date_str:
+        if self._current_day != entry_day:
             # Close current file if open
-            if self._current_file:
-                self._current_file.close()
+            if self._current_fd is not None:
+                os.close(self._current_fd)
+                self._current_fd = None
             
             # Open new file
-            log_file_path = self._get_log_filename(entry_date)
-            self._current_file = open(log_file_path, 'a', encoding='utf-8')
-            self._current_date = entry_date_str
+            log_file_path = self._get_log_filename(_EPOCH + timedelta(days=entry_day))
+            self._current_fd = os.open(log_file_path, _OPEN_FLAGS, 0o644)
+            self._current_day = entry_day
     
     def log_entry(self, entry: LogEntry) -> None:
         """Log a complete entry to the JSON file.
@@ -65,26 +123,48 @@ class JSONFileLogger(LoggerBackend):
         Args:
             entry: The log entry to write
         """
+        self.log_entries((entry,))
+    
+    def log_entries(self, entries: Iterable[LogEntry]) -> None:
+        """Log several entries, writing each day's lines in a single call.
+        
+        Args:
+            entries: The log entries to write, in order
+        """
+        # Convert entries to JSON outside the lock
+        lines = []
+        for entry in entries:
+            try:
+                lines.append((entry.timestamp_ns, _encode_line(entry.to_dict())))
+            except Exception as e:
+                _logger.error("Error writing to log file: %s", e)
+        
+        if not lines:
+            return
+        
         try:
-            # Ensure correct file is open
-            self._ensure_file_open(entry.timestamp)
-            
-            # Convert entry to JSON and write
-            json_line = json.dumps(entry.to_dict(), ensure_ascii=False, separators=(',', ':'))
-            self._current_file.write(json_line + '\n')
-            self._current_file.flush()  # Ensure data is written immediately
+            with self._lock:
+                pending: List[bytes] = []
+                for timestamp_ns, line in lines:
+                    # Write out the previous day's lines before rotating
+                    if pending and timestamp_ns // _NS_PER_DAY != self._current_day:
+                        _write_all(self._current_fd, b''.join(pending))
+                        pending.clear()
+                    self._ensure_file_open(timestamp_ns)
+                    pending.append(line)
+                _write_all(self._current_fd, b''.join(pending))
             
         except Exception as e:
             # In case of logging errors, we don't want to crash the main application
-            # Could potentially log to stderr or a fallback location
-            print(f"Error writing to log file: {e}", file=__import__('sys').stderr)
+            _logger.error("Error writing to log file: %s", e)
     
     def close(self) -> None:
         """Close the current log file."""
-        if self._current_file:
-            self._current_file.close()
-            self._current_file = None
-            self._current_date = None
+        with self._lock:
+            if self._current_fd is not None:
+                os.close(self._current_fd)
+                self._current_fd = None
+                self._current_day = None
     
     def get_log_files(self) -> list[Path]:
         """Get a list of all log files in the log directory.
@@ -129,17 +209,17 @@ class JSONFileLogger(LoggerBackend):
         """
         entries = []
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'rb') as f:
                 for line in f:
                     line = line.strip()
                     if line:
                         try:
-                            entries.append(json.loads(line))
+                            entries.append(_decode_line(line))
                         except json.JSONDecodeError as e:
-                            print(f"Error parsing JSON line in {file_path}: {e}", file=__import__('sys').stderr)
+                            _logger.warning("Error parsing JSON line in %s: %s", file_path, e)
         except FileNotFoundError:
             pass  # File doesn't exist yet
         except Exception as e:
-            print(f"Error reading log file {file_path}: {e}", file=__import__('sys').stderr)
+            _logger.error("Error reading log file %s: %s", file_path, e)
         
         return entries
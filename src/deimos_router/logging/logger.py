@@ -1,13 +1,41 @@
 """Main request logger orchestrator."""
 
+import atexit
+import itertools
+import logging
+import queue
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional
 from contextlib import contextmanager
 
+from openai.types.chat import ChatCompletion
+
 from .base import LogEntry, LoggerBackend
-from .json_logger import JSONFileLogger
-from .costs import CostCalculator
 from ..config import config
+from ..metadata import DeimosMetadata
+
+if TYPE_CHECKING:
+    from .costs import CostCalculator
+
+
+_logger = logging.getLogger(__name__)
+
+# Maximum number of entries waiting for the background writer; entries
+# logged while the queue is full are dropped and counted
+_LOG_QUEUE_SIZE = 10000
+
+# Maximum number of queued entries handed to the backend in one call
+_LOG_BATCH_SIZE = 256
+
+# Queue sentinel telling the background writer to exit
+_STOP = object()
+
+# Status of successful entries left out of the log by sampling
+_SAMPLED_OUT = "sampled_out"
+
+# Monotonic clock used to time requests inside log_request
+_now = time.perf_counter_ns
 
 
 class RequestLogger:
@@ -16,22 +44,57 @@ class RequestLogger:
     def __init__(
         self, 
         backend: Optional[LoggerBackend] = None,
-        cost_calculator: Optional[CostCalculator] = None,
-        enabled: bool = True
+        cost_calculator: Optional["CostCalculator"] = None,
+        enabled: bool = True,
+        sample_rate: float = 1.0,
+        min_latency_ms: float = 0.0
     ):
         """Initialize the request logger.
         
         Args:
             backend: The logging backend to use (defaults to JSONFileLogger)
-            cost_calculator: Cost calculator instance (defaults to new CostCalculator)
+            cost_calculator: Cost calculator instance (defaults to new CostCalculator
+                when logging is enabled)
             enabled: Whether logging is enabled
+            sample_rate: Fraction of successful requests to log (1.0 logs all).
+                Errors are always logged.
+            min_latency_ms: Successful requests at least this slow are always
+                logged regardless of sample_rate (0 disables the threshold)
+            
+        Raises:
+            ValueError: If sample_rate is not between 0 and 1
         """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        
         self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.min_latency_ms = min_latency_ms
+        self._sample_counter = itertools.count()
         if enabled and backend is None:
+            # Imported here so the file backend is only loaded when used
+            from .json_logger import JSONFileLogger
             self.backend = JSONFileLogger()
         else:
             self.backend = backend
-        self.cost_calculator = cost_calculator or CostCalculator()
+        if enabled and cost_calculator is None:
+            # Imported here so pricing data is only loaded when costs are logged
+            from .costs import CostCalculator
+            cost_calculator = CostCalculator()
+        self.cost_calculator = cost_calculator
+        
+        # Completed entries are handed to a background writer thread so the
+        # request path never blocks on serialization or file I/O
+        self.dropped_entries = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=_LOG_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        if self.enabled and self.backend is not None:
+            self._writer = threading.Thread(
+                target=self._drain_queue, name="deimos-log-writer", daemon=True
+            )
+            self._writer.start()
+            # Write out queued entries if the interpreter exits without close()
+            atexit.register(self.close)
     
     @contextmanager
     def log_request(
@@ -39,7 +102,7 @@ class RequestLogger:
         router_name: Optional[str],
         selected_model: str,
         routing_explanation: List[Dict[str, Any]],
-        request_data: Dict[str, Any],
+        request_data: Mapping[str, Any],
         request_id: Optional[str] = None
     ):
         """Context manager for logging a complete request/response cycle.
@@ -55,8 +118,8 @@ class RequestLogger:
             LogEntry object that can be updated during the request
         """
         if not self.enabled:
-            # Create a dummy entry that does nothing
-            yield _DummyLogEntry()
+            # Hand out the shared entry that does nothing
+            yield _DUMMY_ENTRY
             return
         
         # Create initial log entry
@@ -68,26 +131,30 @@ class RequestLogger:
             request_id=request_id
         )
         
-        start_time = time.time()
+        start_ns = _now()
         
         try:
             yield entry
         except Exception as e:
             # Log the error
-            latency_ms = (time.time() - start_time) * 1000
+            latency_ms = (_now() - start_ns) / 1_000_000
             entry.complete_error(str(e), latency_ms)
             self._log_entry(entry)
             raise
         else:
             # If no exception occurred but entry wasn't completed, mark as success
             if entry.status == "pending":
-                latency_ms = (time.time() - start_time) * 1000
-                entry.complete_success(
-                    response={"status": "completed_without_response"},
-                    latency_ms=latency_ms
-                )
+                latency_ms = (_now() - start_ns) / 1_000_000
+                if self._sampled_out(latency_ms):
+                    entry.status = _SAMPLED_OUT
+                else:
+                    entry.complete_success(
+                        response={"status": "completed_without_response"},
+                        latency_ms=latency_ms
+                    )
             
-            self._log_entry(entry)
+            if entry.status != _SAMPLED_OUT:
+                self._log_entry(entry)
     
     def complete_request_success(
         self,
@@ -107,6 +174,11 @@ class RequestLogger:
         
         latency_ms = (time.time() - start_time) * 1000
         
+        # Entries left out by sampling skip the conversion and cost work below
+        if self._sampled_out(latency_ms):
+            entry.status = _SAMPLED_OUT
+            return
+        
         # Extract tokens from response
         tokens = self.cost_calculator.extract_tokens_from_response(response)
         
@@ -128,6 +200,28 @@ class RequestLogger:
             cost_source=cost_source
         )
     
+    def _sampled_out(self, latency_ms: float) -> bool:
+        """Decide whether a successful request is left out of the log.
+        
+        Sampling is deterministic: every 1/sample_rate-th sampled request is
+        kept, so the logged fraction is exact without random draws. Requests
+        at least min_latency_ms slow are always kept.
+        
+        Args:
+            latency_ms: The request's latency in milliseconds
+            
+        Returns:
+            True if the request should not be logged
+        """
+        if self.sample_rate >= 1.0:
+            return False
+        
+        if self.min_latency_ms > 0 and latency_ms >= self.min_latency_ms:
+            return False
+        
+        count = next(self._sample_counter)
+        return int((count + 1) * self.sample_rate) == int(count * self.sample_rate)
+    
     def _response_to_dict(self, response: Any) -> Dict[str, Any]:
         """Convert API response to dictionary for logging.
         
@@ -137,6 +231,12 @@ class RequestLogger:
         Returns:
             Dictionary representation of the response
         """
+        # Known response types have a dedicated converter using direct
+        # attribute access; anything else is probed attribute by attribute
+        converter = _RESPONSE_CONVERTERS.get(type(response))
+        if converter is not None:
+            return converter(response)
+        
         response_dict = {}
         
         # Handle OpenAI ChatCompletion response
@@ -165,8 +265,9 @@ class RequestLogger:
             }
         
         # Include deimos metadata if present
-        if hasattr(response, '_deimos_metadata'):
-            response_dict['_deimos_metadata'] = response._deimos_metadata
+        metadata = getattr(response, '_deimos_metadata', None)
+        if metadata is not None:
+            response_dict['_deimos_metadata'] = _metadata_to_dict(metadata)
         
         # If we couldn't extract standard fields, try to convert the whole object
         if not response_dict:
@@ -184,6 +285,33 @@ class RequestLogger:
         return response_dict
     
     def _log_entry(self, entry: LogEntry) -> None:
+        """Queue the log entry for the background writer.
+        
+        The entry's request is copied first, so changes the caller makes to
+        its messages or arguments after the call don't reach the log; the
+        explanation and response were built for the entry and are not shared.
+        Entries are dropped (counted in dropped_entries, with a warning) if
+        the queue is full. After close() entries are written synchronously.
+        
+        Args:
+            entry: The log entry to write
+        """
+        if self._writer is None:
+            self._write_entry(entry)
+            return
+        
+        entry.request = _snapshot_request(entry.request)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped_entries += 1
+            # Warn on the first drop and then every _LOG_QUEUE_SIZE drops
+            if self.dropped_entries % _LOG_QUEUE_SIZE == 1:
+                _logger.warning(
+                    "Log queue full, dropped %d log entries so far", self.dropped_entries
+                )
+    
+    def _write_entry(self, entry: LogEntry) -> None:
         """Write the log entry to the backend.
         
         Args:
@@ -193,10 +321,50 @@ class RequestLogger:
             self.backend.log_entry(entry)
         except Exception as e:
             # Don't let logging errors crash the main application
-            print(f"Error logging entry: {e}", file=__import__('sys').stderr)
+            _logger.error("Error logging entry: %s", e)
+    
+    def _drain_queue(self) -> None:
+        """Write queued entries to the backend until the stop sentinel arrives.
+        
+        Waits for one entry, then takes whatever else is already queued (up to
+        _LOG_BATCH_SIZE) so bursts reach the backend as a single batch.
+        """
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < _LOG_BATCH_SIZE:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                entries = [entry for entry in batch if entry is not _STOP]
+                if entries:
+                    try:
+                        self.backend.log_entries(entries)
+                    except Exception as e:
+                        # Don't let logging errors crash the writer thread
+                        _logger.error("Error logging entries: %s", e)
+                
+                if len(entries) != len(batch):
+                    return
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    def flush(self) -> None:
+        """Block until every queued entry has been handed to the backend."""
+        if self._writer is not None:
+            self._queue.join()
     
     def close(self) -> None:
-        """Close the logger and clean up resources."""
+        """Write out queued entries, stop the writer thread and close the backend."""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join()
+            atexit.unregister(self.close)
+        
         if self.backend:
             self.backend.close()
     
@@ -209,9 +377,72 @@ class RequestLogger:
         self.close()
 
 
+def _snapshot_request(request: Mapping[str, Any]) -> Dict[str, Any]:
+    """Copy a logged request so later changes by the caller don't reach the log.
+    
+    The request view becomes a plain dict and its messages list is copied;
+    the messages themselves are shared, since callers append new turns to a
+    conversation rather than editing earlier ones.
+    """
+    data = dict(request)
+    messages = data.get('messages')
+    if isinstance(messages, list):
+        data['messages'] = list(messages)
+    return data
+
+
+def _metadata_to_dict(metadata: Any) -> Any:
+    """Convert routing metadata to its logged form."""
+    if isinstance(metadata, DeimosMetadata):
+        return metadata.to_dict()
+    return metadata
+
+
+def _chat_completion_to_dict(response: ChatCompletion) -> Dict[str, Any]:
+    """Convert an OpenAI ChatCompletion for logging.
+    
+    Produces the same fields as the generic conversion in
+    RequestLogger._response_to_dict without probing for each attribute.
+    """
+    response_dict: Dict[str, Any] = {'model': response.model}
+    
+    if response.choices:
+        response_dict['choices'] = [
+            {
+                'message': {'role': choice.message.role, 'content': choice.message.content},
+                'finish_reason': choice.finish_reason
+            }
+            for choice in response.choices
+        ]
+    
+    usage = response.usage
+    if usage is not None:
+        response_dict['usage'] = {
+            'prompt_tokens': usage.prompt_tokens,
+            'completion_tokens': usage.completion_tokens,
+            'total_tokens': usage.total_tokens
+        }
+    else:
+        response_dict['usage'] = {'prompt_tokens': None, 'completion_tokens': None, 'total_tokens': None}
+    
+    metadata = getattr(response, '_deimos_metadata', None)
+    if metadata is not None:
+        response_dict['_deimos_metadata'] = _metadata_to_dict(metadata)
+    
+    return response_dict
+
+
+# Response converters keyed by exact response type
+_RESPONSE_CONVERTERS: Dict[type, Callable[[Any], Dict[str, Any]]] = {
+    ChatCompletion: _chat_completion_to_dict,
+}
+
+
 class _DummyLogEntry:
     """Dummy log entry for when logging is disabled."""
     
+    __slots__ = ('status',)
+    
     def __init__(self):
         self.status = "disabled"
     
@@ -224,6 +455,10 @@ class _DummyLogEntry:
         pass
 
 
+# Stateless, so a single instance is shared by all disabled-logging requests
+_DUMMY_ENTRY = _DummyLogEntry()
+
+
 # Global logger instance
 _global_logger: Optional[RequestLogger] = None
 
@@ -238,15 +473,19 @@ def get_logger() -> RequestLogger:
     if _global_logger is None:
         # Initialize with configuration settings
         backend = None
+        cost_calculator = None
         if config.logging_enabled:
+            from .costs import CostCalculator
+            from .json_logger import JSONFileLogger
             backend = JSONFileLogger(log_directory=config.log_directory)
-        
-        cost_calculator = CostCalculator(custom_pricing=config.custom_pricing)
+            cost_calculator = CostCalculator(custom_pricing=config.custom_pricing)
         
         _global_logger = RequestLogger(
             backend=backend,
             cost_calculator=cost_calculator,
-            enabled=config.logging_enabled
+            enabled=config.logging_enabled,
+            sample_rate=config.log_sample_rate,
+            min_latency_ms=config.log_min_latency_ms
         )
     return _global_logger
 
@@ -254,35 +493,56 @@ def get_logger() -> RequestLogger:
 def set_logger(logger: RequestLogger) -> None:
     """Set the global logger instance.
     
+    The logger it replaces is closed, writing out its queued entries and
+    stopping its writer thread.
+    
     Args:
         logger: The RequestLogger instance to use globally
     """
     global _global_logger
-    _global_logger = logger
+    previous, _global_logger = _global_logger, logger
+    if previous is not None and previous is not logger:
+        previous.close()
 
 
 def configure_logging(
     enabled: bool = True,
     log_directory: str = "./logs",
-    custom_pricing: Optional[Dict[str, Dict[str, float]]] = None
+    custom_pricing: Optional[Dict[str, Dict[str, float]]] = None,
+    sample_rate: float = 1.0,
+    min_latency_ms: float = 0.0
 ) -> RequestLogger:
     """Configure the global logger with common settings.
     
+    The previous global logger is closed.
+    
     Args:
         enabled: Whether logging is enabled
         log_directory: Directory for log files
         custom_pricing: Custom model pricing data
+        sample_rate: Fraction of successful requests to log (errors are always logged)
+        min_latency_ms: Successful requests at least this slow are always logged
         
     Returns:
         The configured RequestLogger instance
+        
+    Raises:
+        ValueError: If sample_rate is not between 0 and 1
     """
-    backend = JSONFileLogger(log_directory=log_directory) if enabled else None
-    cost_calculator = CostCalculator(custom_pricing=custom_pricing)
+    backend = None
+    cost_calculator = None
+    if enabled:
+        from .costs import CostCalculator
+        from .json_logger import JSONFileLogger
+        backend = JSONFileLogger(log_directory=log_directory)
+        cost_calculator = CostCalculator(custom_pricing=custom_pricing)
     
     logger = RequestLogger(
         backend=backend,
         cost_calculator=cost_calculator,
-        enabled=enabled
+        enabled=enabled,
+        sample_rate=sample_rate,
+        min_latency_ms=min_latency_ms
     )
     
     set_logger(logger)
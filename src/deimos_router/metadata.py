@@ -0,0 +1,96 @@
+"""Routing metadata attached to chat completion responses."""
+
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, List, Optional
+
+from .rules.base import ExplanationEntry
+
+
+@dataclass(slots=True, eq=False)
+class DeimosMetadata(Mapping):
+    """Routing information attached to a response as ``_deimos_metadata``.
+
+    A read-only mapping (``metadata['router_used']``, ``'explain' in metadata``,
+    ``dict(metadata)``, ``.items()``, iteration) for code written against the
+    previous dict form, comparing equal to that dict. Unset optional fields
+    behave like missing keys. Use ``to_dict()`` for a mutable or
+    JSON-serializable copy.
+
+    The routing explanation is kept as the router's ExplanationEntry objects
+    and only converted to dicts when ``explain`` is read.
+    """
+
+    router_used: str
+    selected_model: str
+    original_model_field: Optional[str]
+    explanation_entries: Optional[List[ExplanationEntry]] = None
+
+    @property
+    def explain(self) -> Optional[List[Dict[str, Any]]]:
+        """The routing explanation as a list of dicts, or None if not requested."""
+        if self.explanation_entries is None:
+            return None
+        return [entry.to_dict() for entry in self.explanation_entries]
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key == 'explain':
+            return self.explanation_entries is not None
+        return key in _FIELD_NAMES and getattr(self, key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name in _FIELD_NAMES if name in self)
+
+    def __len__(self) -> int:
+        return sum(1 for name in _FIELD_NAMES if name in self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a metadata value, or default if it is not set."""
+        return getattr(self, key) if key in self else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary format, leaving out unset optional fields."""
+        return {name: getattr(self, name) for name in _FIELD_NAMES if name in self}
+
+
+# Mapping keys, in order; the explanation entries are exposed as 'explain'
+_FIELD_NAMES = tuple(
+    'explain' if field.name == 'explanation_entries' else field.name
+    for field in fields(DeimosMetadata)
+)
+
+
+def get_metadata(response: Any) -> Optional[DeimosMetadata]:
+    """Get the routing metadata attached to a response.
+
+    Args:
+        response: A response returned by ``chat.completions.create``
+
+    Returns:
+        The DeimosMetadata for routed calls, or None for direct model calls
+    """
+    return getattr(response, '_deimos_metadata', None)
+
+
+def get_explanation(response: Any) -> Optional[List[Dict[str, Any]]]:
+    """Get the routing explanation of a response as a list of dicts.
+
+    The explanation entries are converted here rather than when the response
+    is created, so callers that never read the explanation don't pay for it.
+
+    Args:
+        response: A response returned by ``chat.completions.create``
+
+    Returns:
+        One dict per evaluated rule, or None if the response carries no
+        explanation
+    """
+    metadata = get_metadata(response)
+    if metadata is None:
+        return None
+    return metadata.explain
@@ -1,10 +1,12 @@
 """Router class for model selection."""
 
 import random
+import threading
+from collections import ChainMap, OrderedDict
 from typing import Any, Dict, List, Optional, Union
 
-from .rules import Rule, Decision, get_rule
-from .rules.base import ExplanationEntry
+from .rules import Rule, Decision, TaskRule, config_version, get_rule, registry_version
+from .rules.base import ExplanationEntry, REQUEST_CACHE_KEY
 from .default_models import get_default_router_models
 
 
@@ -19,6 +21,7 @@ class Router:
         name: str, 
         rules: Optional[List[Union[str, Rule]]] = None,
         default: Optional[str] = None,
+        decision_cache_size: int = 0,
     ):
         """Initialize router with a name and routing rules.
         
@@ -27,11 +30,44 @@ class Router:
             rules: List of rule names (strings) or Rule objects to evaluate in order
             default: Default model to use if no rules match
             models: Legacy parameter for backward compatibility (will be ignored if rules provided)
+            decision_cache_size: Number of routing decisions to remember, keyed
+                on the request's messages and task (0 disables). Only enable
+                this when every rule decides from the messages and task alone;
+                repeated requests then skip rule evaluation, including LLM calls.
+                The cache is dropped when the rules, the rule registry, a rule's
+                attributes or its triggers change; after editing other rule
+                state in place (e.g. a rule's language_mappings dict), call
+                clear_decision_cache().
         """
         self.name = name
-        self.rules = rules or []
         self.default = default or "gpt-3.5-turbo"
         
+        # (task, messages) -> (model, explanation or None), least recently
+        # used first; cleared when the rules, registry_version() or
+        # config_version() change
+        self.decision_cache_size = decision_cache_size
+        self._decision_cache: "OrderedDict[tuple, tuple[str, Optional[List[ExplanationEntry]]]]" = OrderedDict()
+        # (registry_version(), config_version(), rules) the cache was built for
+        self._decision_cache_state: tuple = (None, None, [])
+        self._decision_cache_lock = threading.Lock()
+        
+        # self.rules with names resolved to registered Rule objects, rebuilt
+        # when the rules or the rule registry change
+        self._resolved_rules: List[Rule] = []
+        self._resolved_rules_state: Optional[tuple] = None
+        
+        # (config_version(), indexed rules, task index, complete): the task ->
+        # (position, rule, model) index for the leading TaskRules, built when
+        # the rules are set and rebuilt when they or their triggers change.
+        # complete is True when every rule is a plain TaskRule, so the index
+        # alone decides
+        self._task_index: tuple = (None, [], {}, False)
+        
+        # Shared explanation entry for falling back to self.default
+        self._default_entry: Optional[ExplanationEntry] = None
+        
+        self.rules = rules or []
+        
         # Automatically register the router
         register_router(self)
     
@@ -46,7 +82,21 @@ class Router:
         """
         # If we have rules, use rule-based selection
         if self.rules:
-            return self._select_model_by_rules(request_data or {})
+            request_data = request_data or {}
+            hit = self._lookup_task_index(request_data)
+            if hit is not None:
+                return hit[2]
+            
+            key = self._decision_cache_key(request_data)
+            if key is not None:
+                cached = self._get_cached_decision(key)
+                if cached is not None:
+                    return cached[0]
+            
+            model = self._select_model_by_rules(request_data)
+            if key is not None:
+                self._cache_decision(key, model, None)
+            return model
         
         # Final fallback
         return self.default
@@ -64,189 +114,365 @@ class Router:
         
         # If we have rules, use rule-based selection with explanation
         if self.rules:
-            model, explanation = self._select_model_by_rules_with_explanation(request_data or {})
+            request_data = request_data or {}
+            hit = self._lookup_task_index(request_data)
+            if hit is not None:
+                return self._explain_task_index_hit(request_data, hit)
+            
+            key = self._decision_cache_key(request_data)
+            if key is not None:
+                cached = self._get_cached_decision(key)
+                if cached is not None and cached[1] is not None:
+                    return cached[0], list(cached[1])
+            
+            model, explanation = self._select_model_by_rules_with_explanation(request_data)
+            if key is not None:
+                self._cache_decision(key, model, list(explanation))
             if model:
                 return model, explanation
         
         # Final fallback
-        explanation.append(ExplanationEntry("default", "default", "None", self.default))
+        explanation.append(self._default_explanation_entry())
         return self.default, explanation
     
-    def _select_model_by_rules(self, request_data: Dict[str, Any]) -> str:
-        """Select model using the rule-based system.
+    @property
+    def rules(self) -> List[Union[str, Rule]]:
+        """Rule names or Rule objects evaluated in order."""
+        return self._rules
+    
+    @rules.setter
+    def rules(self, rules: List[Union[str, Rule]]) -> None:
+        self._rules = rules
+        self._build_task_index()
+    
+    def _build_task_index(self) -> None:
+        """Build the task index for the TaskRules at the start of the rule list.
+        
+        Only the leading run of plain TaskRule objects is indexed: once any
+        other rule is reached it may decide first, so later TaskRules can't be
+        answered from the index. Each task maps to the first of those rules
+        that handles it, or to None when that rule points to another rule and
+        the full chain must be evaluated. When the router has only TaskRules
+        the index is complete and marked as such.
+        """
+        version = config_version()
+        rules = list(self.rules)
+        index: Dict[str, Optional[tuple[int, TaskRule, str]]] = {}
+        complete = True
+        for position, rule in enumerate(rules):
+            if type(rule) is not TaskRule:
+                complete = False
+                break
+            for task, value in rule.triggers.items():
+                if task in index:
+                    continue
+                if Decision(value).is_model():
+                    index[task] = (position, rule, value)
+                else:
+                    index[task] = None
+        self._task_index = (version, rules, index, complete)
+    
+    def _get_task_index(self) -> tuple:
+        """Get the task index, rebuilding it if the rules or any triggers changed.
+        
+        Trigger edits are noticed through config_version(), and rules added to
+        or removed from self.rules in place through the copy kept with the
+        index, so the check costs no more than comparing the rule list.
+        
+        Returns:
+            (config_version(), indexed rules, task index, complete)
+        """
+        task_index = self._task_index
+        if task_index[0] != config_version() or task_index[1] != self.rules:
+            self._build_task_index()
+            task_index = self._task_index
+        return task_index
+    
+    def _lookup_task_index(self, request_data: Dict[str, Any]) -> Optional[tuple[int, Optional[TaskRule], str]]:
+        """Look up the request's task in the task index.
+        
+        For a router made only of TaskRules, a request without a task (or with
+        a task no rule handles) can't be matched by any rule, so it resolves
+        to the default without evaluating them.
         
         Args:
             request_data: The complete request data
             
         Returns:
-            The selected model name
+            (position, rule, model) if a leading TaskRule selects a model directly,
+            (number of rules, None, default) if no rule can match, None otherwise
         """
-        for rule_ref in self.rules:
-            # Get the rule (either by name or direct reference)
-            if isinstance(rule_ref, str):
-                # Strip deimos/rules/ prefix if present
-                rule_name = rule_ref
-                if rule_name.startswith('deimos/rules/'):
-                    rule_name = rule_name[13:]  # Remove 'deimos/rules/' prefix
-                rule = get_rule(rule_name)
-                if rule is None:
-                    continue  # Skip unknown rules
-            else:
-                rule = rule_ref
-            
-            # Evaluate the rule chain
-            selected_model = self._evaluate_rule_chain(rule, request_data)
-            if selected_model:
-                return selected_model
+        task = request_data.get('task')
+        _, rules, index, complete = self._get_task_index()
+        try:
+            if task is not None and task in index:
+                return index[task]
+        except TypeError:
+            # Unhashable task values can't be indexed
+            return None
         
-        # No rules matched, use default
-        return self.default
+        if complete:
+            return len(rules), None, self.default
+        return None
     
-    def _select_model_by_rules_with_explanation(self, request_data: Dict[str, Any]) -> tuple[Optional[str], List[ExplanationEntry]]:
-        """Select model using the rule-based system with explanation tracking.
+    def _explain_task_index_hit(
+        self,
+        request_data: Dict[str, Any],
+        hit: tuple[int, Optional[TaskRule], str]
+    ) -> tuple[str, List[ExplanationEntry]]:
+        """Build the explanation the rule chain would have produced for an index hit.
         
         Args:
             request_data: The complete request data
+            hit: The (position, rule, model) index entry
             
         Returns:
             Tuple of (selected_model, explanation_entries)
         """
-        explanation = []
+        position, rule, model = hit
+        task = request_data.get('task')
+        explanation = [
+            ExplanationEntry(earlier.get_rule_type(), earlier.name, task, "no_match")
+            for earlier in self.rules[:position]
+        ]
+        if rule is None:
+            explanation.append(self._default_explanation_entry())
+        else:
+            explanation.append(ExplanationEntry(rule.get_rule_type(), rule.name, task, model))
+        return model, explanation
+    
+    def _default_explanation_entry(self) -> ExplanationEntry:
+        """Get the explanation entry for falling back to the default model.
         
-        for rule_ref in self.rules:
-            # Get the rule (either by name or direct reference)
-            if isinstance(rule_ref, str):
-                # Strip deimos/rules/ prefix if present
-                rule_name = rule_ref
-                if rule_name.startswith('deimos/rules/'):
-                    rule_name = rule_name[13:]  # Remove 'deimos/rules/' prefix
-                rule = get_rule(rule_name)
-                if rule is None:
-                    continue  # Skip unknown rules
-            else:
-                rule = rule_ref
+        The entry is built once and shared between requests (entries are not
+        modified after creation); it is rebuilt if self.default changes.
+        """
+        entry = self._default_entry
+        if entry is None or entry.decision != self.default:
+            entry = ExplanationEntry("default", "default", "None", self.default)
+            self._default_entry = entry
+        return entry
+    
+    def _get_resolved_rules(self) -> List[Rule]:
+        """Get the router's rules with rule names resolved to Rule objects.
+        
+        Names (with or without the deimos/rules/ prefix) are looked up in the
+        rule registry once rather than on every request; unknown names are
+        skipped. The list is rebuilt when self.rules or the registry changes.
+        
+        Returns:
+            The Rule objects to evaluate, in order
+        """
+        version = registry_version()
+        state = self._resolved_rules_state
+        if state is None or state[0] != version or state[1] != self.rules:
+            resolved = []
+            for rule_ref in self.rules:
+                # Get the rule (either by name or direct reference)
+                if isinstance(rule_ref, str):
+                    # Strip deimos/rules/ prefix if present
+                    rule_name = rule_ref
+                    if rule_name.startswith('deimos/rules/'):
+                        rule_name = rule_name[13:]  # Remove 'deimos/rules/' prefix
+                    rule = get_rule(rule_name)
+                    if rule is None:
+                        continue  # Skip unknown rules
+                    resolved.append(rule)
+                else:
+                    resolved.append(rule_ref)
+            self._resolved_rules = resolved
+            self._resolved_rules_state = (version, list(self.rules))
+        return self._resolved_rules
+    
+    def _decision_cache_key(self, request_data: Dict[str, Any]) -> Optional[tuple]:
+        """Build the decision cache key for a request.
+        
+        Args:
+            request_data: The complete request data
             
-            # Evaluate the rule chain with explanation
-            selected_model, rule_explanation = self._evaluate_rule_chain_with_explanation(rule, request_data)
-            explanation.extend(rule_explanation)
+        Returns:
+            Hashable (task, ((role, content), ...)) key, or None if caching is
+            disabled or the request can't be keyed (e.g. multimodal content)
+        """
+        if not self.decision_cache_size:
+            return None
+        
+        try:
+            key = (
+                request_data.get('task'),
+                tuple((message.get('role'), message.get('content'))
+                      for message in request_data.get('messages') or ())
+            )
+            hash(key)
+        except (AttributeError, TypeError):
+            return None
+        return key
+    
+    def _get_cached_decision(self, key: tuple) -> Optional[tuple[str, Optional[List[ExplanationEntry]]]]:
+        """Look up a cached decision, dropping the cache if it has gone stale."""
+        registry = registry_version()
+        version = config_version()
+        with self._decision_cache_lock:
+            state = self._decision_cache_state
+            if state[0] != registry or state[1] != version or state[2] != self.rules:
+                self._decision_cache.clear()
+                self._decision_cache_state = (registry, version, list(self.rules))
+                return None
             
-            if selected_model:
-                return selected_model, explanation
+            cached = self._decision_cache.get(key)
+            if cached is not None:
+                self._decision_cache.move_to_end(key)
+            return cached
+    
+    def _cache_decision(self, key: tuple, model: str, explanation: Optional[List[ExplanationEntry]]) -> None:
+        """Remember a decision, evicting the least recently used one when full."""
+        with self._decision_cache_lock:
+            self._decision_cache[key] = (model, explanation)
+            self._decision_cache.move_to_end(key)
+            if len(self._decision_cache) > self.decision_cache_size:
+                self._decision_cache.popitem(last=False)
+    
+    def clear_decision_cache(self) -> None:
+        """Forget all cached routing decisions.
         
-        # No rules matched, add default explanation
-        explanation.append(ExplanationEntry("default", "default", "None", self.default))
-        return self.default, explanation
+        Needed only after changing rule state that the cache can't see, such
+        as editing a dict or list attribute of a rule in place.
+        """
+        with self._decision_cache_lock:
+            self._decision_cache.clear()
     
-    def _evaluate_rule_chain(self, rule: Rule, request_data: Dict[str, Any], max_depth: int = 10) -> Optional[str]:
-        """Evaluate a chain of rules until we get a model or exhaust the chain.
+    def _with_request_cache(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap request data with a fresh per-request memo shared by the rules.
+        
+        Text-scanning rules extract the message text through the memo, so it
+        is joined once per request no matter how many rules read it.
+        """
+        return ChainMap({REQUEST_CACHE_KEY: {}}, request_data)
+    
+    def _select_model_by_rules(
+        self,
+        request_data: Dict[str, Any],
+        explanation: Optional[List[ExplanationEntry]] = None
+    ) -> str:
+        """Select model using the rule-based system.
         
         Args:
-            rule: The starting rule
-            request_data: The request data
-            max_depth: Maximum depth to prevent infinite loops
+            request_data: The complete request data
+            explanation: List to append explanation entries to, or None to
+                skip building them
             
         Returns:
-            The selected model name, or None if no decision reached
+            The selected model name
         """
-        current_rule = rule
-        depth = 0
+        request_data = self._with_request_cache(request_data)
         
-        while current_rule and depth < max_depth:
-            decision = current_rule.evaluate(request_data)
-            
-            if decision.is_model():
-                return decision.get_model()
-            elif decision.is_rule():
-                # Get rule name and resolve it to a rule object
-                rule_name = decision.get_rule_name()
-                # Strip deimos/rules/ prefix if present
-                if rule_name and rule_name.startswith('deimos/rules/'):
-                    rule_name = rule_name[13:]  # Remove 'deimos/rules/' prefix
-                current_rule = get_rule(rule_name)
-                if current_rule is None:
-                    # Rule not found, end chain
-                    return None
-                depth += 1
-            else:
-                # Decision is None, rule chain ends without a model
-                return None
+        for rule in self._get_resolved_rules():
+            # Evaluate the rule chain
+            selected_model = self._evaluate_rule_chain(rule, request_data, explanation=explanation)
+            if selected_model:
+                return selected_model
         
-        # Max depth reached or no valid decision
-        return None
+        # No rules matched, use default
+        if explanation is not None:
+            explanation.append(self._default_explanation_entry())
+        return self.default
+    
+    def _select_model_by_rules_with_explanation(self, request_data: Dict[str, Any]) -> tuple[Optional[str], List[ExplanationEntry]]:
+        """Select model using the rule-based system with explanation tracking.
+        
+        Args:
+            request_data: The complete request data
+            
+        Returns:
+            Tuple of (selected_model, explanation_entries)
+        """
+        explanation: List[ExplanationEntry] = []
+        return self._select_model_by_rules(request_data, explanation), explanation
     
-    def _evaluate_rule_chain_with_explanation(self, rule: Rule, request_data: Dict[str, Any], max_depth: int = 10) -> tuple[Optional[str], List[ExplanationEntry]]:
-        """Evaluate a chain of rules with explanation tracking.
+    def _evaluate_rule_chain(
+        self,
+        rule: Rule,
+        request_data: Dict[str, Any],
+        explanation: Optional[List[ExplanationEntry]] = None
+    ) -> Optional[str]:
+        """Evaluate a chain of rules until we get a model or exhaust the chain.
+        
+        A chain that leads back to a rule it already evaluated is a cycle and
+        ends without a model.
         
         Args:
             rule: The starting rule
             request_data: The request data
-            max_depth: Maximum depth to prevent infinite loops
+            explanation: List to append an entry to for each evaluated rule,
+                or None to skip building them
             
         Returns:
-            Tuple of (selected_model, explanation_entries)
+            The selected model name, or None if no decision reached
         """
-        explanation = []
         current_rule = rule
-        depth = 0
+        visited = set()
         
-        while current_rule and depth < max_depth:
+        while id(current_rule) not in visited:
+            visited.add(id(current_rule))
             decision = current_rule.evaluate(request_data)
             
             if decision.is_model():
                 # Final decision - model selected
-                explanation.append(ExplanationEntry(
-                    rule_type=current_rule.get_rule_type(),
-                    rule_name=current_rule.name,
-                    rule_trigger=decision.trigger,
-                    decision=decision.get_model()
-                ))
-                return decision.get_model(), explanation
+                model = decision.get_model()
+                if explanation is not None:
+                    explanation.append(ExplanationEntry(
+                        rule_type=current_rule.get_rule_type(),
+                        rule_name=current_rule.name,
+                        rule_trigger=decision.trigger,
+                        decision=model
+                    ))
+                return model
             elif decision.is_rule():
                 # Continue to next rule
-                explanation.append(ExplanationEntry(
-                    rule_type=current_rule.get_rule_type(),
-                    rule_name=current_rule.name,
-                    rule_trigger=decision.trigger,
-                    decision="continue"
-                ))
-                # Get rule name and resolve it to a rule object
-                rule_name = decision.get_rule_name()
-                # Strip deimos/rules/ prefix if present
-                if rule_name and rule_name.startswith('deimos/rules/'):
-                    rule_name = rule_name[13:]  # Remove 'deimos/rules/' prefix
-                current_rule = get_rule(rule_name)
+                if explanation is not None:
+                    explanation.append(ExplanationEntry(
+                        rule_type=current_rule.get_rule_type(),
+                        rule_name=current_rule.name,
+                        rule_trigger=decision.trigger,
+                        decision="continue"
+                    ))
+                # Resolve the rule name to a rule object; is_rule() already
+                # established that the value has the deimos/rules/ prefix
+                current_rule = get_rule(decision.value[13:])  # Remove 'deimos/rules/' prefix
                 if current_rule is None:
                     # Rule not found, end chain
-                    return None, explanation
-                depth += 1
+                    return None
             else:
                 # Decision is None, rule chain ends without a model
-                explanation.append(ExplanationEntry(
-                    rule_type=current_rule.get_rule_type(),
-                    rule_name=current_rule.name,
-                    rule_trigger=decision.trigger,
-                    decision="no_match"
-                ))
-                return None, explanation
-        
-        # Max depth reached
-        if current_rule:
+                if explanation is not None:
+                    explanation.append(ExplanationEntry(
+                        rule_type=current_rule.get_rule_type(),
+                        rule_name=current_rule.name,
+                        rule_trigger=decision.trigger,
+                        decision="no_match"
+                    ))
+                return None
+        
+        # The chain came back to a rule it already evaluated
+        if explanation is not None:
             explanation.append(ExplanationEntry(
                 rule_type=current_rule.get_rule_type(),
                 rule_name=current_rule.name,
-                rule_trigger="max_depth_reached",
+                rule_trigger="cycle_detected",
                 decision="no_match"
             ))
         
-        return None, explanation
-    
+        return None
     
     def __repr__(self) -> str:
         return f"Router('{self.name}', rules={self.rules!r}, default={self.default!r})"
 
 
-# Global registry for routers
-_router_registry = {}
+# Global registry for routers. Only mutated in place (never rebound), so
+# lookups can use the bound get; single dict operations are atomic, so
+# readers need no lock against concurrent registration
+_router_registry: Dict[str, Router] = {}
+_get_registered_router = _router_registry.get
 
 
 def register_router(router: Router) -> None:
@@ -267,7 +493,7 @@ def get_router(name: str) -> Optional[Router]:
     Returns:
         The router instance if found, None otherwise
     """
-    return _router_registry.get(name)
+    return _get_registered_router(name)
 
 
 def list_routers() -> List[str]:
@@ -1,7 +1,7 @@
 """Rule-based model selection system."""
 
 from typing import List, Optional
-from .base import Decision, Rule
+from .base import Decision, Rule, config_version
 from .task_rule import TaskRule
 from .code_rule import CodeRule
 from .code_language_rule import CodeLanguageRule
@@ -13,6 +13,10 @@ from .conversation_context_rule import ConversationContextRule
 # Global registry for rules (similar to router registry)
 _rule_registry = {}
 
+# Bumped whenever the registry changes, so routers can tell when state derived
+# from rule names is stale
+_registry_version = 0
+
 
 def register_rule(rule: Rule) -> None:
     """Register a rule globally by name.
@@ -20,7 +24,9 @@ def register_rule(rule: Rule) -> None:
     Args:
         rule: The rule instance to register
     """
+    global _registry_version
     _rule_registry[rule.name] = rule
+    _registry_version += 1
 
 
 def get_rule(name: str) -> Optional[Rule]:
@@ -46,7 +52,14 @@ def list_rules() -> List[str]:
 
 def clear_rules() -> None:
     """Clear all registered rules. Mainly for testing."""
+    global _registry_version
     _rule_registry.clear()
+    _registry_version += 1
+
+
+def registry_version() -> int:
+    """Get a counter that changes whenever rules are registered or cleared."""
+    return _registry_version
 
 
 # Export all the classes and functions
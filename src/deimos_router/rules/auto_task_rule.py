@@ -1,9 +1,20 @@
 """Automatic task detection rule implementation."""
 
-from typing import Any, Dict, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
 import openai
 from ..config import config
-from .base import Rule, Decision
+from .base import Rule, Decision, TriggerDict
+
+
+# Number of characters of message text sent to the LLM for task detection
+_MAX_PROMPT_TEXT = 2000
+
+# Messages shorter than this (ignoring surrounding whitespace) carry too
+# little to classify, so they go to the default without an LLM call
+_MIN_DETECTION_TEXT = 8
 
 
 class AutoTaskRule(Rule):
@@ -11,19 +22,56 @@ class AutoTaskRule(Rule):
     
     def __init__(self, name: str, triggers: Dict[str, str], 
                  default: Optional[str] = None,
-                 llm_model: Optional[str] = None):
+                 llm_model: Optional[str] = None,
+                 cache_size: int = 1024):
         """Initialize an AutoTaskRule.
         
         Args:
             name: The name of this rule
-            triggers: Dictionary mapping task names to model names or rule names (deimos/rules/rule-name)
+            triggers: Dictionary mapping task names to model names or rule names (deimos/rules/rule-name);
+                the rule keeps its own copy
             default: Default model name or rule name (deimos/rules/rule-name) when no task is detected or mapped
             llm_model: Model to use for task detection. If None, uses the default model from config.
+            cache_size: Number of detected tasks to remember per prompt, so
+                repeated messages skip the LLM call (0 disables)
         """
         super().__init__(name)
         self.triggers = triggers
         self.default = default
         self.llm_model = llm_model or config.get_default_model('task_classification')
+        
+        # (llm_model, task names, prompt text) -> detected task, least
+        # recently used first; failed LLM calls are not cached
+        self.cache_size = cache_size
+        self._task_cache: "OrderedDict[Tuple[str, Tuple[str, ...], str], Optional[str]]" = OrderedDict()
+        self._task_cache_lock = threading.Lock()
+        
+        # Cache key -> Future for LLM calls in progress, so concurrent
+        # requests with the same prompt share one call (guarded by the
+        # cache lock)
+        self._in_flight: Dict[Tuple[str, Tuple[str, ...], str], "Future[Optional[str]]"] = {}
+        
+        # (task names, prompt prefix, lowercased task -> task), rebuilt when
+        # the task names change
+        self._prompt_parts: Optional[Tuple[Tuple[str, ...], str, Dict[str, str]]] = None
+        
+        # OpenAI client reused across detections (keeping its connections
+        # alive), with the (api_key, api_url) it was created for
+        self._client: Optional[openai.OpenAI] = None
+        self._client_credentials: Optional[Tuple[str, Optional[str]]] = None
+        
+        # Shared fallback decision for self.default
+        self._default_decision: Optional[Decision] = None
+    
+    @property
+    def triggers(self) -> Dict[str, str]:
+        """Mapping of task names to model names or rule names."""
+        return self._triggers
+    
+    @triggers.setter
+    def triggers(self, triggers: Dict[str, str]) -> None:
+        # Kept in a TriggerDict so routers notice edits to it
+        self._triggers = TriggerDict(triggers)
     
     def evaluate(self, request_data: Dict[str, Any]) -> Decision:
         """Evaluate based on the task detected from message content.
@@ -37,8 +85,8 @@ class AutoTaskRule(Rule):
         # Extract text content from messages
         text_content = self._extract_text_content(request_data)
         
-        if not text_content:
-            return Decision(self.default)
+        if len(text_content.strip()) < _MIN_DETECTION_TEXT:
+            return self._get_default_decision()
         
         # Use LLM to detect the task
         detected_task = self._detect_task_llm(text_content)
@@ -47,20 +95,19 @@ class AutoTaskRule(Rule):
             return Decision(self.triggers[detected_task], trigger=detected_task)
         
         # Fall back to default
-        return Decision(self.default)
+        return self._get_default_decision()
     
-    def _extract_text_content(self, request_data: Dict[str, Any]) -> str:
-        """Extract text content from request messages."""
-        messages = request_data.get('messages', [])
-        text_parts = []
-        
-        for message in messages:
-            if isinstance(message, dict) and 'content' in message:
-                content = message['content']
-                if isinstance(content, str):
-                    text_parts.append(content)
-        
-        return '\n'.join(text_parts)
+    def _get_default_decision(self) -> Decision:
+        """Get the decision for falling back to the default.
+        
+        The decision is built once and shared between requests (decisions are
+        not modified after creation); it is rebuilt if self.default changes.
+        """
+        decision = self._default_decision
+        if decision is None or decision.value != self.default:
+            decision = Decision(self.default)
+            self._default_decision = decision
+        return decision
     
     def _detect_task_llm(self, text: str) -> Optional[str]:
         """Detect task type using LLM.
@@ -76,19 +123,123 @@ class AutoTaskRule(Rule):
             if not config.is_configured():
                 return None
             
-            credentials = config.get_credentials()
+            # The key covers everything the prompt and answer depend on, so
+            # changed task mappings or models never reuse a stale answer
+            cache_key = (self.llm_model, tuple(self.triggers), text[:_MAX_PROMPT_TEXT])
+            with self._task_cache_lock:
+                if cache_key in self._task_cache:
+                    self._task_cache.move_to_end(cache_key)
+                    return self._task_cache[cache_key]
+                
+                # Wait for an identical call already in progress
+                pending = self._in_flight.get(cache_key)
+                if pending is None:
+                    future: "Future[Optional[str]]" = Future()
+                    self._in_flight[cache_key] = future
             
-            # Create OpenAI client
-            client = openai.OpenAI(
-                api_key=credentials['api_key'],
-                base_url=credentials.get('api_url')
-            )
+            if pending is not None:
+                return pending.result()
             
-            # Create prompt for task detection
-            available_tasks = list(self.triggers.keys())
-            tasks_list = ', '.join(available_tasks)
+            try:
+                detected = self._request_task_llm(text)
+            except BaseException as e:
+                with self._task_cache_lock:
+                    del self._in_flight[cache_key]
+                future.set_exception(e)
+                raise
+            
+            with self._task_cache_lock:
+                del self._in_flight[cache_key]
+                if self.cache_size:
+                    self._task_cache[cache_key] = detected
+                    self._task_cache.move_to_end(cache_key)
+                    if len(self._task_cache) > self.cache_size:
+                        self._task_cache.popitem(last=False)
+            future.set_result(detected)
+            return detected
             
-            prompt = f"""Analyze the following user message and determine what type of task they are requesting.
+        except Exception:
+            # If LLM detection fails, return None
+            return None
+    
+    def _request_task_llm(self, text: str) -> Optional[str]:
+        """Ask the LLM which task the text requests.
+        
+        Args:
+            text: Text to analyze
+            
+        Returns:
+            Detected task name or None
+            
+        Raises:
+            Exception: If the API call fails
+        """
+        client = self._get_client()
+        
+        # Create prompt for task detection
+        prompt_prefix, tasks_by_lower = self._get_prompt_parts()
+        prompt = prompt_prefix + text[:_MAX_PROMPT_TEXT]  # Limit text to avoid token limits
+
+        # Make the API call
+        # Note: Some models (like gpt-5-nano) don't support custom temperature or max_tokens
+        api_params = {
+            "model": self.llm_model,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+        
+        # Only add temperature and max_tokens for models that support them
+        if not self.llm_model.endswith('-nano'):
+            api_params["temperature"] = 0.1
+            api_params["max_tokens"] = 50
+        
+        response = client.chat.completions.create(**api_params)
+        
+        # Extract the response
+        raw_response = response.choices[0].message.content
+        if raw_response is None:
+            return None
+            
+        raw_response = raw_response.strip()
+        detected = raw_response.lower()
+        
+        # Validate the response
+        if detected == "none":
+            return None
+        
+        # Check if the detected task is in our available tasks (case-insensitive);
+        # anything else means the LLM returned something unexpected
+        return tasks_by_lower.get(detected)
+    
+    def _get_client(self) -> openai.OpenAI:
+        """Get the OpenAI client for task detection, creating it on first use.
+        
+        A new client is created if the configured credentials change.
+        """
+        credentials = config.get_credentials()
+        client_credentials = (credentials['api_key'], credentials.get('api_url'))
+        if self._client is None or self._client_credentials != client_credentials:
+            self._client = openai.OpenAI(
+                api_key=client_credentials[0],
+                base_url=client_credentials[1]
+            )
+            self._client_credentials = client_credentials
+        return self._client
+    
+    def _get_prompt_parts(self) -> Tuple[str, Dict[str, str]]:
+        """Get the task detection prompt prefix and case-insensitive task lookup.
+        
+        Both only depend on the task names, so they are built once and
+        rebuilt when the task names change.
+        
+        Returns:
+            Tuple of (prompt text preceding the user message, mapping of
+            lowercased task names to task names)
+        """
+        available_tasks = tuple(self.triggers)
+        parts = self._prompt_parts
+        if parts is None or parts[0] != available_tasks:
+            tasks_list = ', '.join(available_tasks)
+            prompt_prefix = f"""Analyze the following user message and determine what type of task they are requesting.
 
 You must respond with ONLY ONE of these exact task names: {tasks_list}
 
@@ -97,45 +248,14 @@ If the message doesn't clearly match any of these tasks, respond with "none".
 IMPORTANT: Your response must be EXACTLY one of the task names listed above, or "none". Do not include any other text, explanations, or formatting.
 
 User message:
-{text[:2000]}"""  # Limit text to avoid token limits
-
-            # Make the API call
-            # Note: Some models (like gpt-5-nano) don't support custom temperature or max_tokens
-            api_params = {
-                "model": self.llm_model,
-                "messages": [{"role": "user", "content": prompt}]
-            }
-            
-            # Only add temperature and max_tokens for models that support them
-            if not self.llm_model.endswith('-nano'):
-                api_params["temperature"] = 0.1
-                api_params["max_tokens"] = 50
-            
-            response = client.chat.completions.create(**api_params)
-            
-            # Extract the response
-            raw_response = response.choices[0].message.content
-            if raw_response is None:
-                return None
-                
-            raw_response = raw_response.strip()
-            detected = raw_response.lower()
-            
-            # Validate the response
-            if detected == "none":
-                return None
-            
-            # Check if the detected task is in our available tasks (case-insensitive)
+"""
+            # The first task wins when names differ only in case
+            tasks_by_lower: Dict[str, str] = {}
             for task in available_tasks:
-                if task.lower() == detected:
-                    return task
-            
-            # If we get here, the LLM returned something unexpected
-            return None
-            
-        except Exception:
-            # If LLM detection fails, return None
-            return None
+                tasks_by_lower.setdefault(task.lower(), task)
+            parts = (available_tasks, prompt_prefix, tasks_by_lower)
+            self._prompt_parts = parts
+        return parts[1], parts[2]
     
     def add_task_mapping(self, task: str, decision: str) -> None:
         """Add a new task mapping.
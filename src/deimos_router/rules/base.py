@@ -1,12 +1,206 @@
 """Base classes for the rule system."""
 
+import hashlib
+import re
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Pattern, Tuple, TypeVar, Union
+
+T = TypeVar('T')
+
+# Key of the per-request memo the Router adds to request data, so values
+# derived from the messages (like the joined text) are computed once per
+# request and shared by every rule in the chain
+REQUEST_CACHE_KEY = '_deimos_request_cache'
+
+# Longest text the regex-based rules scan; longer conversations are cut to
+# their most recent text, so scanning cost does not grow with the history
+MAX_SCAN_TEXT = 16384
+
+
+def request_cached(request_data: Dict[str, Any], key: str, compute: Callable[[], T]) -> T:
+    """Get a value derived from the request, computing it at most once per request.
+    
+    Without a per-request memo (e.g. when a rule is evaluated directly) the
+    value is simply computed.
+    
+    Args:
+        request_data: The complete request data
+        key: Name of the derived value in the memo
+        compute: Function computing the value
+        
+    Returns:
+        The cached or freshly computed value
+    """
+    cache = request_data.get(REQUEST_CACHE_KEY)
+    if cache is None:
+        return compute()
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+class LRUCache:
+    """Thread-safe mapping that keeps the most recently used entries.
+    
+    Used by rules to remember detection results for repeated messages.
+    """
+    
+    def __init__(self, maxsize: int):
+        """Initialize an LRUCache.
+        
+        Args:
+            maxsize: Maximum number of entries kept (0 disables caching)
+        """
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, marking it as recently used.
+        
+        Args:
+            key: The cache key
+            default: Value returned when the key is not cached
+            
+        Returns:
+            The cached value, or default
+        """
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache a value, evicting the least recently used entry when full.
+        
+        Args:
+            key: The cache key
+            value: The value to cache
+        """
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Remove all cached values."""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Bumped whenever a rule's public attributes are set or its triggers change,
+# so routers can tell in O(1) when state derived from rules is stale
+_config_version = 0
+
+
+def config_version() -> int:
+    """Get a counter that changes whenever a rule's configuration changes."""
+    return _config_version
+
+
+def bump_config_version() -> None:
+    """Mark rule configuration as changed, invalidating state derived from it."""
+    global _config_version
+    _config_version += 1
+
+
+class TriggerDict(dict):
+    """Dict of rule triggers that bumps config_version() whenever it is modified.
+    
+    Task rules keep their triggers in one, so edits made directly to
+    rule.triggers are noticed without comparing the triggers themselves.
+    """
+    
+    def __setitem__(self, key: Any, value: Any) -> None:
+        super().__setitem__(key, value)
+        bump_config_version()
+    
+    def __delitem__(self, key: Any) -> None:
+        super().__delitem__(key)
+        bump_config_version()
+    
+    def __ior__(self, other: Any) -> "TriggerDict":
+        result = super().__ior__(other)
+        bump_config_version()
+        return result
+    
+    def clear(self) -> None:
+        super().clear()
+        bump_config_version()
+    
+    def pop(self, *args: Any) -> Any:
+        result = super().pop(*args)
+        bump_config_version()
+        return result
+    
+    def popitem(self) -> Tuple[Any, Any]:
+        result = super().popitem()
+        bump_config_version()
+        return result
+    
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        result = super().setdefault(key, default)
+        bump_config_version()
+        return result
+    
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        super().update(*args, **kwargs)
+        bump_config_version()
+
+
+def ascii_scan_pattern(pattern: Pattern[str]) -> Tuple[Pattern[str], bool]:
+    """Get the pattern to use on ASCII text, preferring lowercased text.
+    
+    For re.IGNORECASE patterns, letters outside escape sequences are
+    lowercased and the flag is dropped, so on ASCII text
+    ``variant.findall(text.lower())`` finds the same number of matches as
+    ``pattern.findall(text)`` without case folding in the regex engine.
+    
+    Args:
+        pattern: The pattern to convert
+        
+    Returns:
+        Tuple of (pattern to scan with, whether it is matched against the
+        lowercased text rather than the original text). Case-sensitive
+        patterns containing letters are kept for the original text.
+    """
+    source = pattern.pattern
+    chars = []
+    has_letters = False
+    i = 0
+    while i < len(source):
+        if source[i] == '\\':
+            chars.append(source[i:i + 2])
+            i += 2
+        else:
+            has_letters = has_letters or source[i].isalpha()
+            chars.append(source[i].lower())
+            i += 1
+    
+    if not pattern.flags & re.IGNORECASE:
+        return pattern, not has_letters
+    return re.compile(''.join(chars), pattern.flags & ~re.IGNORECASE), True
+
+# Decision kinds, classified once when a Decision is created
+_OTHER_DECISION = 0
+_MODEL_DECISION = 1
+_RULE_DECISION = 2
 
 
 class Decision:
     """Represents a decision made by a rule."""
     
+    __slots__ = ('value', 'trigger', '_kind')
+    
     def __init__(self, value: Union[str, None], trigger: Optional[str] = None):
         """Initialize a decision.
         
@@ -16,14 +210,18 @@ class Decision:
         """
         self.value = value
         self.trigger = trigger
+        if isinstance(value, str):
+            self._kind = _RULE_DECISION if value.startswith('deimos/rules/') else _MODEL_DECISION
+        else:
+            self._kind = _OTHER_DECISION
     
     def is_model(self) -> bool:
         """Check if this decision is a model selection."""
-        return isinstance(self.value, str) and not self.value.startswith('deimos/rules/')
+        return self._kind == _MODEL_DECISION
     
     def is_rule(self) -> bool:
         """Check if this decision points to another rule."""
-        return isinstance(self.value, str) and self.value.startswith('deimos/rules/')
+        return self._kind == _RULE_DECISION
     
     def is_none(self) -> bool:
         """Check if this decision is None (no decision made)."""
@@ -49,6 +247,8 @@ class Decision:
 class ExplanationEntry:
     """Represents an entry in the explanation of how a model was selected."""
     
+    __slots__ = ('rule_type', 'rule_name', 'rule_trigger', 'decision')
+    
     def __init__(self, rule_type: str, rule_name: str, rule_trigger: Optional[str], decision: str):
         """Initialize an explanation entry.
         
@@ -87,6 +287,13 @@ class Rule(ABC):
         from . import register_rule
         register_rule(self)
     
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Public attributes are the rule's configuration (models, thresholds,
+        # triggers); private ones are caches that don't change its decisions
+        super().__setattr__(name, value)
+        if not name.startswith('_'):
+            bump_config_version()
+    
     @abstractmethod
     def evaluate(self, request_data: Dict[str, Any]) -> Decision:
         """Evaluate the rule against request data.
@@ -99,9 +306,98 @@ class Rule(ABC):
         """
         pass
     
+    def _extract_text_content(self, request_data: Dict[str, Any]) -> str:
+        """Extract text content from request messages.
+        
+        Args:
+            request_data: The complete request data
+            
+        Returns:
+            Combined text content from all messages
+        """
+        return request_cached(request_data, 'text', lambda: _join_message_text(request_data))
+    
+    def _extract_scan_text(self, request_data: Dict[str, Any]) -> str:
+        """Extract the most recent text content, for rules that scan it with regexes.
+        
+        This is the combined text content cut to its last MAX_SCAN_TEXT
+        characters, built without joining older messages.
+        
+        Args:
+            request_data: The complete request data
+            
+        Returns:
+            The end of the combined text content from all messages
+        """
+        return request_cached(
+            request_data, 'scan_text',
+            lambda: _join_recent_message_text(request_data, MAX_SCAN_TEXT)
+        )
+    
+    def _scan_text_digest(self, request_data: Dict[str, Any]) -> bytes:
+        """Get a digest of the request's scan text, for keying result caches.
+        
+        Args:
+            request_data: The complete request data
+            
+        Returns:
+            A 16-byte digest of the text returned by _extract_scan_text
+        """
+        return request_cached(
+            request_data, 'scan_text_digest',
+            lambda: digest_text(self._extract_scan_text(request_data))
+        )
+    
     def get_rule_type(self) -> str:
         """Get the type name of this rule."""
         return self.__class__.__name__
     
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}('{self.name}')"
+
+
+def _join_message_text(request_data: Dict[str, Any]) -> str:
+    """Join the string content of all request messages with newlines."""
+    messages = request_data.get('messages') or ()
+    
+    # Most requests carry a single message, whose content needs no joining
+    if len(messages) == 1:
+        message = messages[0]
+        content = message.get('content') if isinstance(message, dict) else None
+        return content if isinstance(content, str) else ''
+    
+    return '\n'.join([
+        message['content'] for message in messages
+        if isinstance(message, dict) and isinstance(message.get('content'), str)
+    ])
+
+
+
+def _join_recent_message_text(request_data: Dict[str, Any], max_length: int) -> str:
+    """Join the string content of the most recent messages with newlines.
+    
+    Returns the last max_length characters of what _join_message_text
+    returns, only taking as many messages as needed.
+    """
+    messages = request_data.get('messages') or ()
+    contents = []
+    length = -1  # No separator before the first message
+    for message in reversed(messages):
+        content = message.get('content') if isinstance(message, dict) else None
+        if isinstance(content, str):
+            contents.append(content)
+            length += len(content) + 1
+            if length >= max_length:
+                # Keep only the end of the oldest message taken
+                contents[-1] = content[length - max_length:]
+                break
+    
+    if len(contents) == 1:
+        return contents[0]
+    contents.reverse()
+    return '\n'.join(contents)
+
+
+def digest_text(text: str) -> bytes:
+    """Hash text to a short, fixed-size cache key."""
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
@@ -1,10 +1,229 @@
 """Code language detection rule implementation."""
 
 import re
-from typing import Any, Dict, List, Optional
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
 import openai
 from ..config import config
-from .base import Rule, Decision
+from .base import LRUCache, Rule, Decision, ascii_scan_pattern
+
+
+# Longest code snippet sent to the LLM, to avoid token limits
+_MAX_PROMPT_TEXT = 2000
+
+# Language-specific patterns with scoring weights, and lowercase literals at
+# least one of which appears in every match of the pattern (empty when there
+# is no such literal)
+_LANGUAGE_PATTERN_TABLE: Dict[str, Tuple[Tuple[re.Pattern, int, Tuple[str, ...]], ...]] = {
+    'python': (
+        (re.compile(r'\bdef\s+\w+\s*\([^)]*\)\s*:', re.IGNORECASE), 3, ('def',)),
+        (re.compile(r'\bimport\s+\w+|from\s+\w+\s+import', re.IGNORECASE), 2, ('import',)),
+        (re.compile(r'\bif\s+__name__\s*==\s*["\']__main__["\']', re.IGNORECASE), 4, ('__main__',)),
+        (re.compile(r'\bclass\s+\w+\s*\([^)]*\)\s*:', re.IGNORECASE), 3, ('class',)),
+        (re.compile(r'\belif\b|\bexcept\b|\bfinally\b', re.IGNORECASE), 2, ('elif', 'except', 'finally')),
+        (re.compile(r'^\s{4}\w+|^\s{4}#', re.MULTILINE), 1, ()),  # 4-space indentation
+        (re.compile(r'\bprint\s*\(|\blen\s*\(|\brange\s*\(', re.IGNORECASE), 1, ('print', 'len', 'range')),
+        (re.compile(r'\.py\b|python\b', re.IGNORECASE), 1, ('.py', 'python')),
+    ),
+    
+    'javascript': (
+        (re.compile(r'\bfunction\s+\w+\s*\([^)]*\)\s*\{', re.IGNORECASE), 3, ('function',)),
+        (re.compile(r'\b(?:const|let|var)\s+\w+\s*=', re.IGNORECASE), 2, ('const', 'let', 'var')),
+        (re.compile(r'=>|\.then\s*\(|\.catch\s*\(', re.IGNORECASE), 2, ('=>', '.then', '.catch')),
+        (re.compile(r'\bconsole\.log\s*\(|\balert\s*\(', re.IGNORECASE), 2, ('console.log', 'alert')),
+        (re.compile(r'\b(?:async|await)\b', re.IGNORECASE), 2, ('async', 'await')),
+        # import\s+.*\s+from, split the same way as the SQL SELECT pattern below
+        (re.compile(r'\brequire\s*\(|import(?:(?>\s+)[^\n]*(?<!\s)\s++from|\s\s++from)', re.IGNORECASE), 2, ('require', 'import')),
+        (re.compile(r'\.js\b|javascript\b|node\.js', re.IGNORECASE), 1, ('.js', 'javascript')),
+        (re.compile(r'\$\{.*\}|`.*`', re.IGNORECASE), 1, ('${', '`')),  # Template literals
+    ),
+    
+    'java': (
+        (re.compile(r'\bpublic\s+(?:static\s+)?(?:void|int|String)\s+\w+\s*\(', re.IGNORECASE), 4, ('public',)),
+        (re.compile(r'\bclass\s+\w+(?:\s*extends\s+\w+)?\s*\{', re.IGNORECASE), 3, ('class',)),
+        (re.compile(r'\bpublic\s+static\s+void\s+main\s*\(', re.IGNORECASE), 4, ('void',)),
+        (re.compile(r'\bSystem\.out\.print'), 3, ('system.out.print',)),
+        (re.compile(r'\bimport\s+java\.', re.IGNORECASE), 3, ('java.',)),
+        (re.compile(r'\b(?:public|private|protected)\s+(?:static\s+)?(?:final\s+)?\w+', re.IGNORECASE), 2, ('public', 'private', 'protected')),
+        (re.compile(r'\.java\b', re.IGNORECASE), 1, ('.java',)),
+        (re.compile(r'\bnew\s+\w+\s*\(', re.IGNORECASE), 1, ('new',)),
+    ),
+    
+    'cpp': (
+        (re.compile(r'#include\s*<[^>]+>|#include\s*"[^"]+"', re.IGNORECASE), 3, ('#include',)),
+        (re.compile(r'\bint\s+main\s*\([^)]*\)\s*\{', re.IGNORECASE), 4, ('main',)),
+        (re.compile(r'\bstd::|using\s+namespace\s+std', re.IGNORECASE), 3, ('std',)),
+        (re.compile(r'\bcout\s*<<|\bcin\s*>>', re.IGNORECASE), 3, ('cout', 'cin')),
+        (re.compile(r'\b(?:public|private|protected)\s*:', re.IGNORECASE), 2, ('public', 'private', 'protected')),
+        (re.compile(r'\bclass\s+\w+(?:\s*:\s*(?:public|private|protected)\s+\w+)?\s*\{', re.IGNORECASE), 2, ('class',)),
+        (re.compile(r'\.cpp\b|\.hpp\b|\.h\b|c\+\+', re.IGNORECASE), 1, ('.cpp', '.h', 'c++')),
+        (re.compile(r'\bdelete\s+\w+|\bnew\s+\w+', re.IGNORECASE), 1, ('delete', 'new')),
+    ),
+    
+    'c': (
+        (re.compile(r'#include\s*<[^>]+\.h>', re.IGNORECASE), 3, ('#include',)),
+        (re.compile(r'\bint\s+main\s*\([^)]*\)\s*\{', re.IGNORECASE), 3, ('main',)),
+        (re.compile(r'\bprintf\s*\(|\bscanf\s*\(', re.IGNORECASE), 3, ('printf', 'scanf')),
+        (re.compile(r'\bmalloc\s*\(|\bfree\s*\(', re.IGNORECASE), 2, ('malloc', 'free')),
+        (re.compile(r'\bstruct\s+\w+\s*\{', re.IGNORECASE), 2, ('struct',)),
+        (re.compile(r'\.c\b(?!pp)', re.IGNORECASE), 1, ('.c',)),
+        (re.compile(r'\btypedef\s+(?:struct\s+)?\w+', re.IGNORECASE), 1, ('typedef',)),
+    ),
+    
+    'csharp': (
+        (re.compile(r'\busing\s+System'), 4, ('system',)),  # Higher weight for C# specific
+        (re.compile(r'\bnamespace\s+\w+\s*\{', re.IGNORECASE), 4, ('namespace',)),  # Higher weight for namespace
+        (re.compile(r'\bConsole\.WriteLine\s*\('), 4, ('console.writeline',)),  # Higher weight for C# specific
+        (re.compile(r'\bpublic\s+(?:static\s+)?(?:void|int|string)\s+\w+\s*\(', re.IGNORECASE), 2, ('public',)),  # Lower weight since shared with Java
+        (re.compile(r'\bpublic\s+class\s+\w+', re.IGNORECASE), 1, ('public',)),  # Lower weight since shared with Java
+        (re.compile(r'\.cs\b|C#', re.IGNORECASE), 2, ('.cs', 'c#')),
+        (re.compile(r'\bvar\s+\w+\s*=|\bstring\s+\w+', re.IGNORECASE), 2, ('var', 'string')),
+        (re.compile(r'\bConsole\.Write\s*\(|\bConsole\.Read'), 3, ('console.',)),  # More C# specific patterns
+    ),
+    
+    'php': (
+        (re.compile(r'<\?php', re.IGNORECASE), 4, ('<?php',)),
+        (re.compile(r'\$\w+\s*=', re.IGNORECASE), 3, ('$',)),
+        (re.compile(r'\bfunction\s+\w+\s*\([^)]*\)\s*\{', re.IGNORECASE), 2, ('function',)),
+        (re.compile(r'\becho\s+|\bprint\s+', re.IGNORECASE), 2, ('echo', 'print')),
+        (re.compile(r'\brequire\s+|\binclude\s+', re.IGNORECASE), 2, ('require', 'include')),
+        (re.compile(r'\.php\b', re.IGNORECASE), 1, ('.php',)),
+        (re.compile(r'->\w+|\$this->', re.IGNORECASE), 1, ('->',)),
+    ),
+    
+    'ruby': (
+        (re.compile(r'\bdef\s+\w+(?:\([^)]*\))?\s*$', re.MULTILINE | re.IGNORECASE), 3, ('def',)),
+        (re.compile(r'\bclass\s+\w+(?:\s*<\s*\w+)?\s*$', re.MULTILINE | re.IGNORECASE), 3, ('class',)),
+        (re.compile(r'\bend\s*$', re.MULTILINE | re.IGNORECASE), 2, ('end',)),
+        (re.compile(r'\bputs\s+|\bp\s+', re.IGNORECASE), 2, ()),
+        (re.compile(r'\brequire\s+["\']|\bgem\s+["\']', re.IGNORECASE), 2, ('require', 'gem')),
+        (re.compile(r'\.rb\b|ruby', re.IGNORECASE), 1, ('.rb', 'ruby')),
+        (re.compile(r'@\w+|@@\w+', re.IGNORECASE), 1, ('@',)),  # Instance/class variables
+    ),
+    
+    'go': (
+        (re.compile(r'\bpackage\s+\w+', re.IGNORECASE), 3, ('package',)),
+        (re.compile(r'\bfunc\s+\w+\s*\([^)]*\)', re.IGNORECASE), 3, ('func',)),
+        (re.compile(r'\bimport\s*\(|\bimport\s+"', re.IGNORECASE), 2, ('import',)),
+        (re.compile(r'\bfmt\.Print|\bfmt\.Sprintf'), 3, ('fmt.',)),
+        (re.compile(r':=|\bvar\s+\w+\s+\w+', re.IGNORECASE), 2, (':=', 'var')),
+        (re.compile(r'\.go\b|golang', re.IGNORECASE), 1, ('.go', 'golang')),
+        (re.compile(r'\bgo\s+func\s*\(', re.IGNORECASE), 2, ('func',)),  # Goroutines
+    ),
+    
+    'rust': (
+        (re.compile(r'\bfn\s+\w+\s*\([^)]*\)', re.IGNORECASE), 4, ('fn',)),  # Higher weight for fn
+        (re.compile(r'\buse\s+\w+::', re.IGNORECASE), 3, ('::',)),  # Higher weight for use statements
+        (re.compile(r'\blet\s+(?:mut\s+)?\w+\s*=', re.IGNORECASE), 2, ('let',)),
+        (re.compile(r'\bprintln!\s*\(|\bpanic!\s*\('), 4, ('println!', 'panic!')),  # Higher weight for macros
+        (re.compile(r'\bmatch\s+\w+\s*\{', re.IGNORECASE), 3, ('match',)),  # Higher weight for match
+        (re.compile(r'\.rs\b|rust', re.IGNORECASE), 1, ('.rs', 'rust')),
+        (re.compile(r'\bimpl\s+\w+|\btrait\s+\w+', re.IGNORECASE), 3, ('impl', 'trait')),  # Higher weight
+        (re.compile(r'\b(?:u8|u16|u32|u64|i8|i16|i32|i64|f32|f64|usize|isize)\b', re.IGNORECASE), 2, ('u8', 'u16', 'u32', 'u64', 'i8', 'i16', 'i32', 'i64', 'f32', 'f64', 'size')),  # Rust types
+        (re.compile(r'\b_\s*=>', re.IGNORECASE), 3, ('=>',)),  # Rust match arm with underscore
+    ),
+    
+    'swift': (
+        (re.compile(r'\bfunc\s+\w+\s*\([^)]*\)', re.IGNORECASE), 3, ('func',)),
+        (re.compile(r'\bimport\s+(?:Foundation|UIKit|SwiftUI)', re.IGNORECASE), 3, ('foundation', 'uikit', 'swiftui')),
+        (re.compile(r'\bvar\s+\w+\s*:\s*\w+|\blet\s+\w+\s*:\s*\w+', re.IGNORECASE), 2, ('var', 'let')),
+        (re.compile(r'\bprint\s*\(', re.IGNORECASE), 2, ('print',)),
+        (re.compile(r'\bclass\s+\w+\s*:\s*\w+', re.IGNORECASE), 2, ('class',)),
+        (re.compile(r'\.swift\b|swift', re.IGNORECASE), 1, ('swift',)),
+        (re.compile(r'\bguard\s+|\bdefer\s+', re.IGNORECASE), 2, ('guard', 'defer')),
+    ),
+    
+    'kotlin': (
+        (re.compile(r'\bfun\s+\w+\s*\([^)]*\)', re.IGNORECASE), 3, ('fun',)),
+        (re.compile(r'\bclass\s+\w+(?:\s*:\s*\w+)?\s*\{', re.IGNORECASE), 2, ('class',)),
+        (re.compile(r'\bval\s+\w+\s*=|\bvar\s+\w+\s*=', re.IGNORECASE), 2, ('val', 'var')),
+        (re.compile(r'\bprintln\s*\(', re.IGNORECASE), 2, ('println',)),
+        (re.compile(r'\bimport\s+\w+(?:\.\w+)*', re.IGNORECASE), 1, ('import',)),
+        (re.compile(r'\.kt\b|kotlin', re.IGNORECASE), 1, ('.kt', 'kotlin')),
+        (re.compile(r'\bwhen\s*\(|\bdata\s+class', re.IGNORECASE), 2, ('when', 'data')),
+    ),
+}
+
+# SQL patterns (more comprehensive)
+_LANGUAGE_PATTERN_TABLE['sql'] = (
+    # SELECT\s+.*\s+FROM\s+\w+, trying each way of splitting the whitespace
+    # once (as written, SELECT followed by many spaces takes minutes)
+    (re.compile(r'\bSELECT(?:(?>\s+)[^\n]*(?<!\s)\s++FROM\s++\w++|\s\s++FROM\s++\w++)', re.IGNORECASE), 4, ('select',)),
+    (re.compile(r'\bINSERT\s+INTO\s+\w+', re.IGNORECASE), 3, ('insert',)),
+    (re.compile(r'\bUPDATE\s+\w+\s+SET\s+', re.IGNORECASE), 3, ('update',)),
+    (re.compile(r'\bDELETE\s+FROM\s+\w+', re.IGNORECASE), 3, ('delete',)),
+    (re.compile(r'\bCREATE\s+TABLE\s+\w+', re.IGNORECASE), 3, ('create',)),
+    (re.compile(r'\bJOIN\s+\w+\s+ON\s+', re.IGNORECASE), 2, ('join',)),
+    (re.compile(r'\bWHERE\s+\w+\s*[=<>]', re.IGNORECASE), 2, ('where',)),
+    (re.compile(r'\bGROUP\s+BY\s+|\bORDER\s+BY\s+', re.IGNORECASE), 2, ('group', 'order')),
+)
+
+# HTML patterns
+_LANGUAGE_PATTERN_TABLE['html'] = (
+    (re.compile(r'<!DOCTYPE\s+html>', re.IGNORECASE), 4, ('<!doctype',)),
+    (re.compile(r'<html[^>]*>|</html>', re.IGNORECASE), 3, ('html',)),
+    (re.compile(r'<head[^>]*>|</head>|<body[^>]*>|</body>', re.IGNORECASE), 3, ('head', 'body')),
+    (re.compile(r'<(?:div|span|p|h[1-6]|a|img|ul|ol|li|form|input|button|table|tr|td|th)[^>]*>', re.IGNORECASE), 2, ('<',)),
+    # Written to scan in linear time: only the first tag after a '>' can
+    # match (a later tag's attributes are the tail of the first one's), and a
+    # single \s before the attribute matches wherever \s+ would
+    (re.compile(r'(?:^|(?<=>))(?>[^>]*?<\w)[^>]*\s(?:class|id|src|href|action|method|type|name)\s*=', re.IGNORECASE), 2, ('<',)),
+    (re.compile(r'</(?:div|span|p|h[1-6]|a|form|button|table|tr|td|th)>', re.IGNORECASE), 1, ('</',)),
+    (re.compile(r'\.html?\b', re.IGNORECASE), 1, ('.htm',)),
+)
+
+# Property names that make `name { property` look like CSS
+_CSS_PROPERTY_NAMES = ('color', 'background', 'margin', 'padding', 'border', 'font', 'width', 'height', 'display', 'position')
+
+# CSS patterns (more specific to avoid false matches with other languages)
+_LANGUAGE_PATTERN_TABLE['css'] = (
+    # Both patterns are written to scan in linear time. In the first, only
+    # the first selector after a closing brace can match (a later one's
+    # block is the tail of the same block), so matching starts there and a
+    # block is never rescanned. The second starts at the beginning of a word
+    # or right after a previous match: other starts in a word end the same
+    # way as the word's first one
+    (re.compile(r'(?:^|(?<=\}))(?>[^}]*?[.#]\w+\s*\{)(?>[^}]*?(?:color|background|margin|padding|border|font|width|height))[^}]*+\}', re.IGNORECASE), 4, ('{',)),  # CSS with properties
+    (re.compile(
+        r'(?:(?<!\w)|' + '|'.join(r'(?<=[\s{]' + name + ')' for name in _CSS_PROPERTY_NAMES) + r')'
+        r'\w+\s*\{\s*(?:' + '|'.join(_CSS_PROPERTY_NAMES) + ')', re.IGNORECASE), 3, ('{',)),  # CSS properties
+    (re.compile(r'@media\s+|\b@import\s+|\b@keyframes\s+', re.IGNORECASE), 4, ('@media', '@import', '@keyframes')),
+    (re.compile(r':\s*(?:hover|active|focus|before|after|nth-child|first-child|last-child)', re.IGNORECASE), 3, (':',)),
+    (re.compile(r'\.css\b', re.IGNORECASE), 1, ('.css',)),
+    (re.compile(r'(?:px|em|rem|%|vh|vw|pt)\s*[;}]', re.IGNORECASE), 2, (';', '}')),  # CSS units
+)
+
+_LANGUAGE_PATTERNS = {
+    language: tuple((pattern, weight) for pattern, weight, _ in entries)
+    for language, entries in _LANGUAGE_PATTERN_TABLE.items()
+}
+
+# What _detect_language_regex scans on ASCII text: (pattern, whether it is
+# matched against the lowercased text, weight, literals). IGNORECASE patterns
+# are replaced by lowercase variants, so the text is lowercased once instead
+# of being case folded by every pattern
+_ASCII_LANGUAGE_SCAN_TABLE = {
+    language: tuple(
+        (*ascii_scan_pattern(pattern), weight, literals)
+        for pattern, weight, literals in entries
+    )
+    for language, entries in _LANGUAGE_PATTERN_TABLE.items()
+}
+
+# Scan patterns used by more than one language (like int main() for C and
+# C++); their match counts are computed once per text and shared
+_SHARED_SCAN_PATTERNS = frozenset(
+    pattern
+    for pattern, count in Counter(
+        entry[0] for entries in _ASCII_LANGUAGE_SCAN_TABLE.values() for entry in entries
+    ).items()
+    if count > 1
+)
+
+# Marks a cache miss, since None is a cached "no language detected"
+_NOT_CACHED = object()
 
 
 class CodeLanguageRule(Rule):
@@ -13,7 +232,8 @@ class CodeLanguageRule(Rule):
     def __init__(self, name: str, language_mappings: Dict[str, str], 
                  default: Optional[str] = None,
                  llm_model: Optional[str] = None,
-                 enable_llm_fallback: bool = True):
+                 enable_llm_fallback: bool = True,
+                 cache_size: int = 1024):
         """Initialize a CodeLanguageRule.
         
         Args:
@@ -23,6 +243,9 @@ class CodeLanguageRule(Rule):
             llm_model: Model to use for LLM-based language detection fallback.
                       If None, uses the default model from config.
             enable_llm_fallback: Whether to use LLM fallback for unmapped languages
+            cache_size: Number of detection results to remember per message
+                text, so repeated messages skip the regex scan and the LLM
+                call (0 disables)
         """
         super().__init__(name)
         self.language_mappings = language_mappings
@@ -30,174 +253,41 @@ class CodeLanguageRule(Rule):
         self.llm_model = llm_model or config.get_default_model('code_language_detection')
         self.enable_llm_fallback = enable_llm_fallback
         
-        # Compile regex patterns for language detection
+        # Text digest -> language detected by the regex patterns
+        self._language_cache = LRUCache(cache_size)
+        
+        # (llm_model, candidate languages, snippet) -> language detected by the
+        # LLM; failed LLM calls are not cached
+        self._llm_cache = LRUCache(cache_size)
+        
+        # Same key -> Future for LLM calls in progress, so concurrent requests
+        # with the same snippet share one call
+        self._in_flight: Dict[Tuple[str, Tuple[str, ...], str], "Future[Optional[str]]"] = {}
+        self._in_flight_lock = threading.Lock()
+        
+        # (candidate languages, prompt text preceding the snippet), rebuilt
+        # when the candidate languages change
+        self._prompt_prefix: Optional[Tuple[Tuple[str, ...], str]] = None
+        
+        # ((mapped languages, pattern languages), mapped languages without
+        # patterns), rebuilt when either mapping changes
+        self._unmapped_languages: Optional[Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], List[str]]] = None
+        
+        # OpenAI client reused across detections (keeping its connections
+        # alive), with the (api_key, api_url) it was created for
+        self._client: Optional[openai.OpenAI] = None
+        self._client_credentials: Optional[Tuple[str, Optional[str]]] = None
+        
+        # Regex patterns for language detection
         self._compile_language_patterns()
     
     def _compile_language_patterns(self) -> None:
-        """Compile regex patterns for detecting specific programming languages."""
-        
-        # Language-specific patterns with scoring weights
-        self.language_patterns = {
-            'python': [
-                (re.compile(r'\bdef\s+\w+\s*\([^)]*\)\s*:', re.IGNORECASE), 3),
-                (re.compile(r'\bimport\s+\w+|from\s+\w+\s+import', re.IGNORECASE), 2),
-                (re.compile(r'\bif\s+__name__\s*==\s*["\']__main__["\']', re.IGNORECASE), 4),
-                (re.compile(r'\bclass\s+\w+\s*\([^)]*\)\s*:', re.IGNORECASE), 3),
-                (re.compile(r'\belif\b|\bexcept\b|\bfinally\b', re.IGNORECASE), 2),
-                (re.compile(r'^\s{4}\w+|^\s{4}#', re.MULTILINE), 1),  # 4-space indentation
-                (re.compile(r'\bprint\s*\(|\blen\s*\(|\brange\s*\(', re.IGNORECASE), 1),
-                (re.compile(r'\.py\b|python\b', re.IGNORECASE), 1),
-            ],
-            
-            'javascript': [
-                (re.compile(r'\bfunction\s+\w+\s*\([^)]*\)\s*\{', re.IGNORECASE), 3),
-                (re.compile(r'\b(?:const|let|var)\s+\w+\s*=', re.IGNORECASE), 2),
-                (re.compile(r'=>|\.then\s*\(|\.catch\s*\(', re.IGNORECASE), 2),
-                (re.compile(r'\bconsole\.log\s*\(|\balert\s*\(', re.IGNORECASE), 2),
-                (re.compile(r'\b(?:async|await)\b', re.IGNORECASE), 2),
-                (re.compile(r'\brequire\s*\(|import\s+.*\s+from', re.IGNORECASE), 2),
-                (re.compile(r'\.js\b|javascript\b|node\.js', re.IGNORECASE), 1),
-                (re.compile(r'\$\{.*\}|`.*`', re.IGNORECASE), 1),  # Template literals
-            ],
-            
-            'java': [
-                (re.compile(r'\bpublic\s+(?:static\s+)?(?:void|int|String)\s+\w+\s*\(', re.IGNORECASE), 4),
-                (re.compile(r'\bclass\s+\w+\s*(?:extends\s+\w+)?\s*\{', re.IGNORECASE), 3),
-                (re.compile(r'\bpublic\s+static\s+void\s+main\s*\(', re.IGNORECASE), 4),
-                (re.compile(r'\bSystem\.out\.print', re.IGNORECASE), 3),
-                (re.compile(r'\bimport\s+java\.', re.IGNORECASE), 3),
-                (re.compile(r'\b(?:public|private|protected)\s+(?:static\s+)?(?:final\s+)?\w+', re.IGNORECASE), 2),
-                (re.compile(r'\.java\b', re.IGNORECASE), 1),
-                (re.compile(r'\bnew\s+\w+\s*\(', re.IGNORECASE), 1),
-            ],
-            
-            'cpp': [
-                (re.compile(r'#include\s*<[^>]+>|#include\s*"[^"]+"', re.IGNORECASE), 3),
-                (re.compile(r'\bint\s+main\s*\([^)]*\)\s*\{', re.IGNORECASE), 4),
-                (re.compile(r'\bstd::|using\s+namespace\s+std', re.IGNORECASE), 3),
-                (re.compile(r'\bcout\s*<<|\bcin\s*>>', re.IGNORECASE), 3),
-                (re.compile(r'\b(?:public|private|protected)\s*:', re.IGNORECASE), 2),
-                (re.compile(r'\bclass\s+\w+\s*(?::\s*(?:public|private|protected)\s+\w+)?\s*\{', re.IGNORECASE), 2),
-                (re.compile(r'\.cpp\b|\.hpp\b|\.h\b|c\+\+', re.IGNORECASE), 1),
-                (re.compile(r'\bdelete\s+\w+|\bnew\s+\w+', re.IGNORECASE), 1),
-            ],
-            
-            'c': [
-                (re.compile(r'#include\s*<[^>]+\.h>', re.IGNORECASE), 3),
-                (re.compile(r'\bint\s+main\s*\([^)]*\)\s*\{', re.IGNORECASE), 3),
-                (re.compile(r'\bprintf\s*\(|\bscanf\s*\(', re.IGNORECASE), 3),
-                (re.compile(r'\bmalloc\s*\(|\bfree\s*\(', re.IGNORECASE), 2),
-                (re.compile(r'\bstruct\s+\w+\s*\{', re.IGNORECASE), 2),
-                (re.compile(r'\.c\b(?!pp)', re.IGNORECASE), 1),
-                (re.compile(r'\btypedef\s+(?:struct\s+)?\w+', re.IGNORECASE), 1),
-            ],
-            
-            'csharp': [
-                (re.compile(r'\busing\s+System', re.IGNORECASE), 4),  # Higher weight for C# specific
-                (re.compile(r'\bnamespace\s+\w+\s*\{', re.IGNORECASE), 4),  # Higher weight for namespace
-                (re.compile(r'\bConsole\.WriteLine\s*\(', re.IGNORECASE), 4),  # Higher weight for C# specific
-                (re.compile(r'\bpublic\s+(?:static\s+)?(?:void|int|string)\s+\w+\s*\(', re.IGNORECASE), 2),  # Lower weight since shared with Java
-                (re.compile(r'\bpublic\s+class\s+\w+', re.IGNORECASE), 1),  # Lower weight since shared with Java
-                (re.compile(r'\.cs\b|C#', re.IGNORECASE), 2),
-                (re.compile(r'\bvar\s+\w+\s*=|\bstring\s+\w+', re.IGNORECASE), 2),
-                (re.compile(r'\bConsole\.Write\s*\(|\bConsole\.Read', re.IGNORECASE), 3),  # More C# specific patterns
-            ],
-            
-            'php': [
-                (re.compile(r'<\?php', re.IGNORECASE), 4),
-                (re.compile(r'\$\w+\s*=', re.IGNORECASE), 3),
-                (re.compile(r'\bfunction\s+\w+\s*\([^)]*\)\s*\{', re.IGNORECASE), 2),
-                (re.compile(r'\becho\s+|\bprint\s+', re.IGNORECASE), 2),
-                (re.compile(r'\brequire\s+|\binclude\s+', re.IGNORECASE), 2),
-                (re.compile(r'\.php\b', re.IGNORECASE), 1),
-                (re.compile(r'->\w+|\$this->', re.IGNORECASE), 1),
-            ],
-            
-            'ruby': [
-                (re.compile(r'\bdef\s+\w+(?:\([^)]*\))?\s*$', re.MULTILINE | re.IGNORECASE), 3),
-                (re.compile(r'\bclass\s+\w+(?:\s*<\s*\w+)?\s*$', re.MULTILINE | re.IGNORECASE), 3),
-                (re.compile(r'\bend\s*$', re.MULTILINE | re.IGNORECASE), 2),
-                (re.compile(r'\bputs\s+|\bp\s+', re.IGNORECASE), 2),
-                (re.compile(r'\brequire\s+["\']|\bgem\s+["\']', re.IGNORECASE), 2),
-                (re.compile(r'\.rb\b|ruby', re.IGNORECASE), 1),
-                (re.compile(r'@\w+|@@\w+', re.IGNORECASE), 1),  # Instance/class variables
-            ],
-            
-            'go': [
-                (re.compile(r'\bpackage\s+\w+', re.IGNORECASE), 3),
-                (re.compile(r'\bfunc\s+\w+\s*\([^)]*\)', re.IGNORECASE), 3),
-                (re.compile(r'\bimport\s*\(|\bimport\s+"', re.IGNORECASE), 2),
-                (re.compile(r'\bfmt\.Print|\bfmt\.Sprintf', re.IGNORECASE), 3),
-                (re.compile(r':=|\bvar\s+\w+\s+\w+', re.IGNORECASE), 2),
-                (re.compile(r'\.go\b|golang', re.IGNORECASE), 1),
-                (re.compile(r'\bgo\s+func\s*\(', re.IGNORECASE), 2),  # Goroutines
-            ],
-            
-            'rust': [
-                (re.compile(r'\bfn\s+\w+\s*\([^)]*\)', re.IGNORECASE), 4),  # Higher weight for fn
-                (re.compile(r'\buse\s+\w+::', re.IGNORECASE), 3),  # Higher weight for use statements
-                (re.compile(r'\blet\s+(?:mut\s+)?\w+\s*=', re.IGNORECASE), 2),
-                (re.compile(r'\bprintln!\s*\(|\bpanic!\s*\(', re.IGNORECASE), 4),  # Higher weight for macros
-                (re.compile(r'\bmatch\s+\w+\s*\{', re.IGNORECASE), 3),  # Higher weight for match
-                (re.compile(r'\.rs\b|rust', re.IGNORECASE), 1),
-                (re.compile(r'\bimpl\s+\w+|\btrait\s+\w+', re.IGNORECASE), 3),  # Higher weight
-                (re.compile(r'\b(?:u8|u16|u32|u64|i8|i16|i32|i64|f32|f64|usize|isize)\b', re.IGNORECASE), 2),  # Rust types
-                (re.compile(r'\b_\s*=>', re.IGNORECASE), 3),  # Rust match arm with underscore
-            ],
-            
-            'swift': [
-                (re.compile(r'\bfunc\s+\w+\s*\([^)]*\)', re.IGNORECASE), 3),
-                (re.compile(r'\bimport\s+(?:Foundation|UIKit|SwiftUI)', re.IGNORECASE), 3),
-                (re.compile(r'\bvar\s+\w+\s*:\s*\w+|\blet\s+\w+\s*:\s*\w+', re.IGNORECASE), 2),
-                (re.compile(r'\bprint\s*\(', re.IGNORECASE), 2),
-                (re.compile(r'\bclass\s+\w+\s*:\s*\w+', re.IGNORECASE), 2),
-                (re.compile(r'\.swift\b|swift', re.IGNORECASE), 1),
-                (re.compile(r'\bguard\s+|\bdefer\s+', re.IGNORECASE), 2),
-            ],
-            
-            'kotlin': [
-                (re.compile(r'\bfun\s+\w+\s*\([^)]*\)', re.IGNORECASE), 3),
-                (re.compile(r'\bclass\s+\w+(?:\s*:\s*\w+)?\s*\{', re.IGNORECASE), 2),
-                (re.compile(r'\bval\s+\w+\s*=|\bvar\s+\w+\s*=', re.IGNORECASE), 2),
-                (re.compile(r'\bprintln\s*\(', re.IGNORECASE), 2),
-                (re.compile(r'\bimport\s+\w+(?:\.\w+)*', re.IGNORECASE), 1),
-                (re.compile(r'\.kt\b|kotlin', re.IGNORECASE), 1),
-                (re.compile(r'\bwhen\s*\(|\bdata\s+class', re.IGNORECASE), 2),
-            ],
-        }
-        
-        # SQL patterns (more comprehensive)
-        self.language_patterns['sql'] = [
-            (re.compile(r'\bSELECT\s+.*\s+FROM\s+\w+', re.IGNORECASE), 4),
-            (re.compile(r'\bINSERT\s+INTO\s+\w+', re.IGNORECASE), 3),
-            (re.compile(r'\bUPDATE\s+\w+\s+SET\s+', re.IGNORECASE), 3),
-            (re.compile(r'\bDELETE\s+FROM\s+\w+', re.IGNORECASE), 3),
-            (re.compile(r'\bCREATE\s+TABLE\s+\w+', re.IGNORECASE), 3),
-            (re.compile(r'\bJOIN\s+\w+\s+ON\s+', re.IGNORECASE), 2),
-            (re.compile(r'\bWHERE\s+\w+\s*[=<>]', re.IGNORECASE), 2),
-            (re.compile(r'\bGROUP\s+BY\s+|\bORDER\s+BY\s+', re.IGNORECASE), 2),
-        ]
-        
-        # HTML patterns
-        self.language_patterns['html'] = [
-            (re.compile(r'<!DOCTYPE\s+html>', re.IGNORECASE), 4),
-            (re.compile(r'<html[^>]*>|</html>', re.IGNORECASE), 3),
-            (re.compile(r'<head[^>]*>|</head>|<body[^>]*>|</body>', re.IGNORECASE), 3),
-            (re.compile(r'<(?:div|span|p|h[1-6]|a|img|ul|ol|li|form|input|button|table|tr|td|th)[^>]*>', re.IGNORECASE), 2),
-            (re.compile(r'<\w+[^>]*\s+(?:class|id|src|href|action|method|type|name)\s*=', re.IGNORECASE), 2),
-            (re.compile(r'</(?:div|span|p|h[1-6]|a|form|button|table|tr|td|th)>', re.IGNORECASE), 1),
-            (re.compile(r'\.html?\b', re.IGNORECASE), 1),
-        ]
-        
-        # CSS patterns (more specific to avoid false matches with other languages)
-        self.language_patterns['css'] = [
-            (re.compile(r'[.#]\w+\s*\{[^}]*(?:color|background|margin|padding|border|font|width|height)[^}]*\}', re.IGNORECASE), 4),  # CSS with properties
-            (re.compile(r'\w+\s*\{\s*(?:color|background|margin|padding|border|font|width|height|display|position)', re.IGNORECASE), 3),  # CSS properties
-            (re.compile(r'@media\s+|\b@import\s+|\b@keyframes\s+', re.IGNORECASE), 4),
-            (re.compile(r':\s*(?:hover|active|focus|before|after|nth-child|first-child|last-child)', re.IGNORECASE), 3),
-            (re.compile(r'\.css\b', re.IGNORECASE), 1),
-            (re.compile(r'(?:px|em|rem|%|vh|vw|pt)\s*[;}]', re.IGNORECASE), 2),  # CSS units
-        ]
+        """Bind the regex patterns for detecting specific programming languages.
+        
+        The patterns are compiled once at import and shared by all instances;
+        each instance gets its own mapping so it can be extended per rule.
+        """
+        self.language_patterns = dict(_LANGUAGE_PATTERNS)
     
     def evaluate(self, request_data: Dict[str, Any]) -> Decision:
         """Evaluate based on the specific programming language detected.
@@ -208,14 +298,19 @@ class CodeLanguageRule(Rule):
         Returns:
             Decision based on detected language
         """
-        # Extract text content from messages
-        text_content = self._extract_text_content(request_data)
+        # Extract the most recent text content from messages
+        text_content = self._extract_scan_text(request_data)
         
         if not text_content:
             return Decision(self.default, trigger="no_content")
         
-        # Try regex-based detection first
-        detected_language = self._detect_language_regex(text_content)
+        # Try regex-based detection first; the result only depends on the
+        # text, so it is remembered for repeated messages
+        cache_key = self._scan_text_digest(request_data)
+        detected_language = self._language_cache.get(cache_key, _NOT_CACHED)
+        if detected_language is _NOT_CACHED:
+            detected_language = self._detect_language_regex(text_content)
+            self._language_cache.put(cache_key, detected_language)
         
         if detected_language and detected_language in self.language_mappings:
             return Decision(self.language_mappings[detected_language], trigger=detected_language)
@@ -223,8 +318,7 @@ class CodeLanguageRule(Rule):
         # If no regex match and LLM fallback is enabled, try LLM detection
         if self.enable_llm_fallback and self.language_mappings:
             # Get unmapped languages that could be detected by LLM
-            unmapped_languages = [lang for lang in self.language_mappings.keys() 
-                                if lang not in self.language_patterns]
+            unmapped_languages = self._get_unmapped_languages()
             
             if unmapped_languages:
                 llm_detected = self._detect_language_llm(text_content, unmapped_languages)
@@ -234,19 +328,6 @@ class CodeLanguageRule(Rule):
         # Fall back to default
         return Decision(self.default, trigger="no_language_detected")
     
-    def _extract_text_content(self, request_data: Dict[str, Any]) -> str:
-        """Extract text content from request messages."""
-        messages = request_data.get('messages', [])
-        text_parts = []
-        
-        for message in messages:
-            if isinstance(message, dict) and 'content' in message:
-                content = message['content']
-                if isinstance(content, str):
-                    text_parts.append(content)
-        
-        return '\n'.join(text_parts)
-    
     def _detect_language_regex(self, text: str) -> Optional[str]:
         """Detect programming language using regex patterns.
         
@@ -256,31 +337,48 @@ class CodeLanguageRule(Rule):
         Returns:
             Detected language name or None
         """
-        language_scores = {}
+        # Highest score so far and the languages reaching it, tracked while
+        # scoring
+        max_score = 0
+        best_languages: List[str] = []
+        
+        # On ASCII text, lowercasing matches what re.IGNORECASE does, so the
+        # text is lowercased once for all patterns, and a pattern can be
+        # skipped without a scan when none of its literals is in the
+        # lowercased text
+        lowered = text.lower() if text.isascii() else None
+        shared_counts: Dict[re.Pattern, int] = {}
         
         # Score each language based on pattern matches
         for language, patterns in self.language_patterns.items():
             score = 0
-            for pattern, weight in patterns:
-                matches = len(pattern.findall(text))
-                score += matches * weight
+            if lowered is not None and patterns is _LANGUAGE_PATTERNS.get(language):
+                for pattern, on_lowered, weight, literals in _ASCII_LANGUAGE_SCAN_TABLE[language]:
+                    if literals and not any(literal in lowered for literal in literals):
+                        continue
+                    if pattern in _SHARED_SCAN_PATTERNS:
+                        matches = shared_counts.get(pattern)
+                        if matches is None:
+                            matches = shared_counts[pattern] = len(pattern.findall(lowered if on_lowered else text))
+                    else:
+                        matches = len(pattern.findall(lowered if on_lowered else text))
+                    score += matches * weight
+            else:
+                for pattern, weight in patterns:
+                    matches = len(pattern.findall(text))
+                    score += matches * weight
             
-            if score > 0:
-                language_scores[language] = score
-        
-        if not language_scores:
-            return None
+            if score > max_score:
+                max_score = score
+                best_languages = [language]
+            elif score == max_score and score > 0:
+                best_languages.append(language)
         
-        # Find the maximum score
-        max_score = max(language_scores.values())
-        
-        # Minimum score threshold to avoid weak matches
+        # Minimum score threshold to avoid weak matches (also covers no
+        # matches at all)
         if max_score < 3:
             return None
         
-        # Get all languages with the maximum score
-        best_languages = [lang for lang, score in language_scores.items() if score == max_score]
-        
         # If there's only one best language, return it
         if len(best_languages) == 1:
             return best_languages[0]
@@ -311,17 +409,134 @@ class CodeLanguageRule(Rule):
             if not config.is_configured():
                 return None
             
-            credentials = config.get_credentials()
+            # The key covers everything the prompt and answer depend on, so
+            # other candidates or models never reuse a stale answer
+            cache_key = (self.llm_model, tuple(candidate_languages), text[:_MAX_PROMPT_TEXT])
+            detected = self._llm_cache.get(cache_key, _NOT_CACHED)
+            if detected is not _NOT_CACHED:
+                return detected
+            
+            # Wait for an identical call already in progress
+            with self._in_flight_lock:
+                pending = self._in_flight.get(cache_key)
+                if pending is None:
+                    future: "Future[Optional[str]]" = Future()
+                    self._in_flight[cache_key] = future
+            
+            if pending is not None:
+                return pending.result()
+            
+            try:
+                detected = self._request_language_llm(text, candidate_languages)
+            except BaseException as e:
+                with self._in_flight_lock:
+                    del self._in_flight[cache_key]
+                future.set_exception(e)
+                raise
+            
+            self._llm_cache.put(cache_key, detected)
+            with self._in_flight_lock:
+                del self._in_flight[cache_key]
+            future.set_result(detected)
+            return detected
+            
+        except Exception:
+            # If LLM detection fails, return None
+            return None
+    
+    def _request_language_llm(self, text: str, candidate_languages: List[str]) -> Optional[str]:
+        """Ask the LLM which of the candidate languages the code is written in.
+        
+        Args:
+            text: Text to analyze
+            candidate_languages: List of possible languages to choose from
+            
+        Returns:
+            Detected language name or None
             
-            # Create OpenAI client
-            client = openai.OpenAI(
-                api_key=credentials['api_key'],
-                base_url=credentials.get('api_url')
+        Raises:
+            Exception: If the API call fails
+        """
+        client = self._get_client()
+        
+        # Create prompt for language detection
+        prompt_prefix = self._get_prompt_prefix(candidate_languages)
+        prompt = f"""{prompt_prefix}{text[:_MAX_PROMPT_TEXT]}  # Limit text to avoid token limits
+```"""
+
+        # Make the API call
+        response = client.chat.completions.create(
+            model=self.llm_model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=10,
+            temperature=0.1
+        )
+        
+        # Extract the response
+        detected = response.choices[0].message.content.strip().lower()
+        
+        # Validate the response
+        if detected == "none":
+            return None
+        
+        # Check if the detected language is in our candidate list
+        for lang in candidate_languages:
+            if lang.lower() == detected:
+                return lang
+        
+        return None
+    
+    def _get_client(self) -> openai.OpenAI:
+        """Get the OpenAI client for language detection, creating it on first use.
+        
+        A new client is created if the configured credentials change.
+        """
+        credentials = config.get_credentials()
+        client_credentials = (credentials['api_key'], credentials.get('api_url'))
+        if self._client is None or self._client_credentials != client_credentials:
+            self._client = openai.OpenAI(
+                api_key=client_credentials[0],
+                base_url=client_credentials[1]
             )
+            self._client_credentials = client_credentials
+        return self._client
+    
+    def _get_unmapped_languages(self) -> List[str]:
+        """Get the mapped languages that have no regex patterns.
+        
+        Only the LLM can detect these. The list is built once and rebuilt
+        when languages are added to or removed from either mapping.
+        
+        Returns:
+            The mapped languages without patterns, in mapping order
+        """
+        key = (tuple(self.language_mappings), tuple(self.language_patterns))
+        cached = self._unmapped_languages
+        if cached is None or cached[0] != key:
+            cached = (key, [lang for lang in self.language_mappings
+                            if lang not in self.language_patterns])
+            self._unmapped_languages = cached
+        return cached[1]
+    
+    def _get_prompt_prefix(self, candidate_languages: List[str]) -> str:
+        """Get the language detection prompt text preceding the code snippet.
+        
+        It only depends on the candidate languages, so it is built once and
+        rebuilt when they change.
+        
+        Args:
+            candidate_languages: List of possible languages to choose from
             
-            # Create prompt for language detection
-            languages_list = ', '.join(candidate_languages)
-            prompt = f"""Analyze the following code snippet and determine which programming language it is most likely written in.
+        Returns:
+            The prompt text up to the code snippet
+        """
+        candidates = tuple(candidate_languages)
+        cached = self._prompt_prefix
+        if cached is None or cached[0] != candidates:
+            languages_list = ', '.join(candidates)
+            prompt_prefix = f"""Analyze the following code snippet and determine which programming language it is most likely written in.
 
 You must choose from one of these languages: {languages_list}
 
@@ -331,36 +546,10 @@ Respond with ONLY the language name (or "None"), nothing else.
 
 Code to analyze:
 ```
-{text[:2000]}  # Limit text to avoid token limits
-```"""
-
-            # Make the API call
-            response = client.chat.completions.create(
-                model=self.llm_model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=10,
-                temperature=0.1
-            )
-            
-            # Extract the response
-            detected = response.choices[0].message.content.strip().lower()
-            
-            # Validate the response
-            if detected == "none":
-                return None
-            
-            # Check if the detected language is in our candidate list
-            for lang in candidate_languages:
-                if lang.lower() == detected:
-                    return lang
-            
-            return None
-            
-        except Exception:
-            # If LLM detection fails, return None
-            return None
+"""
+            cached = (candidates, prompt_prefix)
+            self._prompt_prefix = cached
+        return cached[1]
     
     def __repr__(self) -> str:
         return f"CodeLanguageRule('{self.name}', {self.language_mappings}, default={self.default!r}, llm_model={self.llm_model!r}, enable_llm_fallback={self.enable_llm_fallback!r})"
@@ -2,119 +2,200 @@
 
 import re
 from typing import Any, Dict
-from .base import Rule, Decision
+from .base import LRUCache, Rule, Decision, ascii_scan_pattern
+
+
+# Word lists behind the natural language and conversational not-code patterns
+_NATURAL_LANGUAGE_WORDS = (
+    'the', 'and', 'or', 'but', 'however', 'therefore', 'because', 'although', 'while',
+    'during', 'after', 'before', 'since', 'until', 'unless', 'if', 'when', 'where', 'why',
+    'how', 'what', 'who', 'which', 'that', 'this', 'these', 'those', 'some', 'many', 'few',
+    'several', 'all', 'most', 'each', 'every', 'any', 'no', 'none', 'both', 'either', 'neither',
+)
+_CONVERSATIONAL_WORDS = (
+    'please', 'thank', 'thanks', 'hello', 'hi', 'hey', 'goodbye', 'bye', 'sorry', 'excuse',
+    'help', 'assist', 'explain', 'describe', 'tell', 'show', 'give', 'provide',
+)
+
+# Word -> number of word-list patterns matching it. On ASCII text, where
+# re.IGNORECASE is the same as comparing lowercased words, the word-list
+# patterns are counted with one pass over the words instead of a regex
+# scan per list
+_NOT_CODE_WORD_COUNTS: Dict[str, int] = {}
+for _words in (_NATURAL_LANGUAGE_WORDS, _CONVERSATIONAL_WORDS):
+    for _word in set(_words):
+        _NOT_CODE_WORD_COUNTS[_word] = _NOT_CODE_WORD_COUNTS.get(_word, 0) + 1
+del _words, _word
+
+_WORD_PATTERN = re.compile(r'\w+')
+
+# Where a line pattern starts: like ^ in re.MULTILINE mode, but only at the
+# first line start after a non-space character
+_LINE_START = r'(?:\A|(?<=\S)[^\S\n]*\n)'
+
+# Programming language keywords and constructs, each with lowercase literals
+# at least one of which appears in every match of the pattern (empty when
+# there is no such literal), and lowercase keywords at least one of which is
+# a whole word of every match (empty when the pattern has no such keywords)
+#
+# The patterns are written to scan in linear time, so that no message (like
+# one long word or thousands of blank lines) takes seconds to check:
+# - patterns beginning with \w+ only start at the beginning of a word
+#   ((?<!\w)), as a start inside a word only matches where the word's first
+#   character would have
+# - line patterns beginning with \s*, which can run across blank lines, start
+#   at _LINE_START, as the other line starts in the same run of whitespace
+#   only match where that one would have
+_CODE_PATTERN_TABLE = (
+    # Function definitions and calls
+    (re.compile(r'\b(?:def|function|func|fn)\s+\w+\s*\(', re.IGNORECASE), ('def', 'func', 'fn'), ()),
+    (re.compile(r'(?<!\w)\w+\s*\([^)]*\)\s*\{', re.IGNORECASE), ('{',), ()),  # function() {
+    (re.compile(r'(?<!\w)\w+\([^)]*\)\s*:', re.IGNORECASE), ('(',), ()),  # function():
+    
+    # Control structures
+    (re.compile(r'\b(?:if|else|elif|while|for|switch|case|try|catch|finally|with)\s*\(', re.IGNORECASE), ('(',), ()),
+    (re.compile(r'\b(?:if|else|elif|while|for|switch|case|try|catch|finally|with)\s+', re.IGNORECASE), (), ('if', 'else', 'elif', 'while', 'for', 'switch', 'case', 'try', 'catch', 'finally', 'with')),
+    
+    # Variable declarations and assignments
+    (re.compile(r'\b(?:var|let|const|int|string|bool|float|double|char|long|short)\s+\w+', re.IGNORECASE), (), ('var', 'let', 'const', 'int', 'string', 'bool', 'float', 'double', 'char', 'long', 'short')),
+    (re.compile(r'(?<!\w)\w+\s*=\s*(?:new\s+)?\w+\(', re.IGNORECASE), ('=',), ()),
+    (re.compile(r'(?<!\w)\w+\s*:\s*\w+\s*=', re.IGNORECASE), ('=',), ()),  # Go-style declarations
+    
+    # Class and object definitions
+    (re.compile(r'\b(?:class|struct|interface|enum|type)\s+\w+', re.IGNORECASE), (), ('class', 'struct', 'interface', 'enum', 'type')),
+    (re.compile(r'\b(?:public|private|protected|static|final|abstract)\s+', re.IGNORECASE), ('public', 'private', 'protected', 'static', 'final', 'abstract'), ()),
+    
+    # Import/include statements
+    (re.compile(r'\b(?:import|from|include|require|using|#include)\s+', re.IGNORECASE), (), ('import', 'from', 'include', 'require', 'using')),
+    (re.compile(r'from\s+\w+\s+import', re.IGNORECASE), ('import',), ()),
+    
+    # Common programming operators and syntax
+    (re.compile(r'[=!<>]=|[+\-*/%]=|\+\+|--|&&|\|\||<<|>>', re.IGNORECASE), ('=', '++', '--', '&&', '||', '<<', '>>'), ()),
+    (re.compile(r'=>|->|\.\.\.|::', re.IGNORECASE), ('=>', '->', '...', '::'), ()),
+    
+    # Code blocks and brackets
+    (re.compile(r'{\s*$', re.MULTILINE), ('{',), ()),  # Opening brace on its own line
+    (re.compile(_LINE_START + r'\s*}', re.MULTILINE), ('}',), ()),  # Closing brace on its own line
+    (re.compile(_LINE_START + r'\s*\w+\s*\([^)]*\)\s*{', re.MULTILINE), ('{',), ()),  # Function with brace
+    
+    # Common programming patterns
+    (re.compile(r'\breturn\s+(?:\w+|["\'].*["\']|null|true|false|None|\d+)', re.IGNORECASE), ('return',), ()),
+    (re.compile(r'\bprint\s*\(|console\.log\s*\(|System\.out\.print', re.IGNORECASE), ('print', 'console.log'), ()),
+    (re.compile(r'\bthrow\s+new\s+\w+|raise\s+\w+', re.IGNORECASE), ('throw', 'raise'), ()),
+    
+    # SQL patterns (stronger patterns for better detection)
+    # SELECT\s+.*\s+FROM\s+\w+, trying each way of splitting the whitespace
+    # once (as written, SELECT followed by many spaces takes minutes)
+    (re.compile(r'\bSELECT(?:(?>\s+)[^\n]*(?<!\s)\s++FROM\s++\w++|\s\s++FROM\s++\w++)', re.IGNORECASE), ('select',), ()),
+    (re.compile(r'\bINSERT\s+INTO\s+\w+', re.IGNORECASE), ('insert',), ()),
+    (re.compile(r'\bUPDATE\s+\w+\s+SET\s+', re.IGNORECASE), ('update',), ()),
+    (re.compile(r'\bDELETE\s+FROM\s+\w+', re.IGNORECASE), ('delete',), ()),
+    (re.compile(r'\bCREATE\s+TABLE\s+\w+', re.IGNORECASE), ('create',), ()),
+    (re.compile(r'\b(?:SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER|FROM|WHERE|JOIN|GROUP BY|ORDER BY)\b', re.IGNORECASE), ('select', 'insert', 'update', 'delete', 'create', 'drop', 'alter', 'from', 'where', 'join', 'group', 'order'), ()),
+    
+    # HTML/XML tags (basic detection)
+    (re.compile(r'<\/?[a-zA-Z][^>]*>', re.IGNORECASE), ('<',), ()),
+    (re.compile(r'<\w+[^>]*\/>', re.IGNORECASE), ('/>',), ()),  # Self-closing tags
+    
+    # JSON patterns
+    (re.compile(r'{\s*["\']?\w+["\']?\s*:\s*["\']?[^,}]+["\']?', re.IGNORECASE), ('{',), ()),
+    
+    # Command line patterns
+    (re.compile(_LINE_START + r'\s*[$#]\s+\w+', re.MULTILINE), ('$', '#'), ()),  # Shell prompts
+    (re.compile(r'\b(?:cd|ls|mkdir|rm|cp|mv|grep|awk|sed|curl|wget|git|npm|pip|docker)\s+', re.IGNORECASE), (), ('cd', 'ls', 'mkdir', 'rm', 'cp', 'mv', 'grep', 'awk', 'sed', 'curl', 'wget', 'git', 'npm', 'pip', 'docker')),
+    
+    # Configuration file patterns
+    (re.compile(r'^\s*\w+\s*=\s*["\']?[^"\'\n]+["\']?$', re.MULTILINE), ('=',), ()),
+    (re.compile(_LINE_START + r'\s*\[\w+\]', re.MULTILINE), ('[',), ()),  # INI sections
+    
+    # Code comments
+    (re.compile(r'//.*$|/\*.*?\*/|#.*$|<!--.*?-->', re.MULTILINE | re.DOTALL), ('//', '/*', '#', '<!--'), ()),
+    
+    # Indentation patterns (common in Python, YAML, etc.)
+    (re.compile(_LINE_START + r'\s{4,}\w+|^\t+\w+', re.MULTILINE), (), ()),  # 4+ spaces or tabs
+    
+    # Error messages and stack traces
+    (re.compile(r'\b(?:Error|Exception|Traceback|at\s+\w+\.\w+)', re.IGNORECASE), (), ()),
+    (re.compile(r'File\s+"[^"]+",\s+line\s+\d+', re.IGNORECASE), ('file',), ()),
+    
+    # Version control patterns
+    (re.compile(r'\b(?:commit|branch|merge|pull|push|clone)\s+\w+', re.IGNORECASE), ('commit', 'branch', 'merge', 'pull', 'push', 'clone'), ()),
+    
+    # Package manager patterns
+    (re.compile(r'\b(?:npm\s+install|pip\s+install|composer\s+install|gem\s+install)', re.IGNORECASE), ('install',), ()),
+)
+_CODE_PATTERNS = tuple(pattern for pattern, _, _ in _CODE_PATTERN_TABLE)
+
+# Patterns that indicate NOT code (to reduce false positives)
+_NOT_CODE_PATTERNS = (
+    # Natural language patterns
+    re.compile(r'\b(?:' + '|'.join(_NATURAL_LANGUAGE_WORDS) + r')\b', re.IGNORECASE),
+    
+    # Question patterns
+    re.compile(r'\?.*(?:how|what|why|when|where|who|which|can|could|would|should|will|do|does|did|is|are|was|were)', re.IGNORECASE),
+    re.compile(r'(?:how|what|why|when|where|who|which|can|could|would|should|will|do|does|did|is|are|was|were).*\?', re.IGNORECASE),
+    
+    # Conversational patterns
+    re.compile(r'\b(?:' + '|'.join(_CONVERSATIONAL_WORDS) + r')\b', re.IGNORECASE),
+)
+
+# Order in which _contains_code scans the code patterns (indices into
+# _CODE_PATTERN_TABLE): patterns that match code most often for the least
+# scanning time come first, so obvious code reaches the threshold after a
+# few scans
+_CODE_SCAN_ORDER = (
+    14, 26, 34, 33, 15, 13, 29, 28, 12, 0, 17, 10, 27, 4, 2, 31, 25, 35, 11, 18,
+    8, 5, 1, 20, 9, 36, 16, 6, 38, 30, 3, 7, 24, 22, 21, 37, 19, 23, 32,
+)
+_CODE_PATTERNS_BY_YIELD = tuple(_CODE_PATTERNS[index] for index in _CODE_SCAN_ORDER)
+
+# What _contains_code scans on ASCII text, in _CODE_SCAN_ORDER: (pattern,
+# whether it is matched against the lowercased text, literals, keywords).
+# IGNORECASE patterns are replaced by lowercase variants, so the text is
+# lowercased once instead of being case folded by every pattern
+_ASCII_CODE_SCAN_TABLE = tuple(
+    (*ascii_scan_pattern(pattern), literals, frozenset(keywords))
+    for pattern, literals, keywords in (_CODE_PATTERN_TABLE[index] for index in _CODE_SCAN_ORDER)
+)
+
+# Lowercase variants of the not-code patterns other than the word lists,
+# scanned on lowercased ASCII text when the default patterns are in use (the
+# word lists are counted from _NOT_CODE_WORD_COUNTS)
+_ASCII_NOT_CODE_PHRASE_PATTERNS = tuple(
+    ascii_scan_pattern(pattern)[0] for pattern in _NOT_CODE_PATTERNS[1:3]
+)
 
 
 class CodeRule(Rule):
     """Rule that makes decisions based on whether the request contains code."""
     
-    def __init__(self, name: str, code: str, not_code: str):
+    def __init__(self, name: str, code: str, not_code: str, cache_size: int = 1024):
         """Initialize a CodeRule.
         
         Args:
             name: The name of this rule
             code: Model name or rule name (deimos/rules/rule-name) to use when code is detected
             not_code: Model name or rule name (deimos/rules/rule-name) to use when no code is detected
+            cache_size: Number of detection results to remember per message
+                text, so repeated messages skip the scan (0 disables)
         """
         super().__init__(name)
         self.code = code
         self.not_code = not_code
         
-        # Compile regex patterns for code detection
+        # Text digest -> whether the text contains code
+        self._detection_cache = LRUCache(cache_size)
+        
+        # Regex patterns for code detection
         self._compile_patterns()
     
     def _compile_patterns(self) -> None:
-        """Compile regex patterns for detecting code."""
-        # Programming language keywords and constructs
-        self.code_patterns = [
-            # Function definitions and calls
-            re.compile(r'\b(?:def|function|func|fn)\s+\w+\s*\(', re.IGNORECASE),
-            re.compile(r'\w+\s*\([^)]*\)\s*\{', re.IGNORECASE),  # function() {
-            re.compile(r'\w+\([^)]*\)\s*:', re.IGNORECASE),  # function():
-            
-            # Control structures
-            re.compile(r'\b(?:if|else|elif|while|for|switch|case|try|catch|finally|with)\s*\(', re.IGNORECASE),
-            re.compile(r'\b(?:if|else|elif|while|for|switch|case|try|catch|finally|with)\s+', re.IGNORECASE),
-            
-            # Variable declarations and assignments
-            re.compile(r'\b(?:var|let|const|int|string|bool|float|double|char|long|short)\s+\w+', re.IGNORECASE),
-            re.compile(r'\w+\s*=\s*(?:new\s+)?\w+\(', re.IGNORECASE),
-            re.compile(r'\w+\s*:\s*\w+\s*=', re.IGNORECASE),  # Go-style declarations
-            
-            # Class and object definitions
-            re.compile(r'\b(?:class|struct|interface|enum|type)\s+\w+', re.IGNORECASE),
-            re.compile(r'\b(?:public|private|protected|static|final|abstract)\s+', re.IGNORECASE),
-            
-            # Import/include statements
-            re.compile(r'\b(?:import|from|include|require|using|#include)\s+', re.IGNORECASE),
-            re.compile(r'from\s+\w+\s+import', re.IGNORECASE),
-            
-            # Common programming operators and syntax
-            re.compile(r'[=!<>]=|[+\-*/%]=|\+\+|--|&&|\|\||<<|>>', re.IGNORECASE),
-            re.compile(r'=>|->|\.\.\.|::', re.IGNORECASE),
-            
-            # Code blocks and brackets
-            re.compile(r'{\s*$', re.MULTILINE),  # Opening brace on its own line
-            re.compile(r'^\s*}', re.MULTILINE),  # Closing brace on its own line
-            re.compile(r'^\s*\w+\s*\([^)]*\)\s*{', re.MULTILINE),  # Function with brace
-            
-            # Common programming patterns
-            re.compile(r'\breturn\s+(?:\w+|["\'].*["\']|null|true|false|None|\d+)', re.IGNORECASE),
-            re.compile(r'\bprint\s*\(|console\.log\s*\(|System\.out\.print', re.IGNORECASE),
-            re.compile(r'\bthrow\s+new\s+\w+|raise\s+\w+', re.IGNORECASE),
-            
-            # SQL patterns (stronger patterns for better detection)
-            re.compile(r'\bSELECT\s+.*\s+FROM\s+\w+', re.IGNORECASE),
-            re.compile(r'\bINSERT\s+INTO\s+\w+', re.IGNORECASE),
-            re.compile(r'\bUPDATE\s+\w+\s+SET\s+', re.IGNORECASE),
-            re.compile(r'\bDELETE\s+FROM\s+\w+', re.IGNORECASE),
-            re.compile(r'\bCREATE\s+TABLE\s+\w+', re.IGNORECASE),
-            re.compile(r'\b(?:SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER|FROM|WHERE|JOIN|GROUP BY|ORDER BY)\b', re.IGNORECASE),
-            
-            # HTML/XML tags (basic detection)
-            re.compile(r'<\/?[a-zA-Z][^>]*>', re.IGNORECASE),
-            re.compile(r'<\w+[^>]*\/>', re.IGNORECASE),  # Self-closing tags
-            
-            # JSON patterns
-            re.compile(r'{\s*["\']?\w+["\']?\s*:\s*["\']?[^,}]+["\']?', re.IGNORECASE),
-            
-            # Command line patterns
-            re.compile(r'^\s*[$#]\s+\w+', re.MULTILINE),  # Shell prompts
-            re.compile(r'\b(?:cd|ls|mkdir|rm|cp|mv|grep|awk|sed|curl|wget|git|npm|pip|docker)\s+', re.IGNORECASE),
-            
-            # Configuration file patterns
-            re.compile(r'^\s*\w+\s*=\s*["\']?[^"\'\n]+["\']?$', re.MULTILINE),
-            re.compile(r'^\s*\[\w+\]', re.MULTILINE),  # INI sections
-            
-            # Code comments
-            re.compile(r'//.*$|/\*.*?\*/|#.*$|<!--.*?-->', re.MULTILINE | re.DOTALL),
-            
-            # Indentation patterns (common in Python, YAML, etc.)
-            re.compile(r'^\s{4,}\w+|^\t+\w+', re.MULTILINE),  # 4+ spaces or tabs
-            
-            # Error messages and stack traces
-            re.compile(r'\b(?:Error|Exception|Traceback|at\s+\w+\.\w+)', re.IGNORECASE),
-            re.compile(r'File\s+"[^"]+",\s+line\s+\d+', re.IGNORECASE),
-            
-            # Version control patterns
-            re.compile(r'\b(?:commit|branch|merge|pull|push|clone)\s+\w+', re.IGNORECASE),
-            
-            # Package manager patterns
-            re.compile(r'\b(?:npm\s+install|pip\s+install|composer\s+install|gem\s+install)', re.IGNORECASE),
-        ]
-        
-        # Patterns that indicate NOT code (to reduce false positives)
-        self.not_code_patterns = [
-            # Natural language patterns
-            re.compile(r'\b(?:the|and|or|but|however|therefore|because|although|while|during|after|before|since|until|unless|if|when|where|why|how|what|who|which|that|this|these|those|some|many|few|several|all|most|each|every|any|no|none|both|either|neither)\b', re.IGNORECASE),
-            
-            # Question patterns
-            re.compile(r'\?.*(?:how|what|why|when|where|who|which|can|could|would|should|will|do|does|did|is|are|was|were)', re.IGNORECASE),
-            re.compile(r'(?:how|what|why|when|where|who|which|can|could|would|should|will|do|does|did|is|are|was|were).*\?', re.IGNORECASE),
-            
-            # Conversational patterns
-            re.compile(r'\b(?:please|thank|thanks|hello|hi|hey|goodbye|bye|sorry|excuse|help|assist|explain|describe|tell|show|give|provide)\b', re.IGNORECASE),
-        ]
+        """Bind the regex patterns for detecting code.
+        
+        The patterns are compiled once at import and shared by all instances.
+        """
+        self.code_patterns = _CODE_PATTERNS
+        self.not_code_patterns = _NOT_CODE_PATTERNS
     
     def evaluate(self, request_data: Dict[str, Any]) -> Decision:
         """Evaluate based on whether the request contains code.
@@ -125,38 +206,25 @@ class CodeRule(Rule):
         Returns:
             Decision based on code detection
         """
-        # Extract text content from messages
-        text_content = self._extract_text_content(request_data)
+        # Extract the most recent text content from messages
+        text_content = self._extract_scan_text(request_data)
         
         if not text_content:
             return Decision(self.not_code, trigger="no_content")
         
-        # Check if content contains code
-        if self._contains_code(text_content):
+        # Check if content contains code; the result only depends on the
+        # text, so it is remembered for repeated messages
+        cache_key = self._scan_text_digest(request_data)
+        contains_code = self._detection_cache.get(cache_key)
+        if contains_code is None:
+            contains_code = self._contains_code(text_content)
+            self._detection_cache.put(cache_key, contains_code)
+        
+        if contains_code:
             return Decision(self.code, trigger="code_detected")
         else:
             return Decision(self.not_code, trigger="no_code_detected")
     
-    def _extract_text_content(self, request_data: Dict[str, Any]) -> str:
-        """Extract text content from request messages.
-        
-        Args:
-            request_data: The complete request data
-            
-        Returns:
-            Combined text content from all messages
-        """
-        messages = request_data.get('messages', [])
-        text_parts = []
-        
-        for message in messages:
-            if isinstance(message, dict) and 'content' in message:
-                content = message['content']
-                if isinstance(content, str):
-                    text_parts.append(content)
-        
-        return '\n'.join(text_parts)
-    
     def _contains_code(self, text: str) -> bool:
         """Determine if text contains code using regex patterns.
         
@@ -166,29 +234,65 @@ class CodeRule(Rule):
         Returns:
             True if code is detected, False otherwise
         """
-        # Count matches for code patterns
+        # On ASCII text, lowercasing matches what re.IGNORECASE does, so the
+        # text is lowercased once for all patterns, and a pattern can be
+        # skipped without a scan when none of its literals is in the
+        # lowercased text, or none of its keywords is one of its words
+        lowered = text.lower() if text.isascii() else None
+        words = None
+        
+        if self.code_patterns is not _CODE_PATTERNS:
+            scan_table = [(pattern, False, (), ()) for pattern in self.code_patterns]
+        elif lowered is None:
+            scan_table = [(pattern, False, (), ()) for pattern in _CODE_PATTERNS_BY_YIELD]
+        else:
+            scan_table = _ASCII_CODE_SCAN_TABLE
+        
+        # Count matches for code patterns one at a time, stopping as soon as
+        # there are enough for a strong code indicator (without scanning the
+        # rest of the text for that pattern)
         code_matches = 0
-        for pattern in self.code_patterns:
-            matches = len(pattern.findall(text))
-            code_matches += matches
+        for pattern, on_lowered, literals, keywords in scan_table:
+            if literals and not any(literal in lowered for literal in literals):
+                continue
+            if keywords:
+                if words is None:
+                    words = _WORD_PATTERN.findall(lowered)
+                    word_set = set(words)
+                if keywords.isdisjoint(word_set):
+                    continue
+            
+            for _ in pattern.finditer(lowered if on_lowered else text):
+                code_matches += 1
+                
+                # Strong code indicators (need more matches for high confidence)
+                if code_matches >= 4:
+                    return True
+        
+        if code_matches == 0:
+            return False
         
         # Count matches for not-code patterns
         not_code_matches = 0
-        for pattern in self.not_code_patterns:
-            matches = len(pattern.findall(text))
-            not_code_matches += matches
+        if lowered is not None and self.not_code_patterns is _NOT_CODE_PATTERNS:
+            if words is None:
+                words = _WORD_PATTERN.findall(lowered)
+            word_counts = _NOT_CODE_WORD_COUNTS
+            for word in words:
+                if word in word_counts:
+                    not_code_matches += word_counts[word]
+            for pattern in _ASCII_NOT_CODE_PHRASE_PATTERNS:
+                not_code_matches += len(pattern.findall(lowered))
+        else:
+            for pattern in self.not_code_patterns:
+                matches = len(pattern.findall(text))
+                not_code_matches += matches
         
         # Decision logic: code is detected if:
         # 1. There are code matches AND
         # 2. Code matches significantly outnumber natural language matches OR
-        # 3. There are strong code indicators (multiple matches)
-        
-        if code_matches == 0:
-            return False
-        
-        # Strong code indicators (need more matches for high confidence)
-        if code_matches >= 4:
-            return True
+        # 3. There are strong code indicators (multiple matches, handled
+        #    above)
         
         # If there are many natural language indicators, be more conservative
         if not_code_matches >= 5 and code_matches < 3:
@@ -75,7 +75,7 @@ class ConversationContextRule(Rule):
         Returns:
             Dictionary with conversation analysis results
         """
-        messages = request_data.get('messages', [])
+        messages = request_data.get('messages') or ()
         
         # Count messages and calculate total character count
         message_count = 0
@@ -1,8 +1,8 @@
 """Message length-based rule implementation."""
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 import tiktoken
-from .base import Rule, Decision
+from .base import LRUCache, Rule, Decision, digest_text, request_cached
 
 
 class MessageLengthRule(Rule):
@@ -14,7 +14,8 @@ class MessageLengthRule(Rule):
                  short_model: str,
                  medium_model: str,
                  long_model: str,
-                 encoding_name: str = "cl100k_base"):
+                 encoding_name: str = "cl100k_base",
+                 cache_size: int = 1024):
         """Initialize a MessageLengthRule.
         
         Args:
@@ -25,6 +26,9 @@ class MessageLengthRule(Rule):
             medium_model: Model name or rule name (deimos/rules/rule-name) to use for medium messages (short_threshold <= length < long_threshold)
             long_model: Model name or rule name (deimos/rules/rule-name) to use for long messages (>= long_threshold)
             encoding_name: The tiktoken encoding to use (default: "cl100k_base" for GPT-4/3.5-turbo)
+            cache_size: Number of token counts to remember per message text,
+                so the earlier turns of a conversation are not tokenized
+                again on every request (0 disables)
         """
         super().__init__(name)
         
@@ -46,6 +50,9 @@ class MessageLengthRule(Rule):
         except KeyError:
             raise ValueError(f"Unknown encoding: {encoding_name}")
         self.encoding_name = encoding_name
+        
+        # Digest of a piece of the user text -> its token count
+        self._token_count_cache = LRUCache(cache_size)
     
     def evaluate(self, request_data: Dict[str, Any]) -> Decision:
         """Evaluate based on the total token length of user messages.
@@ -56,11 +63,8 @@ class MessageLengthRule(Rule):
         Returns:
             Decision based on message token length
         """
-        # Extract text content from messages
-        text_content = self._extract_text_content(request_data)
-        
-        # Calculate total token count
-        total_tokens = self._count_tokens(text_content)
+        # Calculate total token count of the user messages
+        total_tokens = self._count_user_tokens(request_data)
         
         # Determine which model to use based on token count
         if total_tokens < self.short_threshold:
@@ -79,7 +83,25 @@ class MessageLengthRule(Rule):
         Returns:
             Combined text content from all user messages
         """
-        messages = request_data.get('messages', [])
+        return request_cached(
+            request_data, 'user_text',
+            lambda: '\n'.join(self._extract_user_text_parts(request_data))
+        )
+    
+    def _extract_user_text_parts(self, request_data: Dict[str, Any]) -> List[str]:
+        """Extract the string content of each user message.
+        
+        Args:
+            request_data: The complete request data
+            
+        Returns:
+            The user message contents, in order
+        """
+        return request_cached(request_data, 'user_text_parts', lambda: self._collect_user_text(request_data))
+    
+    def _collect_user_text(self, request_data: Dict[str, Any]) -> List[str]:
+        """Collect the string content of all user messages."""
+        messages = request_data.get('messages') or ()
         text_parts = []
         
         for message in messages:
@@ -91,7 +113,55 @@ class MessageLengthRule(Rule):
                     if isinstance(content, str):
                         text_parts.append(content)
         
-        return '\n'.join(text_parts)
+        return text_parts
+    
+    def _count_user_tokens(self, request_data: Dict[str, Any]) -> int:
+        """Count the tokens of the combined user text, reusing earlier counts.
+        
+        The combined text is cut after the newline joining two messages
+        wherever the tokenizer starts a new token anyway, so the counts of
+        the pieces add up to the count of the whole text. Each piece's count
+        is cached, and a growing conversation only tokenizes its new turns.
+        
+        Args:
+            request_data: The complete request data
+            
+        Returns:
+            Number of tokens in the text returned by _extract_text_content
+        """
+        parts = self._extract_user_text_parts(request_data)
+        if not parts:
+            return 0
+        
+        total_tokens = 0
+        piece = [parts[0]]
+        for previous, part in zip(parts, parts[1:]):
+            if _starts_token_after_join(previous, part):
+                # End the piece with the joining newline
+                piece.append('')
+                total_tokens += self._count_cached_tokens('\n'.join(piece))
+                piece = [part]
+            else:
+                piece.append(part)
+        return total_tokens + self._count_cached_tokens('\n'.join(piece))
+    
+    def _count_cached_tokens(self, text: str) -> int:
+        """Count the tokens in the given text, remembering the result.
+        
+        Args:
+            text: The text to tokenize
+            
+        Returns:
+            Number of tokens in the text
+        """
+        if not text:
+            return 0
+        key = digest_text(text)
+        token_count = self._token_count_cache.get(key)
+        if token_count is None:
+            token_count = self._count_tokens(text)
+            self._token_count_cache.put(key, token_count)
+        return token_count
     
     def _count_tokens(self, text: str) -> int:
         """Count the number of tokens in the given text.
@@ -104,7 +174,9 @@ class MessageLengthRule(Rule):
         """
         if not text:
             return 0
-        return len(self.encoding.encode(text))
+        # Special token text such as <|endoftext|> is counted as plain text
+        # (encode would raise on it) and not scanned for
+        return len(self.encoding.encode_ordinary(text))
     
     def get_thresholds(self) -> Dict[str, int]:
         """Get the current thresholds.
@@ -148,3 +220,22 @@ class MessageLengthRule(Rule):
                 f"'{self.medium_model}', "
                 f"'{self.long_model}', "
                 f"encoding_name={self.encoding_name!r})")
+
+
+def _starts_token_after_join(previous: str, following: str) -> bool:
+    """Check whether no token spans the start of a message joined after another.
+    
+    When the earlier message ends and the following one starts with a
+    non-whitespace character other than '/', tiktoken's split patterns can
+    only attach the joining newline to the end of the earlier message (as
+    in ".\n"); o200k_base's would also take a leading '/'.
+    
+    Args:
+        previous: Content of the earlier message
+        following: Content of the message joined after it
+        
+    Returns:
+        True if the following message starts a new token
+    """
+    return (bool(previous) and not previous[-1].isspace()
+            and bool(following) and not following[0].isspace() and following[0] != '/')
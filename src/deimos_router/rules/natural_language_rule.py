@@ -49,19 +49,6 @@ class NaturalLanguageRule(Rule):
         # Fall back to default
         return Decision(self.default, trigger="no_language_detected")
     
-    def _extract_text_content(self, request_data: Dict[str, Any]) -> str:
-        """Extract text content from request messages."""
-        messages = request_data.get('messages', [])
-        text_parts = []
-        
-        for message in messages:
-            if isinstance(message, dict) and 'content' in message:
-                content = message['content']
-                if isinstance(content, str):
-                    text_parts.append(content)
-        
-        return '\n'.join(text_parts)
-    
     def _detect_language_llm(self, text: str) -> Optional[str]:
         """Detect natural language using LLM.
         
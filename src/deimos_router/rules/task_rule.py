@@ -1,7 +1,7 @@
 """Task-based rule implementation."""
 
 from typing import Any, Dict
-from .base import Rule, Decision
+from .base import Rule, Decision, TriggerDict
 
 
 class TaskRule(Rule):
@@ -12,11 +12,22 @@ class TaskRule(Rule):
         
         Args:
             name: The name of this rule
-            triggers: Dictionary mapping task names to model names or rule names (deimos/rules/rule-name)
+            triggers: Dictionary mapping task names to model names or rule names (deimos/rules/rule-name);
+                the rule keeps its own copy
         """
         super().__init__(name)
         self.triggers = triggers
     
+    @property
+    def triggers(self) -> Dict[str, str]:
+        """Mapping of task names to model names or rule names."""
+        return self._triggers
+    
+    @triggers.setter
+    def triggers(self, triggers: Dict[str, str]) -> None:
+        # Kept in a TriggerDict so routers notice edits to it
+        self._triggers = TriggerDict(triggers)
+    
     def evaluate(self, request_data: Dict[str, Any]) -> Decision:
         """Evaluate based on the 'task' field in request data.
         
@@ -245,6 +245,58 @@ class TestAutoTaskRule:
         result = rule._detect_task_llm('Write a blog post')
         assert result is None
     
+    @patch('deimos_router.rules.auto_task_rule.config')
+    @patch('deimos_router.rules.auto_task_rule.openai.OpenAI')
+    def test_detect_task_llm_cached(self, mock_openai, mock_config):
+        """Test that repeated prompts reuse the detected task until mappings change."""
+        mock_config.is_configured.return_value = True
+        mock_config.get_credentials.return_value = {
+            'api_key': 'test-key',
+            'api_url': 'https://api.openai.com/v1'
+        }
+        
+        mock_message = Mock()
+        mock_message.content = 'writing'
+        mock_choice = Mock()
+        mock_choice.message = mock_message
+        mock_response = Mock()
+        mock_response.choices = [mock_choice]
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = mock_response
+        mock_openai.return_value = mock_client
+        
+        rule = AutoTaskRule(
+            name='test_rule',
+            triggers={'writing': 'gpt-4o', 'coding': 'claude-3-sonnet'}
+        )
+        
+        assert rule._detect_task_llm('Write a poem') == 'writing'
+        assert rule._detect_task_llm('Write a poem') == 'writing'
+        assert mock_client.chat.completions.create.call_count == 1
+        
+        # Changing the task mappings changes the prompt, so the LLM is asked again
+        rule.add_task_mapping('analysis', 'gpt-4o-mini')
+        assert rule._detect_task_llm('Write a poem') == 'writing'
+        assert mock_client.chat.completions.create.call_count == 2
+        
+        # The client is created once and reused for every detection
+        mock_openai.assert_called_once()
+    
+    @patch('deimos_router.rules.auto_task_rule.config')
+    def test_detect_task_llm_joins_in_flight_call(self, mock_config):
+        """Test that a prompt already being classified waits for that call."""
+        from concurrent.futures import Future
+        
+        mock_config.is_configured.return_value = True
+        rule = AutoTaskRule(name='test_rule', triggers={'writing': 'gpt-4o'}, cache_size=0)
+        
+        pending = Future()
+        pending.set_result('writing')
+        rule._in_flight[(rule.llm_model, ('writing',), 'Write a poem')] = pending
+        
+        with patch.object(rule, '_request_task_llm', side_effect=AssertionError("LLM called")):
+            assert rule._detect_task_llm('Write a poem') == 'writing'
+    
     @patch.object(AutoTaskRule, '_detect_task_llm')
     def test_evaluate_successful_detection(self, mock_detect):
         """Test evaluation with successful task detection."""
@@ -322,6 +374,19 @@ class TestAutoTaskRule:
         assert decision.is_model()
         assert decision.get_model() == 'gpt-4o-mini'
     
+    @patch.object(AutoTaskRule, '_detect_task_llm', side_effect=AssertionError("LLM called"))
+    def test_evaluate_short_text(self, mock_detect):
+        """Test that too-short text goes to the default without task detection."""
+        rule = AutoTaskRule(
+            name='test_rule',
+            triggers={'writing': 'gpt-4o', 'coding': 'claude-3-sonnet'},
+            default='gpt-4o-mini'
+        )
+        
+        for content in ['hi', '   \n  ', '  thanks  ']:
+            decision = rule.evaluate({'messages': [{'role': 'user', 'content': content}]})
+            assert decision.get_model() == 'gpt-4o-mini'
+    
     def test_add_task_mapping(self):
         """Test adding a new task mapping."""
         rule = AutoTaskRule(
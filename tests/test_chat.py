@@ -1,10 +1,13 @@
 """Tests for the chat completions API."""
 
+import httpx
+import json
+import openai
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from openai.types.chat import ChatCompletion
 
-from deimos_router.chat import ChatCompletions, Chat, chat
+from deimos_router.chat import ChatCompletions, Chat, chat, _Endpoint
 from deimos_router.router import Router, register_router, clear_routers
 
 
@@ -29,10 +32,14 @@ class TestChatCompletions:
         completions = ChatCompletions()
         client = completions._get_client()
         
-        mock_openai.assert_called_once_with(
-            api_key='test-key',
-            base_url='https://test-api.com'
-        )
+        mock_openai.assert_called_once()
+        call_kwargs = mock_openai.call_args[1]
+        assert call_kwargs['api_key'] == 'test-key'
+        assert call_kwargs['base_url'] == 'https://test-api.com'
+        
+        # The client shares a keep-alive connection pool across requests
+        http_client = call_kwargs['http_client']
+        assert isinstance(http_client, httpx.Client)
         
         # Second call should return the same client (cached)
         client2 = completions._get_client()
@@ -153,6 +160,261 @@ class TestChatCompletions:
             )
 
 
+class TestEndpointFailover:
+    """Test cases for the multi-endpoint pool."""
+    
+    @staticmethod
+    def _status_error(error_class, status_code):
+        """Build an OpenAI status error with a fake HTTP response."""
+        request = httpx.Request('POST', 'https://test-api.com/chat/completions')
+        response = httpx.Response(status_code, request=request)
+        return error_class("upstream error", response=response, body=None)
+    
+    @patch('deimos_router.chat.openai.OpenAI')
+    def test_failover_on_rate_limit(self, mock_openai):
+        """Test that a rate-limited endpoint fails over to the next one."""
+        first_client, second_client = Mock(), Mock()
+        mock_openai.side_effect = [first_client, second_client]
+        first_client.chat.completions.create.side_effect = self._status_error(openai.RateLimitError, 429)
+        mock_response = Mock(spec=ChatCompletion)
+        second_client.chat.completions.create.return_value = mock_response
+        
+        completions = ChatCompletions()
+        completions._endpoints = [
+            _Endpoint('https://first.com', 'key-1'),
+            _Endpoint('https://second.com', 'key-2'),
+        ]
+        
+        response = completions._create_completion(
+            messages=[{"role": "user", "content": "Hello"}],
+            model="gpt-4o-mini"
+        )
+        
+        assert response is mock_response
+        first_client.chat.completions.create.assert_called_once()
+        second_client.chat.completions.create.assert_called_once()
+        assert all(endpoint.in_flight == 0 for endpoint in completions._endpoints)
+    
+    @patch('deimos_router.chat.openai.OpenAI')
+    def test_client_errors_are_not_retried(self, mock_openai):
+        """Test that 4xx errors other than 429 are raised without failover."""
+        first_client, second_client = Mock(), Mock()
+        mock_openai.side_effect = [first_client, second_client]
+        first_client.chat.completions.create.side_effect = self._status_error(openai.BadRequestError, 400)
+        
+        completions = ChatCompletions()
+        completions._endpoints = [
+            _Endpoint('https://first.com', 'key-1'),
+            _Endpoint('https://second.com', 'key-2'),
+        ]
+        
+        with pytest.raises(openai.BadRequestError):
+            completions._create_completion(
+                messages=[{"role": "user", "content": "Hello"}],
+                model="gpt-4o-mini"
+            )
+        second_client.chat.completions.create.assert_not_called()
+    
+    @patch('deimos_router.chat.openai.OpenAI')
+    def test_pick_endpoints_filters_by_model_and_load(self, mock_openai):
+        """Test endpoint selection by hosted model and in-flight load."""
+        completions = ChatCompletions()
+        busy = _Endpoint('https://busy.com', 'key-1', concurrency_limit=1)
+        idle = _Endpoint('https://idle.com', 'key-2')
+        other = _Endpoint('https://other.com', 'key-3', models=['claude-3-haiku'])
+        busy.in_flight = 1
+        completions._endpoints = [busy, idle, other]
+        
+        assert completions._pick_endpoints('gpt-4o-mini') == [idle, busy]
+        assert completions._pick_endpoints('claude-3-haiku') == [idle, other, busy]
+
+
+class TestCreateBatch:
+    """Test cases for the Batch API endpoint."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        clear_routers()
+    
+    def teardown_method(self):
+        """Clean up after tests."""
+        clear_routers()
+    
+    @staticmethod
+    def _completion_body(model, content):
+        """Build a chat completion response body as returned in batch output."""
+        return {
+            "id": "chatcmpl-batch",
+            "object": "chat.completion",
+            "created": 1234567890,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }]
+        }
+    
+    def test_create_batch_groups_by_model_and_preserves_order(self):
+        """Test that requests are batched per selected model and returned in input order."""
+        register_router(Router(name="batch-router", rules=[], default="gpt-4o-mini"))
+        
+        client = Mock()
+        client.files.create.side_effect = [Mock(id="file-1"), Mock(id="file-2")]
+        client.batches.create.side_effect = [Mock(id="batch-1"), Mock(id="batch-2")]
+        running = Mock(status="in_progress")
+        first_done = Mock(status="completed", output_file_id="out-1", error_file_id=None)
+        second_done = Mock(status="completed", output_file_id="out-2", error_file_id="err-2")
+        client.batches.retrieve.side_effect = [running, first_done, second_done]
+        
+        outputs = {
+            "out-1": [
+                {"custom_id": "0", "response": {"status_code": 200, "body": self._completion_body("gpt-4o-mini-2024", "first")}},
+                {"custom_id": "2", "response": {"status_code": 200, "body": self._completion_body("gpt-4o-mini-2024", "third")}},
+            ],
+            "out-2": [],
+            "err-2": [
+                {"custom_id": "1", "response": None, "error": {"code": "batch_expired", "message": "expired"}},
+            ],
+        }
+        client.files.content.side_effect = lambda file_id: Mock(
+            text="\n".join(json.dumps(line) for line in outputs[file_id])
+        )
+        
+        completions = ChatCompletions()
+        completions._client = client
+        
+        with patch('deimos_router.chat.time.sleep') as mock_sleep:
+            responses = completions.create_batch([
+                {"messages": [{"role": "user", "content": "One"}], "model": "deimos/batch-router", "task": "x"},
+                {"messages": [{"role": "user", "content": "Two"}], "model": "gpt-4o"},
+                {"messages": [{"role": "user", "content": "Three"}], "model": "deimos/batch-router"},
+            ], poll_interval=0.5)
+        
+        mock_sleep.assert_called_once_with(0.5)
+        assert client.batches.create.call_count == 2
+        
+        # First batch file holds both routed requests, without deimos-only keys
+        _, content = client.files.create.call_args_list[0].kwargs['file']
+        lines = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        assert [line["custom_id"] for line in lines] == ["0", "2"]
+        assert lines[0]["url"] == "/v1/chat/completions"
+        assert lines[0]["body"] == {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "One"}]}
+        
+        assert responses[0].choices[0].message.content == "first"
+        assert responses[0].model == "gpt-4o-mini"
+        assert responses[0]._deimos_metadata['router_used'] == "batch-router"
+        assert responses[0]._deimos_metadata['original_model_field'] == "gpt-4o-mini-2024"
+        assert responses[1] is None
+        assert responses[2].choices[0].message.content == "third"
+    
+    def test_create_batch_continues_after_failed_batch(self):
+        """Test that a failed batch fails its own requests without losing the other batches."""
+        client = Mock()
+        client.files.create.side_effect = [Mock(id="file-1"), Mock(id="file-2")]
+        client.batches.create.side_effect = [Mock(id="batch-1"), Mock(id="batch-2")]
+        client.batches.retrieve.side_effect = [
+            Mock(status="failed", errors="invalid file"),
+            Mock(status="completed", output_file_id="out-2", error_file_id=None),
+        ]
+        client.files.content.return_value = Mock(text=json.dumps(
+            {"custom_id": "1", "response": {"status_code": 200, "body": self._completion_body("gpt-4o-mini", "second")}}
+        ))
+        
+        completions = ChatCompletions()
+        completions._client = client
+        
+        with patch('deimos_router.chat.get_logger') as mock_get_logger:
+            responses = completions.create_batch([
+                {"messages": [{"role": "user", "content": "Hello"}], "model": "gpt-4o"},
+                {"messages": [{"role": "user", "content": "Hi"}], "model": "gpt-4o-mini"},
+            ])
+        
+        assert client.batches.retrieve.call_count == 2
+        assert responses[0] is None
+        assert responses[1].choices[0].message.content == "second"
+        
+        log_entry = mock_get_logger.return_value.log_request.return_value.__enter__.return_value
+        log_entry.complete_error.assert_called_once()
+        assert log_entry.complete_error.call_args.args[0] == "Batch batch-1 failed: invalid file"
+    
+    def test_create_batch_cancels_batches_left_running_at_timeout(self):
+        """Test that batches unfinished at the timeout are cancelled and their requests fail."""
+        client = Mock()
+        client.files.create.side_effect = [Mock(id="file-1"), Mock(id="file-2")]
+        client.batches.create.side_effect = [Mock(id="batch-1"), Mock(id="batch-2")]
+        running = Mock(status="in_progress")
+        client.batches.retrieve.side_effect = [
+            running,
+            Mock(status="completed", output_file_id="out-1", error_file_id=None),
+            running,
+        ]
+        client.files.content.return_value = Mock(text=json.dumps(
+            {"custom_id": "0", "response": {"status_code": 200, "body": self._completion_body("gpt-4o", "first")}}
+        ))
+        
+        completions = ChatCompletions()
+        completions._client = client
+        
+        # 30s pass during the first batch's poll, leaving none for the second
+        with patch('deimos_router.chat.time.sleep') as mock_sleep, \
+             patch('deimos_router.chat.time.monotonic', side_effect=[0.0, 0.0, 30.0]), \
+             patch('deimos_router.chat.get_logger') as mock_get_logger:
+            responses = completions.create_batch([
+                {"messages": [{"role": "user", "content": "Hello"}], "model": "gpt-4o"},
+                {"messages": [{"role": "user", "content": "Hi"}], "model": "gpt-4o-mini"},
+            ], poll_interval=60.0, timeout=30.0)
+        
+        mock_sleep.assert_called_once_with(30.0)
+        client.batches.cancel.assert_called_once_with("batch-2")
+        assert responses[0].choices[0].message.content == "first"
+        assert responses[1] is None
+        
+        log_entry = mock_get_logger.return_value.log_request.return_value.__enter__.return_value
+        assert log_entry.complete_error.call_args.args[0] == (
+            "Batch batch-2 did not finish within 30.0 seconds and was cancelled"
+        )
+    
+    @pytest.mark.parametrize("error", [KeyboardInterrupt(), openai.APIConnectionError(request=httpx.Request("GET", "https://test"))])
+    def test_create_batch_cancels_submitted_batches_on_error(self, error):
+        """Test that an interrupted or failing poll cancels the unfinished batches before raising."""
+        client = Mock()
+        client.files.create.side_effect = [Mock(id="file-1"), Mock(id="file-2"), Mock(id="file-3")]
+        client.batches.create.side_effect = [Mock(id="batch-1"), Mock(id="batch-2"), Mock(id="batch-3")]
+        client.batches.retrieve.side_effect = [
+            Mock(status="completed", output_file_id=None, error_file_id=None),
+            error,
+        ]
+        client.batches.cancel.side_effect = [None, RuntimeError("cancel failed")]
+        
+        completions = ChatCompletions()
+        completions._client = client
+        
+        with pytest.raises(type(error)) as exc_info:
+            completions.create_batch([
+                {"messages": [{"role": "user", "content": "One"}], "model": "gpt-4o"},
+                {"messages": [{"role": "user", "content": "Two"}], "model": "gpt-4o-mini"},
+                {"messages": [{"role": "user", "content": "Three"}], "model": "o1"},
+            ])
+        
+        assert [c.args for c in client.batches.cancel.call_args_list] == [("batch-2",), ("batch-3",)]
+        assert exc_info.value.__notes__ == ["Batches that could not be cancelled: batch-3"]
+    
+    def test_create_batch_upload_filename_is_safe(self):
+        """Test that model names with '/' don't end up in the upload filename as paths."""
+        client = Mock()
+        client.files.create.return_value = Mock(id="file-1")
+        client.batches.create.return_value = Mock(id="batch-1")
+        client.batches.retrieve.return_value = Mock(status="completed", output_file_id=None, error_file_id=None)
+        
+        completions = ChatCompletions()
+        completions._client = client
+        completions.create_batch([{"messages": [{"role": "user", "content": "Hi"}], "model": "openai/gpt-4o"}])
+        
+        filename, _ = client.files.create.call_args.kwargs['file']
+        assert filename == "deimos-batch-openai_gpt-4o.jsonl"
+
+
 class TestChatNamespace:
     """Test cases for the Chat namespace."""
     
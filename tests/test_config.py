@@ -25,6 +25,35 @@ class TestConfig:
             assert config.api_key == 'env-key'
             assert config.is_configured()
     
+    def test_env_only_configuration_skips_files(self):
+        """Test that no config files are read when env vars fully configure."""
+        with patch.dict(os.environ, {
+            'DEIMOS_API_URL': 'https://env-api.com',
+            'DEIMOS_API_KEY': 'env-key',
+            'DEIMOS_LOG_LEVEL': 'metadata_only'
+        }):
+            with patch('deimos_router.config.os.listdir') as mock_listdir, \
+                 patch.object(Config, '_load_from_file') as mock_load:
+                config = Config()
+            
+            mock_listdir.assert_not_called()
+            mock_load.assert_not_called()
+            assert config.is_configured()
+            assert config.log_level == 'metadata_only'
+    
+    def test_log_sampling_settings_from_env(self):
+        """Test log sampling settings from env vars, ignoring invalid values."""
+        with patch.dict(os.environ, {
+            'DEIMOS_LOG_SAMPLE_RATE': '0.25',
+            'DEIMOS_LOG_MIN_LATENCY_MS': 'slow'
+        }):
+            config = Config()
+            assert config.log_sample_rate == 0.25
+            assert config.log_min_latency_ms == 0.0
+        
+        with patch.dict(os.environ, {'DEIMOS_LOG_SAMPLE_RATE': '1.5'}):
+            assert Config().log_sample_rate == 1.0
+    
     def test_secrets_json_file_loading(self):
         """Test loading from secrets.json file."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -145,3 +174,74 @@ class TestConfig:
                     assert not config.is_configured()
                 finally:
                     os.chdir(original_cwd)
+    
+    def test_env_default_model_not_overridden_by_file(self):
+        """Test that default model env overrides win over config files."""
+        with patch.dict(os.environ, {
+            'DEIMOS_DEFAULT_MODEL_GENERAL_CHAT': 'env-model',
+            'DEIMOS_LOG_LEVEL': 'metadata_only'
+        }, clear=True):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                config_file = Path(temp_dir) / 'config.json'
+                with open(config_file, 'w') as f:
+                    json.dump({
+                        'default_models': {
+                            'general_chat': 'file-model',
+                            'code_analysis': 'file-analysis-model'
+                        },
+                        'logging': {'level': 'full', 'directory': './file-logs'}
+                    }, f)
+                
+                original_cwd = os.getcwd()
+                try:
+                    os.chdir(temp_dir)
+                    config = Config()
+                    assert config.get_default_model('general_chat') == 'env-model'
+                    assert config.get_default_model('code_analysis') == 'file-analysis-model'
+                    assert config.log_level == 'metadata_only'
+                    assert config.log_directory == './file-logs'
+                finally:
+                    os.chdir(original_cwd)
+    
+    def test_get_all_default_models_is_read_only(self):
+        """Test that get_all_default_models returns a read-only view."""
+        config = Config()
+        defaults = config.get_all_default_models()
+        
+        assert defaults['general_chat'] == config.get_default_model('general_chat')
+        with pytest.raises(TypeError):
+            defaults['general_chat'] = 'other-model'
+        
+        # A mutable copy can still be made explicitly
+        copied = dict(defaults)
+        copied['general_chat'] = 'other-model'
+        assert config.get_default_model('general_chat') != 'other-model'
+    
+    def test_endpoints_loading(self):
+        """Test loading the failover endpoint pool from a config file."""
+        with patch.dict(os.environ, {}, clear=True):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                config_file = Path(temp_dir) / 'config.json'
+                with open(config_file, 'w') as f:
+                    json.dump({
+                        'api_url': 'https://config-api.com',
+                        'api_key': 'config-key',
+                        'endpoints': [
+                            {'api_url': 'https://a.com', 'api_key': 'a-key', 'concurrency_limit': 8},
+                            {'api_url': 'https://b.com', 'api_key': 'b-key', 'models': ['gpt-4o-mini']},
+                            {'api_url': 'https://missing-key.com'}
+                        ]
+                    }, f)
+                
+                original_cwd = os.getcwd()
+                try:
+                    os.chdir(temp_dir)
+                    config = Config()
+                    assert config.endpoints == [
+                        {'api_url': 'https://a.com', 'api_key': 'a-key',
+                         'models': None, 'concurrency_limit': 8},
+                        {'api_url': 'https://b.com', 'api_key': 'b-key',
+                         'models': ['gpt-4o-mini'], 'concurrency_limit': None},
+                    ]
+                finally:
+                    os.chdir(original_cwd)
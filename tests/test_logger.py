@@ -0,0 +1,310 @@
+"""Tests for the request logger."""
+
+import threading
+import time
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+
+from deimos_router.logging import logger as logger_module
+from deimos_router.logging.base import LogEntry, LoggerBackend
+from deimos_router.logging.logger import RequestLogger, configure_logging, set_logger
+
+
+class RecordingBackend(LoggerBackend):
+    """Backend that keeps the entries it is given."""
+    
+    def __init__(self):
+        self.entries = []
+        self.closed = False
+        # Written entries and closing, in the order they happened
+        self.events = []
+    
+    def log_entry(self, entry):
+        self.entries.append(entry)
+        self.events.append("entry")
+    
+    def close(self):
+        self.closed = True
+        self.events.append("close")
+
+
+class BlockingBackend(RecordingBackend):
+    """Backend whose writes wait until released, holding up the writer thread."""
+    
+    def __init__(self):
+        super().__init__()
+        self.writing = threading.Event()
+        self.release = threading.Event()
+    
+    def log_entry(self, entry):
+        self.writing.set()
+        assert self.release.wait(5)
+        super().log_entry(entry)
+
+
+def _make_logger(backend, **kwargs):
+    """Create a logger with a stub cost calculator."""
+    cost_calculator = Mock()
+    cost_calculator.calculate_cost.return_value = (0.0, True, "unknown")
+    return RequestLogger(backend=backend, cost_calculator=cost_calculator, **kwargs)
+
+
+def _log_success(logger, latency_ms=1.0):
+    """Log a successful request that took about latency_ms."""
+    with logger.log_request("router", "gpt-4", [], {"messages": []}) as entry:
+        logger.complete_request_success(entry, {"status": "ok"}, time.time() - latency_ms / 1000)
+
+
+def _entry(timestamp):
+    """Create a completed log entry with the given timestamp."""
+    return LogEntry(timestamp, "req-1", "router", "gpt-4", [], {"messages": []},
+                    None, 12.5, None, None, True, "unknown", "success")
+
+
+class TestLogEntry:
+    """Test cases for LogEntry timestamps."""
+    
+    def test_to_dict_timestamp_format(self):
+        """Test that timestamps serialize as ISO 8601 UTC with a "Z" suffix."""
+        assert _entry(datetime(2025, 1, 27, 10, 30, 0, 123456)).to_dict()["timestamp"] == "2025-01-27T10:30:00.123456Z"
+        # Like datetime.isoformat(), whole seconds carry no fraction
+        assert _entry(datetime(2025, 1, 27, 10, 30)).to_dict()["timestamp"] == "2025-01-27T10:30:00Z"
+        assert _entry(1_737_973_800_000_001_999).to_dict()["timestamp"] == "2025-01-27T10:30:00.000001Z"
+    
+    def test_to_dict_matches_isoformat(self):
+        """Test that new entries serialize like the datetime they were created at."""
+        entry = LogEntry.create_request_entry("router", "gpt-4", [], {"messages": []})
+        data = entry.to_dict()
+        
+        assert data["timestamp"] == entry.timestamp.isoformat() + "Z"
+        assert list(data)[:2] == ["timestamp", "request_id"]
+    
+    def test_timestamp_argument(self):
+        """Test that entries are still built from a datetime, by keyword or position."""
+        naive = datetime(2025, 1, 27, 10, 30, 0, 5)
+        by_keyword = LogEntry(
+            timestamp=naive, request_id="req-1", router_name=None, selected_model="gpt-4",
+            routing_explanation=[], request={}, response=None, latency_ms=None, tokens=None,
+            cost=None, cost_estimated=True, cost_source="unknown", status="pending"
+        )
+        
+        assert by_keyword.timestamp == _entry(naive).timestamp == naive
+        assert by_keyword.timestamp_ns == 1_737_973_800_000_005_000
+        assert _entry(naive.replace(tzinfo=timezone.utc)).timestamp_ns == by_keyword.timestamp_ns
+
+
+class TestLogSampling:
+    """Test cases for sampling successful requests."""
+    
+    def test_sample_rate_logs_exact_fraction(self):
+        """Test that a quarter of successful requests are logged at sample_rate=0.25."""
+        backend = RecordingBackend()
+        logger = _make_logger(backend, sample_rate=0.25)
+        
+        for _ in range(100):
+            _log_success(logger)
+        logger.close()
+        
+        assert len(backend.entries) == 25
+        assert all(entry.status == "success" for entry in backend.entries)
+    
+    def test_sampled_out_requests_skip_response_work(self):
+        """Test that requests left out are dropped before their response is processed."""
+        backend = RecordingBackend()
+        logger = _make_logger(backend, sample_rate=0.0)
+        
+        for _ in range(10):
+            _log_success(logger)
+        with logger.log_request("router", "gpt-4", [], {"messages": []}):
+            pass
+        logger.close()
+        
+        assert backend.entries == []
+        logger.cost_calculator.calculate_cost.assert_not_called()
+        logger.cost_calculator.extract_tokens_from_response.assert_not_called()
+    
+    def test_errors_are_always_logged(self):
+        """Test that failed requests are logged whatever the sample rate."""
+        backend = RecordingBackend()
+        logger = _make_logger(backend, sample_rate=0.0)
+        
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                with logger.log_request("router", "gpt-4", [], {"messages": []}):
+                    raise RuntimeError("upstream failed")
+        with logger.log_request("router", "gpt-4", [], {"messages": []}) as entry:
+            entry.complete_error("no result", 5.0)
+        logger.close()
+        
+        assert [entry.status for entry in backend.entries] == ["error"] * 4
+        assert backend.entries[0].error_message == "upstream failed"
+    
+    def test_slow_requests_bypass_sampling(self):
+        """Test that requests at least min_latency_ms slow are always logged."""
+        backend = RecordingBackend()
+        logger = _make_logger(backend, sample_rate=0.0, min_latency_ms=500.0)
+        
+        _log_success(logger, latency_ms=1.0)
+        _log_success(logger, latency_ms=1000.0)
+        logger.close()
+        
+        assert len(backend.entries) == 1
+        assert backend.entries[0].latency_ms >= 500.0
+    
+    @pytest.mark.parametrize("sample_rate", [-0.1, 1.5, float("nan")])
+    def test_invalid_sample_rate_rejected(self, sample_rate):
+        """Test that sample rates outside [0, 1] raise."""
+        with pytest.raises(ValueError):
+            RequestLogger(backend=RecordingBackend(), cost_calculator=Mock(), sample_rate=sample_rate)
+
+
+def _log_pending(logger, content="Hello"):
+    """Log a request that completes without a response."""
+    with logger.log_request("router", "gpt-4", [], {"messages": [{"role": "user", "content": content}]}):
+        pass
+
+
+class TestQueuedWriter:
+    """Test cases for the background writer thread."""
+    
+    def test_entries_written_by_background_thread(self):
+        """Test that entries reach the backend from the writer thread, not the caller's."""
+        backend = RecordingBackend()
+        threads = []
+        backend.log_entry = lambda entry: threads.append(threading.current_thread())
+        logger = _make_logger(backend)
+        
+        _log_pending(logger)
+        logger.flush()
+        
+        assert threads and threads[0] is not threading.current_thread()
+        logger.close()
+    
+    def test_full_queue_drops_and_counts_entries(self, caplog):
+        """Test that entries logged while the queue is full are dropped, counted and warned about."""
+        backend = BlockingBackend()
+        with patch.object(logger_module, '_LOG_QUEUE_SIZE', 2):
+            logger = _make_logger(backend)
+        
+        # The writer takes the first entry and blocks on it
+        _log_pending(logger)
+        assert backend.writing.wait(5)
+        
+        with caplog.at_level("WARNING", logger=logger_module.__name__):
+            for _ in range(4):
+                _log_pending(logger)
+        
+        assert logger.dropped_entries == 2
+        assert len([r for r in caplog.records if "Log queue full" in r.getMessage()]) == 1
+        
+        backend.release.set()
+        logger.close()
+        assert len(backend.entries) == 3
+    
+    def test_flush_waits_for_queued_entries(self):
+        """Test that flush() returns only once queued entries are written."""
+        backend = BlockingBackend()
+        logger = _make_logger(backend)
+        for _ in range(3):
+            _log_pending(logger)
+        
+        flushed = threading.Event()
+        flusher = threading.Thread(target=lambda: (logger.flush(), flushed.set()))
+        flusher.start()
+        assert not flushed.wait(0.1)
+        
+        backend.release.set()
+        flusher.join(5)
+        assert flushed.is_set()
+        assert len(backend.entries) == 3
+        logger.close()
+    
+    def test_close_drains_queue_before_closing_backend(self):
+        """Test that close() writes every queued entry, then closes the backend."""
+        backend = RecordingBackend()
+        logger = _make_logger(backend)
+        writer = logger._writer
+        
+        for _ in range(50):
+            _log_pending(logger)
+        logger.close()
+        
+        assert not writer.is_alive()
+        assert backend.events == ["entry"] * 50 + ["close"]
+    
+    def test_entries_written_synchronously_after_close(self):
+        """Test that entries logged after close() are written on the caller's thread."""
+        backend = RecordingBackend()
+        logger = _make_logger(backend)
+        logger.close()
+        
+        _log_pending(logger)
+        
+        assert len(backend.entries) == 1
+    
+    def test_close_registered_at_exit(self):
+        """Test that close() runs at interpreter exit until it is called explicitly."""
+        with patch.object(logger_module, 'atexit') as mock_atexit:
+            logger = _make_logger(RecordingBackend())
+            mock_atexit.register.assert_called_once_with(logger.close)
+            
+            logger.close()
+            mock_atexit.unregister.assert_called_once_with(logger.close)
+    
+    def test_queued_request_is_copied(self):
+        """Test that changing the messages after the call doesn't change the log."""
+        backend = BlockingBackend()
+        logger = _make_logger(backend)
+        messages = [{"role": "user", "content": "Hello"}]
+        
+        with logger.log_request("router", "gpt-4", [], {"messages": messages}):
+            pass
+        messages.append({"role": "assistant", "content": "Hi"})
+        
+        backend.release.set()
+        logger.close()
+        assert backend.entries[0].request["messages"] == [{"role": "user", "content": "Hello"}]
+
+
+class TestSetLogger:
+    """Test cases for replacing the global logger."""
+    
+    def setup_method(self):
+        """Remember the global logger."""
+        self.original = logger_module._global_logger
+    
+    def teardown_method(self):
+        """Restore the global logger."""
+        logger_module._global_logger = self.original
+    
+    def test_set_logger_closes_replaced_logger(self):
+        """Test that the replaced logger is closed, and re-setting the same one is not."""
+        first_backend = RecordingBackend()
+        second_backend = RecordingBackend()
+        first = _make_logger(first_backend)
+        second = _make_logger(second_backend)
+        logger_module._global_logger = None
+        
+        set_logger(first)
+        _log_pending(first)
+        set_logger(second)
+        
+        assert first_backend.events == ["entry", "close"]
+        
+        set_logger(second)
+        assert not second_backend.closed
+        second.close()
+    
+    def test_disabled_logging_builds_no_cost_calculator(self):
+        """Test that the cost calculator is only created when logging is enabled."""
+        with patch('deimos_router.logging.costs.CostCalculator') as mock_calculator:
+            logger = configure_logging(enabled=False)
+            
+            assert logger.cost_calculator is None
+            assert RequestLogger(enabled=False).cost_calculator is None
+            mock_calculator.assert_not_called()
+            
+            with logger.log_request("router", "gpt-4", [], {"messages": []}) as entry:
+                logger.complete_request_success(entry, {"status": "ok"}, time.time())
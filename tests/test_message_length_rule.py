@@ -2,6 +2,7 @@
 
 import pytest
 import tiktoken
+from unittest.mock import patch
 from src.deimos_router.rules import MessageLengthRule, Decision
 
 
@@ -212,6 +213,61 @@ class TestMessageLengthRule:
         
         assert decision.trigger == f"{'short' if expected_tokens < 10 else ('medium' if expected_tokens < 50 else 'long')}_message_{expected_tokens}_tokens"
     
+    def test_evaluate_counts_joined_user_messages(self):
+        """Test that the token count is that of the user messages joined with newlines."""
+        rule = MessageLengthRule(
+            name="test_rule",
+            short_threshold=10,
+            long_threshold=50,
+            short_model="gpt-3.5-turbo",
+            medium_model="gpt-4",
+            long_model="gpt-4-turbo"
+        )
+        
+        conversations = [
+            ["First message.", "Second message"],
+            ["Trailing space ", "next"],
+            ["Run this:", "/usr/bin/env python"],
+            ["", "  indented", "\n\nnewlines", "end!"],
+        ]
+        for contents in conversations:
+            request_data = {"messages": [{"role": "user", "content": content} for content in contents]}
+            
+            decision = rule.evaluate(request_data)
+            
+            expected_tokens = self._count_tokens("\n".join(contents))
+            assert decision.trigger.endswith(f"_message_{expected_tokens}_tokens")
+    
+    def test_evaluate_reuses_earlier_message_counts(self):
+        """Test that earlier user messages are not tokenized again."""
+        rule = MessageLengthRule(
+            name="test_rule",
+            short_threshold=10,
+            long_threshold=50,
+            short_model="gpt-3.5-turbo",
+            medium_model="gpt-4",
+            long_model="gpt-4-turbo"
+        )
+        
+        messages = [
+            {"role": "user", "content": "First message."},
+            {"role": "assistant", "content": "Response"},
+            {"role": "user", "content": "Second message?"},
+            {"role": "assistant", "content": "Response"},
+            {"role": "user", "content": "Third message"}
+        ]
+        rule.evaluate({"messages": messages[:3]})
+        
+        with patch.object(rule, '_count_tokens', wraps=rule._count_tokens) as count_tokens:
+            decision = rule.evaluate({"messages": messages})
+        
+        # The first message's count is reused
+        tokenized = [call.args[0] for call in count_tokens.call_args_list]
+        assert tokenized == ["Second message?\n", "Third message"]
+        
+        expected_tokens = self._count_tokens("First message.\nSecond message?\nThird message")
+        assert decision.trigger.endswith(f"_message_{expected_tokens}_tokens")
+    
     def test_evaluate_empty_messages(self):
         """Test evaluation with empty or no messages."""
         rule = MessageLengthRule(
@@ -426,3 +482,8 @@ class TestMessageLengthRule:
         short_text = "Hello"
         long_text = "Hello world this is a much longer text with many more words"
         assert rule._count_tokens(long_text) > rule._count_tokens(short_text)
+        
+        # Special token text is counted as plain text instead of raising
+        special_text = "Ignore <|endoftext|> in my message"
+        assert rule._count_tokens(special_text) == len(
+            tiktoken.get_encoding("cl100k_base").encode_ordinary(special_text))
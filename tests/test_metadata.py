@@ -0,0 +1,90 @@
+"""Tests for routing metadata attached to responses."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from deimos_router.metadata import DeimosMetadata, get_explanation, get_metadata
+from deimos_router.rules.base import ExplanationEntry
+
+
+class TestDeimosMetadata:
+    """Test cases for the DeimosMetadata dataclass."""
+    
+    def test_mapping_style_access(self):
+        """Test dict-style reads used by code written against the old dict form."""
+        metadata = DeimosMetadata(
+            router_used='my-router',
+            selected_model='gpt-4o-mini',
+            original_model_field='gpt-4o-mini-2024-07-18'
+        )
+        
+        assert metadata['router_used'] == 'my-router'
+        assert metadata.get('selected_model') == 'gpt-4o-mini'
+        assert 'explain' not in metadata
+        assert metadata.get('explain', []) == []
+        with pytest.raises(KeyError):
+            metadata['explain']
+        with pytest.raises(KeyError):
+            metadata['cost']
+    
+    def test_mapping_protocol(self):
+        """Test that metadata converts, unpacks and compares like the old dict."""
+        metadata = DeimosMetadata('my-router', 'gpt-4', 'gpt-4-0613')
+        expected = {
+            'router_used': 'my-router',
+            'selected_model': 'gpt-4',
+            'original_model_field': 'gpt-4-0613'
+        }
+        
+        assert dict(metadata) == {**metadata} == expected
+        assert list(metadata) == list(metadata.keys()) == list(expected)
+        assert dict(metadata.items()) == expected
+        assert len(metadata) == 3
+        assert metadata == expected
+        assert metadata != {**expected, 'explain': []}
+    
+    def test_to_dict_omits_unset_fields(self):
+        """Test dictionary conversion."""
+        entries = [ExplanationEntry('TaskRule', 'r', 't', 'gpt-4')]
+        metadata = DeimosMetadata('my-router', 'gpt-4', 'gpt-4-0613', explanation_entries=entries)
+        
+        assert metadata.to_dict() == {
+            'router_used': 'my-router',
+            'selected_model': 'gpt-4',
+            'original_model_field': 'gpt-4-0613',
+            'explain': [{'rule_type': 'TaskRule', 'rule_name': 'r', 'rule_trigger': 't', 'decision': 'gpt-4'}]
+        }
+        assert 'explain' not in DeimosMetadata('my-router', 'gpt-4', 'gpt-4-0613').to_dict()
+    
+    def test_slots(self):
+        """Test that metadata instances don't carry a per-instance dict."""
+        metadata = DeimosMetadata('my-router', 'gpt-4', None)
+        assert not hasattr(metadata, '__dict__')
+    
+    def test_get_metadata(self):
+        """Test reading metadata from a response."""
+        metadata = DeimosMetadata('my-router', 'gpt-4', None)
+        response = Mock(spec=['model'])
+        
+        assert get_metadata(response) is None
+        
+        response._deimos_metadata = metadata
+        assert get_metadata(response) is metadata
+    
+    def test_get_explanation_converts_entries(self):
+        """Test that explanation entries are converted to dicts only when read."""
+        entries = [ExplanationEntry('TaskRule', 'r', 't', 'gpt-4')]
+        response = Mock(spec=['model'])
+        
+        assert get_explanation(response) is None
+        
+        response._deimos_metadata = DeimosMetadata('my-router', 'gpt-4', None)
+        assert get_explanation(response) is None
+        
+        response._deimos_metadata = DeimosMetadata('my-router', 'gpt-4', None, explanation_entries=entries)
+        assert response._deimos_metadata.explanation_entries is entries
+        assert 'explain' in response._deimos_metadata
+        assert get_explanation(response) == response._deimos_metadata['explain'] == [
+            {'rule_type': 'TaskRule', 'rule_name': 'r', 'rule_trigger': 't', 'decision': 'gpt-4'}
+        ]
@@ -10,6 +10,8 @@ from deimos_router.router import (
     list_routers, 
     clear_routers
 )
+from deimos_router.rules import Decision, TaskRule, CodeRule, CodeLanguageRule, clear_rules, get_rule
+from deimos_router.rules import base as base_module
 
 
 class TestRouter:
@@ -158,3 +160,267 @@ class TestRouterRegistry:
         assert retrieved is router2
         assert "model-2" in retrieved.models
         assert "model-1" not in retrieved.models
+
+
+class TestRouterTaskIndex:
+    """Test cases for the leading-TaskRule index fast path."""
+    
+    def setup_method(self):
+        """Clear registries before each test."""
+        clear_routers()
+        clear_rules()
+    
+    def teardown_method(self):
+        """Clear registries after each test."""
+        clear_routers()
+        clear_rules()
+    
+    def _assert_matches_rule_chain(self, router, request_data):
+        """Assert the fast path agrees with full rule-chain evaluation."""
+        model = router.select_model(request_data)
+        explained_model, explanation = router.select_model_with_explanation(request_data)
+        expected_model, expected_explanation = router._select_model_by_rules_with_explanation(request_data)
+        
+        assert model == explained_model == expected_model
+        assert [e.to_dict() for e in explanation] == [e.to_dict() for e in expected_explanation]
+    
+    def test_index_matches_rule_chain(self):
+        """Test that indexed decisions and explanations match rule evaluation."""
+        first = TaskRule("first", {"coding": "gpt-4", "chat": "deimos/rules/second"})
+        second = TaskRule("second", {"chat": "gpt-4o-mini", "writing": "claude-3-opus"})
+        code = CodeRule("code", code="gpt-4", not_code="gpt-3.5-turbo")
+        late = TaskRule("late", {"summarize": "claude-3-haiku"})
+        router = Router("indexed", rules=[first, second, code, late], default="default-model")
+        
+        index = router._get_task_index()[2]
+        assert index["coding"] == (0, first, "gpt-4")
+        assert index["chat"] is None  # rule reference, needs the full chain
+        assert index["writing"] == (1, second, "claude-3-opus")
+        assert "summarize" not in index  # shadowed by the CodeRule
+        
+        for task in ["coding", "chat", "writing", "summarize", None]:
+            request_data = {"messages": [{"role": "user", "content": "Hello"}]}
+            if task is not None:
+                request_data["task"] = task
+            self._assert_matches_rule_chain(router, request_data)
+    
+    def test_index_tracks_trigger_changes(self):
+        """Test that the index is rebuilt after triggers or rules change."""
+        rule = TaskRule("tasks", {"coding": "gpt-4"})
+        router = Router("indexed", rules=[rule])
+        
+        assert router.select_model({"task": "coding"}) == "gpt-4"
+        
+        rule.add_task_rule("coding", "claude-3-opus")
+        assert router.select_model({"task": "coding"}) == "claude-3-opus"
+        
+        rule.remove_task_rule("coding")
+        assert router.select_model({"task": "coding"}) == router.default
+        
+        router.rules = [TaskRule("other", {"coding": "gpt-4o-mini"})]
+        assert router.select_model({"task": "coding"}) == "gpt-4o-mini"
+    
+    def test_index_tracks_direct_trigger_edits(self):
+        """Test that editing or replacing a rule's triggers dict is picked up."""
+        rule = TaskRule("tasks", {"coding": "gpt-4"})
+        router = Router("indexed", rules=[rule], default="default-model")
+        
+        assert router.select_model({"task": "writing"}) == "default-model"
+        
+        rule.triggers["writing"] = "claude-3-opus"
+        assert router.select_model({"task": "writing"}) == "claude-3-opus"
+        
+        rule.triggers["coding"] = "gpt-4o"
+        assert router.select_model({"task": "coding"}) == "gpt-4o"
+        
+        del rule.triggers["coding"]
+        assert router.select_model({"task": "coding"}) == "default-model"
+        
+        rule.triggers = {"coding": "gpt-4o-mini"}
+        assert router.select_model({"task": "coding"}) == "gpt-4o-mini"
+        assert router.select_model({"task": "writing"}) == "default-model"
+        self._assert_matches_rule_chain(router, {"task": "coding"})
+    
+    def test_index_built_when_rules_are_set(self):
+        """Test that the index is built with the rules, not on each request."""
+        rule = TaskRule("tasks", {"coding": "gpt-4"})
+        router = Router("indexed", rules=[rule])
+        
+        with patch.object(Router, '_build_task_index', side_effect=AssertionError("index rebuilt")):
+            assert router.select_model({"task": "coding"}) == "gpt-4"
+            assert router.select_model({"task": "coding"}) == "gpt-4"
+        
+        router.rules.append(TaskRule("other", {"writing": "claude-3-opus"}))
+        assert router.select_model({"task": "writing"}) == "claude-3-opus"
+    
+    def test_task_only_router_skips_rules_without_matching_task(self):
+        """Test that TaskRule-only routers resolve unmatched tasks from the index."""
+        first = TaskRule("first", {"coding": "gpt-4"})
+        second = TaskRule("second", {"writing": "claude-3-opus"})
+        router = Router("task-only", rules=[first, second], default="default-model")
+        
+        with patch.object(TaskRule, 'evaluate', side_effect=AssertionError("rules evaluated")):
+            assert router.select_model({"messages": []}) == "default-model"
+            assert router.select_model({"task": "unknown"}) == "default-model"
+            model, explanation = router.select_model_with_explanation({"task": "unknown"})
+        
+        assert model == "default-model"
+        assert [e.decision for e in explanation] == ["no_match", "no_match", "default-model"]
+        for request_data in [{"messages": []}, {"task": "unknown"}]:
+            self._assert_matches_rule_chain(router, request_data)
+        
+        # Adding a non-task rule means the rules must be evaluated again
+        router.rules.append(CodeRule("code", code="gpt-4", not_code="gpt-3.5-turbo"))
+        assert router.select_model({"messages": [{"role": "user", "content": "Hello there"}]}) == "gpt-3.5-turbo"
+
+
+class TestRouterRequestCache:
+    """Test cases for per-request sharing of derived message text."""
+    
+    def setup_method(self):
+        """Clear registries before each test."""
+        clear_routers()
+        clear_rules()
+    
+    def teardown_method(self):
+        """Clear registries after each test."""
+        clear_routers()
+        clear_rules()
+    
+    def test_text_extracted_once_per_request(self):
+        """Test that chained text-scanning rules share one text extraction."""
+        CodeLanguageRule("languages", {"python": "gpt-4"}, default="gpt-4o-mini",
+                         enable_llm_fallback=False)
+        code = CodeRule("code", code="deimos/rules/languages", not_code="gpt-3.5-turbo")
+        router = Router("cached", rules=[code])
+        request_data = {"messages": [{"role": "user", "content": "def main():\n    import os\n    print(len(os.listdir()))"}]}
+        
+        with patch('deimos_router.rules.base._join_recent_message_text',
+                   wraps=base_module._join_recent_message_text) as join:
+            assert router.select_model(request_data) == "gpt-4"
+            assert join.call_count == 1
+            
+            router.select_model_with_explanation(request_data)
+            assert join.call_count == 2
+        
+        # The caller's request data is left untouched
+        assert list(request_data) == ["messages"]
+
+
+class TestRouterDecisionCache:
+    """Test cases for memoized routing decisions."""
+    
+    def setup_method(self):
+        """Clear registries before each test."""
+        clear_routers()
+        clear_rules()
+    
+    def teardown_method(self):
+        """Clear registries after each test."""
+        clear_routers()
+        clear_rules()
+    
+    def test_repeated_requests_skip_rule_evaluation(self):
+        """Test that identical requests reuse the cached decision and explanation."""
+        code = CodeRule("code", code="gpt-4", not_code="gpt-3.5-turbo")
+        router = Router("cached", rules=[code], decision_cache_size=2)
+        request_data = {"messages": [{"role": "user", "content": "def main():\n    return 1"}]}
+        
+        model, explanation = router.select_model_with_explanation(request_data)
+        
+        with patch.object(CodeRule, 'evaluate', side_effect=AssertionError("rules evaluated")):
+            assert router.select_model(request_data) == model == "gpt-4"
+            cached_model, cached_explanation = router.select_model_with_explanation(request_data)
+        
+        assert cached_model == model
+        assert [e.to_dict() for e in cached_explanation] == [e.to_dict() for e in explanation]
+    
+    def test_cache_is_bounded_and_invalidated(self):
+        """Test LRU eviction and invalidation when the rule registry changes."""
+        code = CodeRule("code", code="deimos/rules/next", not_code="gpt-3.5-turbo")
+        TaskRule("next", {"coding": "gpt-4"})
+        router = Router("cached", rules=[code], decision_cache_size=1)
+        code_request = {"messages": [{"role": "user", "content": "def main():\n    return 1"}], "task": "coding"}
+        
+        assert router.select_model(code_request) == "gpt-4"
+        router.select_model({"messages": [{"role": "user", "content": "Hello"}]})
+        assert len(router._decision_cache) == 1
+        
+        # Re-registering the referenced rule must not serve the old decision
+        TaskRule("next", {"coding": "claude-3-opus"})
+        assert router.select_model(code_request) == "claude-3-opus"
+        
+        # Nor must editing the triggers of a rule reached by name
+        get_rule("next").triggers["coding"] = "gpt-4o"
+        assert router.select_model(code_request) == "gpt-4o"
+    
+    def test_rule_attribute_changes_invalidate(self):
+        """Test that setting a rule's models or thresholds drops cached decisions."""
+        code = CodeRule("code", code="gpt-4", not_code="gpt-3.5-turbo")
+        router = Router("cached", rules=[code], decision_cache_size=4)
+        code_request = {"messages": [{"role": "user", "content": "def main():\n    return 1"}]}
+        
+        assert router.select_model(code_request) == "gpt-4"
+        
+        code.code = "claude-3-opus"
+        assert router.select_model(code_request) == "claude-3-opus"
+    
+    def test_clear_decision_cache(self):
+        """Test that in-place edits the cache can't see are picked up after clearing it."""
+        code = CodeRule("code", code="gpt-4", not_code="gpt-3.5-turbo")
+        router = Router("cached", rules=[code], decision_cache_size=4)
+        request_data = {"messages": [{"role": "user", "content": "Hello"}]}
+        
+        router.select_model(request_data)
+        assert len(router._decision_cache) == 1
+        
+        with patch.object(CodeRule, 'evaluate', return_value=Decision("claude-3-opus")):
+            assert router.select_model(request_data) == "gpt-3.5-turbo"
+            router.clear_decision_cache()
+            assert router.select_model(request_data) == "claude-3-opus"
+    
+    def test_disabled_by_default(self):
+        """Test that routers don't cache decisions unless asked to."""
+        router = Router("uncached", rules=[CodeRule("code", code="gpt-4", not_code="gpt-3.5-turbo")])
+        router.select_model({"messages": [{"role": "user", "content": "Hello"}]})
+        assert len(router._decision_cache) == 0
+
+
+class TestRouterRuleResolution:
+    """Test cases for resolving rule names once per registry change."""
+    
+    def setup_method(self):
+        """Clear registries before each test."""
+        clear_routers()
+        clear_rules()
+    
+    def teardown_method(self):
+        """Clear registries after each test."""
+        clear_routers()
+        clear_rules()
+    
+    def test_rule_names_resolved_once_and_refreshed(self):
+        """Test that named rules are looked up once and re-resolved after registration."""
+        CodeRule("code", code="gpt-4", not_code="gpt-3.5-turbo")
+        router = Router("named", rules=["deimos/rules/code", "missing"])
+        request_data = {"messages": [{"role": "user", "content": "Hello"}]}
+        
+        assert router.select_model(request_data) == "gpt-3.5-turbo"
+        with patch('deimos_router.router.get_rule', side_effect=AssertionError("looked up")):
+            assert router.select_model(request_data) == "gpt-3.5-turbo"
+        
+        # Registering a rule under a referenced name takes effect immediately
+        CodeRule("code", code="gpt-4", not_code="claude-3-haiku")
+        assert router.select_model(request_data) == "claude-3-haiku"
+    
+    def test_rule_cycle_ends_chain(self):
+        """Test that a chain leading back to an evaluated rule stops at the cycle."""
+        TaskRule("first", {"loop": "deimos/rules/second"})
+        TaskRule("second", {"loop": "deimos/rules/first"})
+        router = Router("cyclic", rules=["first"], default="gpt-4o-mini")
+        
+        model, explanation = router.select_model_with_explanation({"task": "loop"})
+        
+        assert model == "gpt-4o-mini"
+        assert [entry.rule_trigger for entry in explanation] == ["loop", "loop", "cycle_detected", "None"]
+        assert explanation[2].rule_name == "first"
@@ -1,7 +1,7 @@
 """Tests for the rule-based model selection system."""
 
 import pytest
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 from deimos_router.rules import (
     Rule, Decision, TaskRule, CodeRule, CodeLanguageRule,
@@ -429,6 +429,43 @@ class TestCodeRule:
         decision = code_rule.evaluate(request_data)
         assert decision.is_rule()
         assert decision.get_rule() is python_rule
+    
+    def test_code_rule_scans_most_recent_text(self):
+        """Test that long conversations are scanned from their most recent text."""
+        from deimos_router.rules.base import MAX_SCAN_TEXT
+        
+        code_rule = CodeRule("code-detector", "code-model", "text-model")
+        code = "def hello():\n    print('Hello')"
+        request_data = {
+            "messages": [
+                {"role": "user", "content": "Tell me a story. " * 2000},
+                {"role": "user", "content": code}
+            ]
+        }
+        
+        text = code_rule._extract_scan_text(request_data)
+        assert len(text) == MAX_SCAN_TEXT
+        assert text.endswith("\n" + code)
+        assert code_rule.evaluate(request_data).get_model() == "code-model"
+    
+    def test_code_rule_caches_detection(self):
+        """Test that repeated messages reuse the cached detection result."""
+        code_rule = CodeRule("code-detector", "code-model", "text-model")
+        request_data = {"messages": [{"role": "user", "content": "def hello():\n    print('Hello')"}]}
+        
+        with patch.object(code_rule, '_contains_code', wraps=code_rule._contains_code) as contains_code:
+            assert code_rule.evaluate(request_data).get_model() == "code-model"
+            assert code_rule.evaluate(dict(request_data)).get_model() == "code-model"
+        
+        contains_code.assert_called_once()
+        
+        # Caching can be disabled
+        uncached_rule = CodeRule("uncached", "code-model", "text-model", cache_size=0)
+        with patch.object(uncached_rule, '_contains_code', return_value=True) as contains_code:
+            uncached_rule.evaluate(request_data)
+            uncached_rule.evaluate(request_data)
+        
+        assert contains_code.call_count == 2
 
 
 class TestRuleRegistry:
@@ -1093,6 +1130,38 @@ class TestCodeLanguageRule:
         detected = rule._detect_language_regex(natural_text)
         assert detected is None
     
+    def test_regex_detection_case_sensitive_identifiers(self):
+        """Test that identifiers with a fixed case only match in that case."""
+        rule = CodeLanguageRule(
+            name="test-rule",
+            language_mappings={"csharp": "csharp-model", "rust": "rust-model"},
+            default="default-model",
+            enable_llm_fallback=False
+        )
+        
+        assert rule._detect_language_regex("Console.WriteLine(x);") == "csharp"
+        assert rule._detect_language_regex("Using system fonts, call CONSOLE.WRITELINE(x)") is None
+        assert rule._detect_language_regex("println!(x)") == "rust"
+        assert rule._detect_language_regex("PRINTLN!(x)") is None
+        assert rule._detect_language_regex("Ünïcode PRINTLN!(x)") is None
+    
+    def test_regex_detection_cached(self):
+        """Test that repeated messages reuse the cached regex detection."""
+        rule = CodeLanguageRule(
+            name="test-rule",
+            language_mappings={"python": "python-model"},
+            default="default-model",
+            enable_llm_fallback=False
+        )
+        natural_request = {"messages": [{"role": "user", "content": "Just some regular text."}]}
+        
+        with patch.object(rule, '_detect_language_regex', wraps=rule._detect_language_regex) as detect:
+            # Results with no detected language are cached too
+            assert rule.evaluate(natural_request).get_model() == "default-model"
+            assert rule.evaluate(natural_request).get_model() == "default-model"
+        
+        detect.assert_called_once()
+    
     def test_extract_text_content_method(self):
         """Test the _extract_text_content method."""
         rule = CodeLanguageRule(
@@ -1139,6 +1208,91 @@ class TestCodeLanguageRule:
             result = rule._detect_language_llm("some code", ["scala"])
             assert result is None
     
+    def test_llm_detection_cached(self):
+        """Test that repeated snippets reuse the LLM's answer, including no answer."""
+        rule = CodeLanguageRule(
+            name="test-rule",
+            language_mappings={"scala": "scala-model"},
+            default="default-model"
+        )
+        
+        with patch('deimos_router.rules.code_language_rule.config') as mock_config, \
+                patch.object(rule, '_request_language_llm', side_effect=["scala", None]) as request:
+            mock_config.is_configured.return_value = True
+            assert rule._detect_language_llm("object Main", ["scala"]) == "scala"
+            assert rule._detect_language_llm("object Main", ["scala"]) == "scala"
+            assert rule._detect_language_llm("plain text", ["scala"]) is None
+            assert rule._detect_language_llm("plain text", ["scala"]) is None
+        
+        assert request.call_count == 2
+    
+    def test_llm_detection_joins_in_flight_call(self):
+        """Test that a snippet already being classified waits for that call."""
+        from concurrent.futures import Future
+        
+        rule = CodeLanguageRule(
+            name="test-rule",
+            language_mappings={"scala": "scala-model"},
+            default="default-model"
+        )
+        
+        pending = Future()
+        pending.set_result("scala")
+        rule._in_flight[(rule.llm_model, ("scala",), "object Main")] = pending
+        
+        with patch('deimos_router.rules.code_language_rule.config') as mock_config, \
+                patch.object(rule, '_request_language_llm', side_effect=AssertionError("LLM called")):
+            mock_config.is_configured.return_value = True
+            assert rule._detect_language_llm("object Main", ["scala"]) == "scala"
+    
+    def test_llm_client_reused(self):
+        """Test that LLM calls share one client while the credentials stay the same."""
+        rule = CodeLanguageRule(
+            name="test-rule",
+            language_mappings={"scala": "scala-model"},
+            default="default-model"
+        )
+        
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "scala"
+        
+        with patch('deimos_router.rules.code_language_rule.config') as mock_config, \
+                patch('deimos_router.rules.code_language_rule.openai.OpenAI') as mock_openai:
+            mock_config.get_credentials.return_value = {'api_key': 'key', 'api_url': 'url'}
+            mock_openai.return_value.chat.completions.create.return_value = mock_response
+        
+            assert rule._request_language_llm("object Main", ["scala", "kotlin"]) == "scala"
+            assert rule._request_language_llm("object Other", ["scala", "kotlin"]) == "scala"
+            mock_openai.assert_called_once_with(api_key='key', base_url='url')
+        
+            prompt = mock_openai.return_value.chat.completions.create.call_args[1]['messages'][0]['content']
+            assert "You must choose from one of these languages: scala, kotlin" in prompt
+            assert prompt.endswith("```\nobject Other  # Limit text to avoid token limits\n```")
+        
+            # New credentials get a new client
+            mock_config.get_credentials.return_value = {'api_key': 'other-key', 'api_url': 'url'}
+            rule._request_language_llm("object Main", ["scala"])
+            assert mock_openai.call_count == 2
+    
+    def test_unmapped_languages_follow_mapping_changes(self):
+        """Test that the LLM candidates are reused and track added languages."""
+        rule = CodeLanguageRule(
+            name="test-rule",
+            language_mappings={"python": "python-model", "scala": "scala-model"},
+            default="default-model"
+        )
+        
+        unmapped = rule._get_unmapped_languages()
+        assert unmapped == ["scala"]
+        assert rule._get_unmapped_languages() is unmapped
+        
+        rule.language_mappings["elixir"] = "elixir-model"
+        assert rule._get_unmapped_languages() == ["scala", "elixir"]
+        
+        rule.language_patterns["scala"] = ()
+        assert rule._get_unmapped_languages() == ["elixir"]
+        
     def test_comprehensive_language_coverage(self):
         """Test that all major languages in the patterns are properly detected."""
         rule = CodeLanguageRule(